@@ -1,79 +1,67 @@
-import os
-import json
-import random
-from typing import List, Tuple, Optional
+from typing import Optional
+import numpy as np
 from langchain.tools import tool
+from agents.odds_engine import (
+    DEFAULT_TARGET_HALF_WIDTH,
+    POINTS_SCHEME,
+    resolve_races_done,
+    wilson_interval,
+)
+from agents.odds_cache import cached_championship_simulation
+from agents.standings_store import get_standings, format_points, suggestion_text
+
+# Default `precision` of the odds tools, in percentage points
+DEFAULT_PRECISION_PCT = DEFAULT_TARGET_HALF_WIDTH * 100.0
 
 
 @tool
-def get_championship_odds(driver_name: str, total_races: int = 24, races_done: Optional[int] = None, simulations: int = 1000) -> str:
+def get_championship_odds(driver_name: str, total_races: int = 24, races_done: Optional[int] = None, simulations: int = 1000, seed: Optional[int] = None, precision: float = DEFAULT_PRECISION_PCT) -> str:
     """
     Estimate the chance of a driver winning the championship based on local standings (driver_standing.json).
     This function provides two safety checks and a Monte Carlo simulation to estimate odds more realistically:
-    - Robust file path handling (relative to this module)
+    - Standings served from the shared in-memory store (agents/standings_store.py)
     - Edge cases when there are no remaining races
-    - A simple Monte Carlo simulation that simulates remaining races using weights based on current points
+    - A vectorized (NumPy) Monte Carlo simulation that simulates remaining races using weights based on current points
 
     Parameters:
-      driver_name: substring match for the driver's name
+      driver_name: driver's name, surname, three-letter code ("NOR") or nickname; small misspellings are tolerated
       total_races: total races in the season
       races_done: races completed so far
-      simulations: number of Monte Carlo simulations to run (set to 0 to skip simulation)
+      simulations: maximum number of Monte Carlo simulations to run (set to 0 to skip simulation).
+                   1,000,000 or more runs in parallel shards under a time budget.
+      seed: optional random seed so repeated runs give identical odds
+      precision: stop early once the 95% confidence interval is within ± this many percentage points
+                 (set to 0 to always run every simulation)
 
     Note: When races_done is not available from metadata, you should ask the user:
           "How many races have been completed so far this season?" 
           Do not assume or use outdated default values.
     """
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(base_path, "..", "scraped_data", "driver_standing.json")
-    with open(data_path, "r", encoding="utf-8") as f:
-        drivers = json.load(f)
-
-    # If races_done wasn't provided, try to read from a scraped season metadata file.
-    auto_notice = False
-    if races_done is None:
-        season_meta_path = os.path.join(base_path, "..", "scraped_data", "season_meta.json")
-        try:
-            with open(season_meta_path, "r", encoding="utf-8") as smf:
-                meta = json.load(smf)
-                # Accept multiple possible keys
-                races_done = int(meta.get("races_done") or meta.get("completed_races") or meta.get("current_round") or 0)
-        except FileNotFoundError:
-            # fallback to previous default (keeps backward compatibility)
-            races_done = 18
-            auto_notice = True
-        except Exception:
-            races_done = 18
-            auto_notice = True
-
-    # Normalize and convert points to floats
-    for d in drivers:
-        try:
-            d["PTS."] = float(d.get("PTS.", 0))
-        except Exception:
-            d["PTS."] = 0.0
+    standings = get_standings()
+    drivers = standings.drivers
+    races_done, auto_notice = resolve_races_done(races_done)
 
     # Find leader and requested driver
-    leader = max(drivers, key=lambda d: d["PTS."])
-    driver = next((d for d in drivers if driver_name.lower() in d["DRIVER"].lower()), None)
+    leader = max(drivers, key=lambda d: d.points)
+    driver, candidates = standings.match_driver(driver_name)
     if not driver:
-        return f"Could not find '{driver_name}' in the standings. Please provide a valid driver name."
+        return f"Could not find '{driver_name}' in the standings.{suggestion_text(candidates)} Please provide a valid driver name."
 
-    leader_points = float(leader["PTS."])
-    driver_points = float(driver["PTS."])
+    leader_points = float(leader.points)
+    driver_points = float(driver.points)
     remaining = total_races - races_done
     if remaining <= 0:
         # Season finished or invalid input
         if driver_points >= leader_points:
-            return f"{driver['DRIVER']} is currently the champion with {driver_points} points (season complete)."
+            return f"{driver.name} is currently the champion with {driver_points} points (season complete)."
         else:
-            return f"The season is complete. {driver['DRIVER']} finished with {driver_points} points; leader was {leader['DRIVER']} with {leader_points} points."
+            return f"The season is complete. {driver.name} finished with {driver_points} points; leader was {leader.name} with {leader_points} points."
 
     max_points = remaining * 25
 
     # Quick mathematical check
     if driver_points + max_points < leader_points:
-        return f"Unfortunately, {driver['DRIVER']} is currently too far behind to mathematically win the championship this season, even with maximum points from all remaining races."
+        return f"Unfortunately, {driver.name} is currently too far behind to mathematically win the championship this season, even with maximum points from all remaining races."
 
     diff = leader_points - driver_points
 
@@ -81,67 +69,107 @@ def get_championship_odds(driver_name: str, total_races: int = 24, races_done: O
     if not simulations or simulations <= 0:
         odds = max(0.0, min(100.0, round((1 - diff / max_points) * 100.0, 2)))
         return (
-            f"{driver['DRIVER']} currently has {driver_points} points.\n"
-            f"Leader: {leader['DRIVER']} with {leader_points} points.\n"
+            f"{driver.name} currently has {driver_points} points.\n"
+            f"Leader: {leader.name} with {leader_points} points.\n"
             f"Simple estimated chance of winning (no simulation): {odds}%"
         )
 
 
     # Monte Carlo simulation:
     # - Use current points + 1 as weight for sampling finishing order (higher points -> more likely to finish higher)
-    # - For each remaining race, sample a permutation of drivers without replacement using weighted sampling
+    # - Every remaining race of every simulation is sampled at once by simulate_final_points (Plackett-Luce via exponential arrival times)
     # - Allocate standard F1 points to top10 finishers
-    points_scheme = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
-
-    names = [d["DRIVER"] for d in drivers]
-    base_points = {d["DRIVER"]: d["PTS."] for d in drivers}
-
-    def weighted_sample_without_replacement(pop: List[str], weights: List[float], k: int) -> List[str]:
-        pop_copy = pop[:]
-        w = weights[:]
-        selected = []
-        for _ in range(min(k, len(pop_copy))):
-            total = sum(w)
-            if total <= 0:
-                # fallback to uniform
-                idx = random.randrange(len(pop_copy))
-            else:
-                r = random.random() * total
-                cum = 0.0
-                idx = 0
-                for i, ww in enumerate(w):
-                    cum += ww
-                    if r <= cum:
-                        idx = i
-                        break
-            selected.append(pop_copy.pop(idx))
-            w.pop(idx)
-        return selected
-
-    wins = 0.0
-    for sim in range(simulations):
-        sim_points = base_points.copy()
-        # Simulate each remaining race
-        for _ in range(remaining):
-            weights = [base_points[n] + 1.0 for n in names]
-            order = weighted_sample_without_replacement(names, weights, k=len(names))
-            # award points to top10
-            for pos_idx, driver_name_sim in enumerate(order[:10]):
-                sim_points[driver_name_sim] += points_scheme[pos_idx]
-        # determine champion(s)
-        max_pts = max(sim_points.values())
-        leaders = [n for n, p in sim_points.items() if p == max_pts]
-        if driver['DRIVER'] in leaders:
-            # if tied between multiple drivers, count fractional win
-            wins += 1.0 / len(leaders)
+    # - Results are cached per standings snapshot and parameters (see agents/odds_cache.py)
+    base_points = np.array([d.points for d in drivers], dtype=np.float64)
+    driver_idx = drivers.index(driver)
+
+    target_half_width = max(float(precision or 0), 0.0) / 100.0
+    result = cached_championship_simulation(standings.driver_fingerprint, base_points, total_races, races_done, simulations, seed,
+                                            driver_idx, target_half_width)
+    wins = result["wins"][driver_idx]
+    # Adaptive and large runs can stop early, so report what was actually simulated
+    requested = simulations
+    simulations = result["simulations"]
 
     odds_pct = round((wins / simulations) * 100.0, 2)
+    ci_low, ci_high = wilson_interval(wins, simulations)
 
     # Compose a user-friendly summary
     return (
-        f"{driver['DRIVER']} currently has {driver_points} points.\n"
-        f"Leader: {leader['DRIVER']} with {leader_points} points.\n"
-        f"Remaining races: {remaining}. Simulations run: {simulations}.\n"
+        f"{driver.name} currently has {driver_points} points.\n"
+        f"Leader: {leader.name} with {leader_points} points.\n"
+        f"Remaining races: {remaining}. Simulations run: {simulations} (of up to {requested}).\n"
         f"Estimated chance of winning the championship: {odds_pct}%\n"
+        f"95% confidence interval: {round(float(ci_low) * 100.0, 2)}% – {round(float(ci_high) * 100.0, 2)}%\n"
         f"(This estimate uses a lightweight Monte Carlo simulation based on current points to model likely race finishes.)"
-    )
\ No newline at end of file
+    )
+
+
+@tool
+def get_championship_grid_odds(total_races: int = 24, races_done: Optional[int] = None, simulations: int = 1000, seed: Optional[int] = None, precision: float = DEFAULT_PRECISION_PCT) -> str:
+    """
+    Estimate championship odds for EVERY driver from a single Monte Carlo run.
+    Use this instead of calling get_championship_odds once per driver, e.g. for
+    "who can still win the title?" or "what are the odds for the whole grid?".
+
+    For each driver it returns:
+    - chance of winning the championship
+    - expected final points
+    - finishing-position distribution (most likely positions in the final standings)
+
+    Parameters:
+      total_races: total races in the season
+      races_done: races completed so far
+      simulations: maximum number of Monte Carlo simulations to run
+      seed: optional random seed so repeated runs give identical odds
+      precision: stop early once every driver's 95% confidence interval is within ± this many
+                 percentage points (set to 0 to always run every simulation)
+
+    Note: When races_done is not available from metadata, you should ask the user:
+          "How many races have been completed so far this season?"
+          Do not assume or use outdated default values.
+    """
+    standings = get_standings()
+    drivers = standings.drivers
+    races_done, auto_notice = resolve_races_done(races_done)
+    remaining = total_races - races_done
+    if remaining <= 0:
+        leader = max(drivers, key=lambda d: d.points)
+        return f"The season is complete. {leader.name} is the champion with {format_points(leader.points)} points."
+
+    simulations = max(int(simulations or 0), 1)
+    base_points = np.array([d.points for d in drivers], dtype=np.float64)
+    target_half_width = max(float(precision or 0), 0.0) / 100.0
+    result = cached_championship_simulation(standings.driver_fingerprint, base_points, total_races, races_done, simulations, seed,
+                                            target_half_width=target_half_width)
+    requested = simulations
+    simulations = result["simulations"]
+    title_pct = result["wins"] / simulations * 100.0
+    ci_low, ci_high = wilson_interval(result["wins"], simulations)
+    expected_points = result["points_sum"] / simulations
+    position_pct = result["position_counts"] / simulations * 100.0
+    max_points = remaining * POINTS_SCHEME[0]
+    leader_points = base_points.max()
+
+    lines = [
+        "🏆 **Championship Odds — Whole Grid**",
+        f"Remaining races: {remaining}. Simulations run: {simulations} (of up to {requested}).",
+        "",
+    ]
+    # Order by title chance, then by expected points
+    for i in sorted(range(len(drivers)), key=lambda i: (-title_pct[i], -expected_points[i])):
+        d = drivers[i]
+        if base_points[i] + max_points < leader_points:
+            title = "mathematically out"
+        else:
+            title = f"{round(float(title_pct[i]), 2)}% (95% CI {round(float(ci_low[i]) * 100.0, 2)}–{round(float(ci_high[i]) * 100.0, 2)}%)"
+        # Show the positions that happen in at least 1% of simulations (top 3 by probability)
+        likely = [p for p in np.argsort(-position_pct[i], kind="stable")[:3] if position_pct[i][p] >= 1.0]
+        positions = ", ".join(f"P{p + 1} {round(float(position_pct[i][p]), 1)}%" for p in likely)
+        lines.append(
+            f"- {d.name} ({format_points(d.points)} pts): title {title}, "
+            f"expected {round(float(expected_points[i]), 1)} pts, likely finish: {positions or 'n/a'}"
+        )
+    lines.append("")
+    lines.append("(This estimate uses a lightweight Monte Carlo simulation based on current points to model likely race finishes.)")
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+"""
+Circuit lookup for the weather tools, loaded once at import.
+
+f1-locations.json (resolved relative to this module, not the working directory)
+is parsed into Circuit records indexed by id, name, location, country and
+aliases (Grand Prix names, nicknames like "COTA" or "Spa"), with the same fuzzy
+matching the standings tools use. A latitude-sorted index answers
+nearest-circuit queries for a coordinate.
+"""
+import os
+import re
+import json
+import math
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from agents.name_index import Match, NameIndex, fold
+
+CIRCUITS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "f1-locations.json")
+
+# Country names for the ISO codes that prefix circuit ids ("it-1922")
+COUNTRY_NAMES: Dict[str, str] = {
+    "ae": "United Arab Emirates", "at": "Austria", "au": "Australia", "az": "Azerbaijan", "be": "Belgium",
+    "bh": "Bahrain", "br": "Brazil", "ca": "Canada", "cn": "China", "de": "Germany", "es": "Spain",
+    "fr": "France", "gb": "United Kingdom", "hu": "Hungary", "it": "Italy", "jp": "Japan", "mc": "Monaco",
+    "mx": "Mexico", "my": "Malaysia", "nl": "Netherlands", "pt": "Portugal", "qa": "Qatar", "ru": "Russia",
+    "sa": "Saudi Arabia", "sg": "Singapore", "tr": "Turkey", "us": "United States",
+}
+
+# Grand Prix names, nicknames and spellings users actually type, by circuit id
+CIRCUIT_ALIASES: Dict[str, List[str]] = {
+    "us-2012": ["COTA", "United States", "USA", "USGP", "Texas"],
+    "az-2016": ["Azerbaijan", "Azerbaijani"],
+    "es-1991": ["Spanish", "Catalunya", "Catalonia", "Montmelo"],
+    "hu-1986": ["Hungarian"],
+    "pt-1972": ["Estoril"],
+    "de-1932": ["German", "Hockenheim"],
+    "it-1953": ["Imola", "Emilia Romagna", "San Marino"],
+    "tr-2005": ["Turkish", "Istanbul Park"],
+    "br-1977": ["Jacarepagua", "Rio de Janeiro"],
+    "sa-2021": ["Saudi", "Saudi Arabian", "Jeddah"],
+    "us-2023": ["Vegas", "Las Vegas"],
+    "fr-1969": ["French", "Paul Ricard"],
+    "qa-2004": ["Qatari", "Losail", "Lusail"],
+    "fr-1960": ["Magny Cours"],
+    "au-1953": ["Australian", "Albert Park"],
+    "mx-1962": ["Mexican", "Mexico City", "Hermanos Rodriguez"],
+    "us-2022": ["Miami"],
+    "mc-1929": ["Monte Carlo", "Monegasque"],
+    "ca-1978": ["Canadian", "Montreal", "Gilles Villeneuve"],
+    "it-1922": ["Italian", "Monza"],
+    "de-1927": ["Nurburgring", "Eifel"],
+    "pt-2008": ["Portuguese", "Portimao", "Algarve"],
+    "bh-2002": ["Bahraini", "Sakhir"],
+    "br-1940": ["Brazilian", "Interlagos", "Sao Paulo"],
+    "it-1914": ["Mugello", "Tuscan"],
+    "my-1999": ["Malaysian", "Sepang"],
+    "cn-2004": ["Chinese", "Shanghai"],
+    "gb-1948": ["British", "Silverstone", "UK"],
+    "sg-2008": ["Marina Bay", "Singapore"],
+    "ru-2014": ["Russian", "Sochi"],
+    "be-1925": ["Belgian", "Spa"],
+    "at-1969": ["Austrian", "Styrian", "Spielberg", "Red Bull Ring"],
+    "jp-1962": ["Japanese", "Suzuka"],
+    "ae-2009": ["Abu Dhabi", "Yas Marina", "Yas Island"],
+    "nl-1948": ["Dutch", "Zandvoort"],
+}
+
+# Words that describe the event rather than name the circuit ("Italian Grand Prix 2024 weather")
+_NOISE_WORDS = {"grand", "prix", "gp", "circuit", "race", "track", "weekend", "weather", "f1", "formula", "1", "the"}
+
+_COORDINATES = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*[,;\s]\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+EARTH_RADIUS_KM = 6371.0
+# Kilometres per degree of latitude; a latitude gap alone bounds the great-circle distance from below
+_KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+class Circuit(NamedTuple):
+    id: str
+    name: str
+    location: str
+    country: str
+    lat: float
+    lon: float
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coordinates(text: str) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) for input like "45.62, 9.28", else None."""
+    m = _COORDINATES.match(text or "")
+    if not m:
+        return None
+    lat, lon = float(m.group(1)), float(m.group(2))
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+
+class CircuitIndex:
+    def __init__(self, circuits: List[Circuit]):
+        self.circuits = tuple(circuits)
+        self.by_id = {c.id: c for c in circuits}
+
+        # Countries with a single circuit are a safe key; shared ones ("Italy") rely on aliases
+        country_counts: Dict[str, int] = {}
+        for c in circuits:
+            country_counts[c.country] = country_counts.get(c.country, 0) + 1
+        self.name_index: NameIndex = NameIndex()
+        for c in circuits:
+            names = [c.name, c.location, *CIRCUIT_ALIASES.get(c.id, [])]
+            if c.country and country_counts[c.country] == 1:
+                names.append(c.country)
+            self.name_index.add(c, names)
+
+        # Circuits sorted by latitude for nearest-neighbour scans
+        self._by_lat = sorted(circuits, key=lambda c: c.lat)
+        self._lats = [c.lat for c in self._by_lat]
+
+    @classmethod
+    def load(cls, path: str = CIRCUITS_PATH) -> "CircuitIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        return cls([
+            Circuit(
+                id=r["id"],
+                name=r["name"],
+                location=r["location"],
+                country=COUNTRY_NAMES.get(r["id"].split("-")[0], ""),
+                lat=float(r["lat"]),
+                lon=float(r["lon"]),
+            )
+            for r in rows
+        ])
+
+    def match(self, query: str) -> Tuple[Optional[Circuit], List[Match]]:
+        """
+        Resolve a circuit by id, name, city, country, Grand Prix name or alias, tolerating
+        misspellings. Returns (circuit, candidates) like StandingsSnapshot.match_driver.
+        """
+        circuit = self.by_id.get((query or "").strip().lower())
+        if circuit:
+            return circuit, [Match(circuit, 1.0, circuit.id)]
+        words = [w for w in fold(query).split() if w not in _NOISE_WORDS and not re.fullmatch(r"(19|20)\d{2}", w)]
+        return self.name_index.resolve(" ".join(words) or query)
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[Circuit, float]]:
+        """The k circuits closest to (lat, lon) as (circuit, distance_km), nearest first."""
+        best: List[Tuple[float, Circuit]] = []
+        start = bisect_left(self._lats, lat)
+        below, above = start - 1, start
+        # Walk outwards in latitude; stop once the latitude gap alone exceeds the k-th best distance
+        while below >= 0 or above < len(self._by_lat):
+            gap_below = lat - self._lats[below] if below >= 0 else math.inf
+            gap_above = self._lats[above] - lat if above < len(self._by_lat) else math.inf
+            if gap_below <= gap_above:
+                c, gap = self._by_lat[below], gap_below
+                below -= 1
+            else:
+                c, gap = self._by_lat[above], gap_above
+                above += 1
+            if len(best) == k and gap * _KM_PER_DEGREE_LAT > best[-1][0]:
+                break
+            best.append((haversine_km(lat, lon, c.lat, c.lon), c))
+            best.sort(key=lambda t: t[0])
+            del best[k:]
+        return [(c, d) for d, c in best]
+
+
+CIRCUITS = CircuitIndex.load()
+
+
+def find_circuit(query: str) -> Tuple[Optional[Circuit], List[Match]]:
+    """Resolve a circuit by name (see CircuitIndex.match) or by "lat, lon" coordinates (nearest circuit)."""
+    coordinates = parse_coordinates(query)
+    if coordinates:
+        circuit, distance = CIRCUITS.nearest(*coordinates)[0]
+        return circuit, [Match(circuit, 1.0, f"{distance:.0f} km")]
+    return CIRCUITS.match(query)
@@ -0,0 +1,200 @@
+"""
+Bounded conversation context for the agent.
+
+The checkpointer keeps every message of a thread, and the ReAct agent used to
+send all of them to Gemini on every call, including the full Tavily and
+YouTube payloads of old tool calls. What the model sees is now built per call
+from three parts:
+- a running summary of the older turns, kept in the checkpoint next to the messages
+  (context_summary / summarized_upto in ContextState) and appended to the system prompt
+- older turns not yet summarized, with tool outputs cut to OLD_TOOL_OUTPUT_CHARS
+- the last CONTEXT_RECENT_TURNS turns verbatim (tool outputs of earlier turns as the
+  digests kept in the checkpoint, those of the current turn in full)
+
+When that view exceeds CONTEXT_TOKEN_BUDGET, the pre-model hook folds the
+older turns into the summary with one extra LLM call. If the summary cannot be
+written, the oldest turns are dropped from the view instead. The full history
+stays in the checkpoint (the history endpoint still shows every message); only
+the model input is bounded.
+"""
+import os
+from typing import List, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from agents.tool_blobs import arehydrate, rehydrate
+
+# Rough token budget for the conversation part of the model input (the system prompt comes on top)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Turns (a user message and everything after it) always sent verbatim, the current one included
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "3"))
+# Tool outputs of older turns are cut to this many characters
+OLD_TOOL_OUTPUT_CHARS = 400
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a Formula 1 chat between a user and an assistant. "
+    "Merge the existing summary with the new turns into one updated summary of at most 200 words. "
+    "Keep what later questions may refer to: drivers, teams, races, seasons and numbers discussed, "
+    "the user's preferences and any open questions. Leave out formatting, links and raw tool output."
+)
+
+
+class ContextState(AgentState):
+    # Summary of messages[:summarized_upto]
+    context_summary: str
+    summarized_upto: int
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(p if isinstance(p, str) else p.get("text", "") for p in content or [] if isinstance(p, (str, dict)))
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """About four characters per token, plus a little per message and per tool call."""
+    total = 0
+    for m in messages:
+        total += len(message_text(m)) // 4 + 4
+        for call in getattr(m, "tool_calls", None) or []:
+            total += len(str(call.get("args", ""))) // 4 + 8
+    return total
+
+
+def _turn_starts(messages: List[BaseMessage]) -> List[int]:
+    return [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+
+
+def _recent_start(messages: List[BaseMessage]) -> int:
+    starts = _turn_starts(messages)
+    if len(starts) <= CONTEXT_RECENT_TURNS:
+        return starts[0] if starts else 0
+    return starts[-CONTEXT_RECENT_TURNS]
+
+
+def _trim_tool_output(message: BaseMessage, limit: int = OLD_TOOL_OUTPUT_CHARS) -> BaseMessage:
+    if not isinstance(message, ToolMessage):
+        return message
+    text = message_text(message)
+    if len(text) <= limit:
+        return message
+    return message.model_copy(update={"content": text[:limit] + " … [trimmed]"})
+
+
+def _state_value(state, key, default=None):
+    return state.get(key, default) if isinstance(state, dict) else getattr(state, key, default)
+
+
+def _split(state) -> Tuple[str, List[BaseMessage], List[BaseMessage]]:
+    """(summary, older unsummarized messages, recent messages)"""
+    messages = _state_value(state, "messages")
+    recent = _recent_start(messages)
+    upto = min(_state_value(state, "summarized_upto") or 0, recent)
+    return _state_value(state, "context_summary") or "", messages[upto:recent], messages[recent:]
+
+
+def _current_start(recent: List[BaseMessage]) -> int:
+    starts = _turn_starts(recent)
+    return starts[-1] if starts else 0
+
+
+def _bounded_view(summary: str, older: List[BaseMessage], recent: List[BaseMessage], current: int) -> Tuple[str, List[BaseMessage]]:
+    older = [_trim_tool_output(m) for m in older]
+    if estimate_tokens(older + recent) > CONTEXT_TOKEN_BUDGET:
+        # Tool outputs of the recent turns go next; the current turn's stay intact
+        recent = [_trim_tool_output(m) for m in recent[:current]] + recent[current:]
+    while older and estimate_tokens(older + recent) > CONTEXT_TOKEN_BUDGET:
+        # Whole turns are dropped so tool calls never lose their results
+        starts = _turn_starts(older)
+        older = older[starts[1]:] if len(starts) > 1 else []
+    return summary, older + recent
+
+
+def context_view(state) -> Tuple[str, List[BaseMessage]]:
+    """The summary and the bounded message list the model sees for this state."""
+    summary, older, recent = _split(state)
+    # Tools of the current turn are shown in full (restored from the blob store, see tool_blobs.py);
+    # earlier turns keep the digests stored in the checkpoint
+    current = _current_start(recent)
+    return _bounded_view(summary, older, recent[:current] + [rehydrate(m) for m in recent[current:]], current)
+
+
+async def acontext_view(state) -> Tuple[str, List[BaseMessage]]:
+    summary, older, recent = _split(state)
+    current = _current_start(recent)
+    return _bounded_view(summary, older, recent[:current] + [await arehydrate(m) for m in recent[current:]], current)
+
+
+def _needs_summary(state) -> bool:
+    _, older, recent = _split(state)
+    return bool(older) and estimate_tokens([_trim_tool_output(m) for m in older] + recent) > CONTEXT_TOKEN_BUDGET
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    lines = []
+    for m in messages:
+        if isinstance(m, HumanMessage):
+            lines.append(f"User: {message_text(m)}")
+        elif isinstance(m, ToolMessage):
+            lines.append(f"Tool {m.name}: {message_text(_trim_tool_output(m))}")
+        elif isinstance(m, AIMessage) and message_text(m):
+            lines.append(f"Assistant: {message_text(m)}")
+    return "\n".join(lines)
+
+
+def _summary_request(state) -> List[BaseMessage]:
+    summary, older, _ = _split(state)
+    return [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{_transcript(older)}"),
+    ]
+
+
+def _summary_update(state, response) -> dict:
+    messages = _state_value(state, "messages")
+    return {"context_summary": message_text(response).strip(), "summarized_upto": _recent_start(messages)}
+
+
+def make_context_hook(llm):
+    """Pre-model hook that folds older turns into the running summary once the context outgrows its budget."""
+
+    def summarize(state) -> dict:
+        if not _needs_summary(state):
+            return {}
+        try:
+            return _summary_update(state, llm.invoke(_summary_request(state)))
+        except Exception as e:
+            # context_view still bounds the input by dropping the oldest turns
+            print(f"Context summary failed: {e}")
+            return {}
+
+    async def asummarize(state) -> dict:
+        if not _needs_summary(state):
+            return {}
+        try:
+            return _summary_update(state, await llm.ainvoke(_summary_request(state)))
+        except Exception as e:
+            print(f"Context summary failed: {e}")
+            return {}
+
+    return RunnableLambda(summarize, afunc=asummarize, name="context_window")
+
+
+def make_context_prompt(system_prompt: str):
+    """Agent prompt: the system prompt (plus the running summary) followed by the bounded messages."""
+
+    def model_input(summary: str, messages: List[BaseMessage]) -> List[BaseMessage]:
+        text = system_prompt
+        if summary:
+            text += f"\n\n---\n\n**Earlier in this conversation** (summary):\n{summary}"
+        return [SystemMessage(content=text)] + messages
+
+    def prompt(state) -> List[BaseMessage]:
+        return model_input(*context_view(state))
+
+    async def aprompt(state) -> List[BaseMessage]:
+        # Blobs missing from the local copy are read from Mongo off the event loop
+        return model_input(*await acontext_view(state))
+
+    return RunnableLambda(prompt, afunc=aprompt, name="context_prompt")
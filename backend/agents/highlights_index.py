@@ -0,0 +1,201 @@
+"""
+Local full-text index of the official Formula 1 YouTube channel's uploads.
+
+A crawler pages through the channel's uploads playlist (playlistItems.list costs
+1 quota unit per 50 videos, against 100 units per search.list call) and stores
+title, description, publish date and video id in SQLite with an FTS5 index.
+get_f1_highlights answers from the index in milliseconds and only searches the
+API when the index has no match.
+
+The server refreshes the index in a background thread every
+HIGHLIGHTS_CRAWL_INTERVAL seconds (incremental: it stops at the first page of
+videos it already knows). Build or rebuild it by hand (from the backend directory):
+    python -m agents.highlights_index          # incremental
+    python -m agents.highlights_index --full   # whole channel history
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+from agents.name_index import fold
+
+_default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraped_data", "highlights_index.sqlite3")
+HIGHLIGHTS_INDEX_PATH = os.getenv("HIGHLIGHTS_INDEX_PATH", _default_path)
+
+CHANNEL_ID = "UCB_qr75-ydFVKSF9Dmo6izg"
+# Every channel's uploads playlist id is its channel id with "UC" replaced by "UU"
+UPLOADS_PLAYLIST_ID = "UU" + CHANNEL_ID[2:]
+
+# Seconds between background crawls (0 disables the background thread)
+HIGHLIGHTS_CRAWL_INTERVAL = int(os.getenv("HIGHLIGHTS_CRAWL_INTERVAL", str(6 * 3600)))
+
+# Words every video on the channel is about; requiring them would only lose matches
+_GENERIC_WORDS = {"formula", "1", "f1", "video", "videos", "youtube", "official", "the", "a", "of", "in", "at", "from"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    rowid INTEGER PRIMARY KEY,
+    video_id TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    published_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_published_at ON videos(published_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title, description, content='videos', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO videos_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TABLE IF NOT EXISTS crawl_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    # sqlite3 connections can't be shared across threads, so each thread keeps its own
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(HIGHLIGHTS_INDEX_PATH), exist_ok=True)
+        conn = sqlite3.connect(HIGHLIGHTS_INDEX_PATH, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL lets request threads read while the crawler writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _match_expression(text: str) -> Optional[str]:
+    """FTS5 query requiring every meaningful word of text (quoted, so user input is never FTS syntax)."""
+    words = [w for w in fold(text).split() if w not in _GENERIC_WORDS and not re.fullmatch(r"20\d{2}", w)]
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in dict.fromkeys(words))
+
+
+def search_index(search_params: dict) -> List[dict]:
+    """
+    Answer a search built by youtube_highlights_agent.build_search_params from the index.
+    Returns items shaped like search.list results (so they format the same way); empty
+    when the index is missing or has no match.
+    """
+    if not os.path.exists(HIGHLIGHTS_INDEX_PATH):
+        return []
+    match = _match_expression(search_params["q"])
+    where, args = [], []
+    if match:
+        where.append("videos_fts MATCH ?")
+        args.append(match)
+    if "publishedAfter" in search_params:
+        where.append("v.published_at >= ? AND v.published_at < ?")
+        args += [search_params["publishedAfter"], search_params["publishedBefore"]]
+    # Relevance ranks title hits well above description hits; "date" order means newest first
+    if match and search_params.get("order") == "relevance":
+        order_by = "bm25(videos_fts, 10.0, 1.0)"
+    else:
+        order_by = "v.published_at DESC"
+    source = "videos_fts JOIN videos v ON v.rowid = videos_fts.rowid" if match else "videos v"
+    sql = (
+        f"SELECT v.video_id, v.title, v.description, v.published_at FROM {source} "
+        f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order_by} LIMIT ?"
+    )
+    try:
+        rows = _connect().execute(sql, [*args, int(search_params["maxResults"])]).fetchall()
+    except sqlite3.Error as e:
+        print(f"Highlights index search failed: {e}")
+        return []
+    return [
+        {
+            "id": {"videoId": r["video_id"]},
+            "snippet": {"title": r["title"], "description": r["description"], "publishedAt": r["published_at"]},
+        }
+        for r in rows
+    ]
+
+
+def crawl_uploads(youtube, full: bool = False) -> int:
+    """
+    Page through the channel's uploads (newest first) and upsert them into the index.
+    Unless full, stops after the first page that adds nothing new. Returns the number of new videos.
+    """
+    from agents.youtube_highlights_agent import youtube_quota
+
+    conn = _connect()
+    added = 0
+    page_token = None
+    while True:
+        params = {"part": "snippet", "playlistId": UPLOADS_PLAYLIST_ID, "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        # playlistItems.list costs 1 unit
+        youtube_quota.spend(1)
+        response = youtube.playlistItems().list(**params).execute()
+
+        page_added = 0
+        with conn:
+            for item in response.get("items", []):
+                snippet = item.get("snippet", {})
+                video_id = snippet.get("resourceId", {}).get("videoId")
+                # Uploads that were made private or deleted keep a placeholder entry in the playlist
+                if not video_id or snippet.get("title") in ("Private video", "Deleted video"):
+                    continue
+                cursor = conn.execute(
+                    "INSERT INTO videos(video_id, title, description, published_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(video_id) DO UPDATE SET title = excluded.title, description = excluded.description "
+                    "WHERE videos.title != excluded.title OR videos.description != excluded.description",
+                    (video_id, snippet.get("title", ""), snippet.get("description", ""), snippet.get("publishedAt", "")),
+                )
+                # rowcount is 1 for inserts and real updates, 0 when the video is unchanged
+                page_added += cursor.rowcount
+            conn.execute("INSERT OR REPLACE INTO crawl_meta(key, value) VALUES ('last_crawl', ?)", (str(time.time()),))
+        added += page_added
+
+        page_token = response.get("nextPageToken")
+        if not page_token or (not full and page_added == 0):
+            return added
+
+
+def _crawl_forever(interval: int) -> None:
+    from agents.youtube_highlights_agent import youtube
+    while True:
+        try:
+            added = crawl_uploads(youtube)
+            print(f"Highlights index refreshed: {added} new or updated videos")
+        except Exception as e:
+            print(f"Highlights index crawl failed: {e}")
+        time.sleep(interval)
+
+
+_crawler_started = False
+_crawler_lock = threading.Lock()
+
+
+def start_background_crawler(interval: int = HIGHLIGHTS_CRAWL_INTERVAL) -> None:
+    """Start the periodic crawl in a daemon thread (once per process; no-op when interval is 0)."""
+    global _crawler_started
+    if interval <= 0:
+        return
+    with _crawler_lock:
+        if _crawler_started:
+            return
+        _crawler_started = True
+    threading.Thread(target=_crawl_forever, args=(interval,), name="highlights-crawler", daemon=True).start()
+
+
+if __name__ == "__main__":
+    from agents.youtube_highlights_agent import youtube
+    count = crawl_uploads(youtube, full="--full" in sys.argv)
+    total = _connect().execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    print(f"✅ Highlights index updated: {count} new or updated videos, {total} indexed")
@@ -0,0 +1,37 @@
+"""
+Shared HTTP clients for the tools.
+
+Sync tool calls share one requests.Session, so repeated calls to the same API
+reuse pooled keep-alive connections instead of a new TCP/TLS handshake each.
+httpx connection pools belong to the event loop that opened them, so one
+AsyncClient is kept per running loop (the ASGI server has exactly one) and
+every async tool call reuses its pooled connections.
+"""
+import asyncio
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upstream APIs answer in well under a second; a hung connection must not hold a chat turn
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+# Same limits in the (connect, read) form requests expects
+REQUESTS_TIMEOUT = (5.0, 10.0)
+
+# Sized for parallel tool calls and batch lookups running on worker threads
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+http_session = requests.Session()
+http_session.mount("https://", _adapter)
+http_session.mount("http://", _adapter)
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the AsyncClient bound to the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+        _async_clients[loop] = client
+    return client
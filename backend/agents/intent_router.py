@@ -0,0 +1,224 @@
+"""
+Pre-LLM intent router for the chat endpoints.
+
+Questions like "show me the constructors standings", "Norris title odds" or
+"weather at Monza for qualifying" need exactly one local tool call, yet the
+ReAct agent spends two Gemini round-trips on them (pick the tool, then restate
+its output). route_intent() recognises these clear intents with keyword rules
+and the same fuzzy driver/circuit lookups the tools use. A routed question
+calls the tool directly and renders its output with a fixed template.
+
+The router is deliberately conservative. Anything long, multi-part,
+explanatory, about another season or about a race rather than the
+championship ("Leclerc chances of pole"), and anything whose leftover words
+are not just one driver or circuit name, returns None and goes to the agent
+as before.
+
+Routed turns are still written to the agent's checkpoint as the same
+Human / AI tool call / Tool / AI messages the agent would have produced, so
+history and later follow-up questions look the same either way.
+"""
+import os
+import re
+import asyncio
+from uuid import uuid4
+from typing import List, NamedTuple, Optional
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from agents.name_index import fold
+from agents.standings_store import get_standings
+from agents.circuit_index import find_circuit
+from agents.weather_forecast import SESSION_ALIASES, weekend_at
+from agents.standings_agent import get_f1_standings
+from agents.champ_estimate import get_championship_odds, get_championship_grid_odds
+from agents.weather_agent import get_weather_by_circuit_name, get_weather_for_circuits
+from agents.tool_blobs import compact_tool_message
+
+# INTENT_ROUTER=off sends every question to the agent
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER", "on").lower() != "off"
+
+# Longer questions usually carry more than one intent
+MAX_ROUTED_WORDS = 14
+
+# A driver name must make up the whole residue of a question this closely (exact key, prefix or
+# a misspelling); "hamilton monaco" or "norris podium" score lower and go to the agent
+STRICT_NAME_SCORE = 0.85
+
+# Words that ask for explanation, comparison, news or other seasons: leave those to the agent
+_AGENT_WORDS = {
+    "why", "explain", "news", "compare", "comparison", "vs", "versus", "should", "would", "could",
+    "history", "historical", "ever", "record", "records", "last", "previous", "ago", "since", "next",
+    "rumor", "rumors", "rumour", "rumours", "opinion", "think",
+}
+_YEAR = re.compile(r"^(19|20)\d{2}$")
+
+_STANDINGS_WORDS = {"standings", "standing", "leaderboard", "table", "classification"}
+_TEAM_WORDS = {"constructors", "constructor", "teams", "team", "wcc"}
+_ODDS_WORDS = {"odds", "chance", "chances", "probability", "likely", "likelihood"}
+_TITLE_WORDS = {"title", "championship", "champion", "wdc"}
+_WIN_WORDS = {"win", "winning", "wins"}
+# Words about a race, session or result rather than the championship; standings and odds questions
+# containing them ("Leclerc chances of pole", "Norris podium odds") go to the agent
+_EVENT_WORDS = {
+    "race", "races", "gp", "grand", "prix", "podium", "podiums", "pole", "poles", "qualifying", "quali",
+    "sprint", "lap", "laps", "fastest", "finish", "finishes", "dnf", "crash", "circuit", "track", "weekend",
+    "session", "practice", "beat", "beating", "ahead", "behind", "faster", "teammate", "home",
+}
+_WEATHER_WORDS = {"weather", "forecast", "rain", "raining", "rainy", "temperature", "wet", "windy", "sunny"}
+
+# Words that carry no driver or circuit name once the intent is known
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "in", "at", "for", "on", "to", "is", "are", "be", "it", "its", "there", "s",
+    "what", "whats", "who", "where", "which", "how", "much", "many", "does", "do", "did", "has", "have",
+    "can", "will", "still", "me", "show", "give", "tell", "get", "list", "please", "current", "currently",
+    "latest", "now", "today", "right", "this", "season", "year", "f1", "formula", "1", "world", "full",
+    "all", "top", "like", "going", "expected", "his", "her", "their", "position", "points", "place",
+    "drivers", "driver", "during", "starts", "start",
+} | _STANDINGS_WORDS | _TEAM_WORDS | _ODDS_WORDS | _TITLE_WORDS | _WIN_WORDS | _WEATHER_WORDS
+
+# Session names the router recognises in weather questions, longest first so "sprint qualifying"
+# beats "sprint". Short or ambiguous aliases ("q", "gp": usually the event, not the session) are left out.
+_SESSION_PHRASES = sorted(
+    [alias for alias in SESSION_ALIASES if len(alias) > 2 and alias != "grand prix"] + ["weekend"],
+    key=len, reverse=True,
+)
+
+
+class Route(NamedTuple):
+    intent: str
+    tool: object
+    args: dict
+    # Source line of the rendered answer
+    source: str
+
+
+def _words_without(words: List[str], drop) -> str:
+    return " ".join(w for w in words if w not in drop)
+
+
+def _driver_named(residue: str):
+    """The driver the residue names as a whole (exactly or misspelt), else None."""
+    driver, matches = get_standings().match_driver(residue)
+    if driver is None or not matches or matches[0].score < STRICT_NAME_SCORE:
+        return None
+    return driver
+
+
+def _standings_route(words: List[str]) -> Optional[Route]:
+    residue = _words_without(words, _FILLER_WORDS)
+    if not residue:
+        if any(w in _TEAM_WORDS for w in words):
+            args = {"query": "teams"}
+        elif "all" in words or "full" in words:
+            args = {"query": "all"}
+        else:
+            args = {"query": "drivers"}
+        return Route("standings", get_f1_standings, args, "Local F1 Data")
+    driver = _driver_named(residue)
+    if driver is None:
+        return None
+    return Route("standings", get_f1_standings, {"query": "drivers", "driver_name": driver.name}, "Local F1 Data")
+
+
+def _odds_route(words: List[str]) -> Optional[Route]:
+    residue = _words_without(words, _FILLER_WORDS)
+    if not residue:
+        return Route("odds", get_championship_grid_odds, {}, "Local F1 Data")
+    driver = _driver_named(residue)
+    if driver is None:
+        return None
+    return Route("odds", get_championship_odds, {"driver_name": driver.name}, "Local F1 Data")
+
+
+def _weather_route(text: str) -> Optional[Route]:
+    session = ""
+    for phrase in _SESSION_PHRASES:
+        padded = f" {text} "
+        if f" {phrase} " in padded:
+            session = phrase
+            text = padded.replace(f" {phrase} ", " ", 1).strip()
+            break
+    residue = _words_without(text.split(), _FILLER_WORDS)
+    if not residue:
+        return None
+
+    parts = [p.strip() for p in residue.split(" and ")]
+    circuits = []
+    for part in parts:
+        circuit, _ = find_circuit(part)
+        if circuit is None:
+            return None
+        circuits.append(circuit)
+
+    if len(circuits) > 1:
+        # Forecasts for several weekends at once are left to the agent
+        if session:
+            return None
+        return Route("weather", get_weather_for_circuits, {"circuit_names": [c.name for c in circuits]}, "OpenWeather")
+    # Without a calendar entry the forecast tool has nothing to look up; let the agent answer instead
+    if session and weekend_at(circuits[0]) is None:
+        return None
+    args = {"circuit_name": circuits[0].name}
+    if session:
+        args["session"] = session
+    return Route("weather", get_weather_by_circuit_name, args, "OpenWeather")
+
+
+def route_intent(query: str) -> Optional[Route]:
+    """Return the Route for a question one local tool can answer on its own, else None (use the agent)."""
+    if not INTENT_ROUTER_ENABLED:
+        return None
+    text = fold(query)
+    words = text.split()
+    if not words or len(words) > MAX_ROUTED_WORDS:
+        return None
+    if any(w in _AGENT_WORDS or _YEAR.match(w) for w in words):
+        return None
+
+    word_set = set(words)
+    if word_set & _WEATHER_WORDS:
+        return _weather_route(text)
+    if word_set & _EVENT_WORDS:
+        return None
+    # Odds only of the title: "likely to win" or "chances" alone may be about a race
+    if word_set & _TITLE_WORDS and word_set & (_ODDS_WORDS | _WIN_WORDS):
+        return _odds_route(words)
+    if word_set & _STANDINGS_WORDS:
+        return _standings_route(words)
+    return None
+
+
+def render_reply(route: Route, output: str) -> str:
+    """The answer shown to the user: the tool's output plus the Sources section the agent prompt asks for."""
+    return f"{output}\n\n**Sources**\n{route.source}"
+
+
+def turn_messages(query: str, route: Route, output: str) -> list:
+    """The messages of a routed turn, shaped like an agent turn with a single tool call."""
+    call_id = f"call_{uuid4().hex}"
+    return [
+        HumanMessage(content=query),
+        AIMessage(content="", tool_calls=[{"name": route.tool.name, "args": route.args, "id": call_id}]),
+        ToolMessage(content=output, name=route.tool.name, tool_call_id=call_id),
+        AIMessage(content=render_reply(route, output)),
+    ]
+
+
+def answer_routed(agent, route: Route, query: str, config: dict) -> list:
+    """
+    Run the route's tool and save the turn into the agent's checkpoint (as if the agent
+    node produced it, so the graph ends there; a long tool output is stored compacted, see
+    tool_blobs.py). Returns the turn's messages; the reply is the last.
+    """
+    output = route.tool.invoke(route.args)
+    messages = turn_messages(query, route, output)
+    stored = messages[:2] + [compact_tool_message(messages[2])] + messages[3:]
+    agent.update_state(config, {"messages": stored}, as_node="agent")
+    return messages
+
+
+async def aanswer_routed(agent, route: Route, query: str, config: dict) -> list:
+    output = await route.tool.ainvoke(route.args)
+    messages = turn_messages(query, route, output)
+    stored = messages[:2] + [await asyncio.to_thread(compact_tool_message, messages[2])] + messages[3:]
+    await agent.aupdate_state(config, {"messages": stored}, as_node="agent")
+    return messages
@@ -0,0 +1,199 @@
+"""
+Small fuzzy name index for tool lookups (drivers, teams, circuits).
+
+Names are accent-folded and lowercased, then indexed as whole keys (full name,
+codes, aliases and single name tokens) plus character trigrams. A query is
+scored against candidate keys by exact match, token prefix, trigram overlap and
+edit distance, so "VER", "Verstapen", "checo" or "Hulkenberg" all resolve
+without another LLM round-trip. Sizes here are tiny (tens of entries), so a
+lookup takes microseconds.
+"""
+import unicodedata
+from typing import Dict, Generic, Iterable, List, NamedTuple, Optional, Set, Tuple, TypeVar
+
+try:
+    # C implementation (pinned in requirements.txt); the pure-Python fallback below is ~50x slower
+    from rapidfuzz.distance import Levenshtein as _rapidfuzz_levenshtein
+except ImportError:
+    _rapidfuzz_levenshtein = None
+
+T = TypeVar("T")
+
+# Minimum score for a fuzzy hit to count as a match
+MIN_SCORE = 0.6
+
+# Keys (best trigram overlap first) that are also scored by edit distance
+EDIT_DISTANCE_CANDIDATES = 3
+
+# A runner-up this close to the best score makes the query ambiguous
+AMBIGUITY_MARGIN = 0.05
+
+# Candidates scoring below this are too far off to suggest
+SUGGESTION_MIN_SCORE = 0.45
+
+# Shorter single words are not mentions on their own: codes and short words ("had", "the", "de")
+# read as ordinary words in a sentence
+MENTION_MIN_CHARS = 4
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation/whitespace: "Pérez-Müller" -> "perez muller"."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    cleaned = "".join(c if c.isalnum() else " " for c in stripped.lower())
+    return " ".join(cleaned.split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a: str, b: str) -> int:
+    if _rapidfuzz_levenshtein is not None:
+        return _rapidfuzz_levenshtein.distance(a, b)
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def similarity(query: str, key: str, query_grams: Optional[Set[str]] = None, key_grams: Optional[Set[str]] = None) -> float:
+    """Best of trigram Dice coefficient and normalized edit distance, in [0, 1]."""
+    query_grams = query_grams if query_grams is not None else trigrams(query)
+    key_grams = key_grams if key_grams is not None else trigrams(key)
+    dice = 2.0 * len(query_grams & key_grams) / (len(query_grams) + len(key_grams))
+    edit = 1.0 - levenshtein(query, key) / max(len(query), len(key))
+    return max(dice, edit)
+
+
+class Match(NamedTuple):
+    item: object
+    score: float
+    key: str
+
+
+class NameIndex(Generic[T]):
+    """Maps folded names, codes and aliases to items and ranks fuzzy matches."""
+
+    def __init__(self):
+        self._items: List[T] = []
+        self._keys: Dict[str, Set[int]] = {}
+        self._key_grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Whole names and the last word of multi-word names ("sauber" of "kick sauber", not "kick")
+        self._tail_keys: Set[str] = set()
+
+    def add(self, item: T, names: Iterable[str]) -> None:
+        """Index `item` under every name given, plus each word of multi-word names."""
+        idx = len(self._items)
+        self._items.append(item)
+        for name in names:
+            folded = fold(name)
+            if not folded:
+                continue
+            self._tail_keys.update((folded, folded.split()[-1]))
+            for key in {folded, *folded.split()}:
+                self._keys.setdefault(key, set()).add(idx)
+                if key not in self._key_grams:
+                    grams = trigrams(key)
+                    self._key_grams[key] = grams
+                    for g in grams:
+                        self._postings.setdefault(g, set()).add(key)
+
+    def search(self, query: str, limit: int = 5) -> List[Match]:
+        """Return up to `limit` items ranked by their best-scoring key."""
+        q = fold(query)
+        if not q:
+            return []
+        best: Dict[int, Tuple[float, str]] = {}
+
+        def consider(key: str, score: float) -> None:
+            for idx in self._keys[key]:
+                if score > best.get(idx, (-1.0, ""))[0]:
+                    best[idx] = (score, key)
+
+        if q in self._keys:
+            consider(q, 1.0)
+
+        q_grams = trigrams(q)
+        candidates: Set[str] = set()
+        for g in q_grams:
+            candidates |= self._postings.get(g, set())
+        candidates.discard(q)
+
+        # Cheap trigram Dice for every candidate; edit distance only for the most promising few
+        dice_scores: List[Tuple[float, str]] = []
+        for key in candidates:
+            if len(q) >= 3 and key.startswith(q):
+                consider(key, 0.9)
+                continue
+            key_grams = self._key_grams[key]
+            dice_scores.append((2.0 * len(q_grams & key_grams) / (len(q_grams) + len(key_grams)), key))
+        dice_scores.sort(reverse=True)
+        for i, (dice, key) in enumerate(dice_scores):
+            if i < EDIT_DISTANCE_CANDIDATES:
+                dice = max(dice, 1.0 - levenshtein(q, key) / max(len(q), len(key)))
+            consider(key, dice)
+
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1][0], kv[0]))[:limit]
+        return [Match(self._items[idx], round(score, 3), key) for idx, (score, key) in ranked]
+
+    def resolve(self, query: str, limit: int = 5) -> Tuple[Optional[T], List[Match]]:
+        """
+        Return (item, candidates). item is None when nothing scores MIN_SCORE or when the
+        top candidates are too close to call; candidates lets the caller offer suggestions.
+        """
+        # Fast path: a unique exact key (name, code or alias) needs no fuzzy ranking
+        exact = self._keys.get(fold(query))
+        if exact and len(exact) == 1:
+            item = self._items[next(iter(exact))]
+            return item, [Match(item, 1.0, fold(query))]
+
+        matches = self.search(query, limit)
+        if not matches or matches[0].score < MIN_SCORE:
+            return None, matches
+        if len(matches) > 1 and matches[1].score >= matches[0].score - AMBIGUITY_MARGIN:
+            return None, [m for m in matches if m.score >= MIN_SCORE]
+        return matches[0].item, matches
+
+    def mentions(self, text: str, inner_words: bool = True, max_words: int = 4) -> List[T]:
+        """
+        Items named verbatim in free text, in order of first mention: runs of up to `max_words`
+        words that are a key of exactly one item, longest first ("red bull" before "red").
+        A single word counts from MENTION_MIN_CHARS characters, and with inner_words=False only
+        when it is a whole name or the last word of one (sponsor and descriptive words such as
+        "visa" or "autodromo" lead a name). No fuzzy matching.
+        """
+        words = fold(text).split()
+        taken = [False] * len(words)
+        found: List[Tuple[int, int]] = []
+        for n in range(min(max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                if any(taken[i:i + n]) or (n == 1 and not self._single_word_mention(words[i], inner_words)):
+                    continue
+                idxs = self._keys.get(" ".join(words[i:i + n]))
+                if idxs and len(idxs) == 1:
+                    found.append((i, next(iter(idxs))))
+                    taken[i:i + n] = [True] * n
+        seen: Set[int] = set()
+        items: List[T] = []
+        for _, idx in sorted(found):
+            if idx not in seen:
+                seen.add(idx)
+                items.append(self._items[idx])
+        return items
+
+    def _single_word_mention(self, word: str, inner_words: bool) -> bool:
+        return len(word) >= MENTION_MIN_CHARS and (inner_words or word in self._tail_keys)
+
+
+def suggestion_text(candidates: List[Match]) -> str:
+    """Render ranked candidates (items with a .name) as " Did you mean: A, B?" (empty when none are close)."""
+    names = [m.item.name for m in candidates[:3] if m.score >= SUGGESTION_MIN_SCORE]
+    return f" Did you mean: {', '.join(names)}?" if names else ""
@@ -0,0 +1,174 @@
+"""
+Persistent cache of championship simulation results.
+
+Entries are keyed by the SHA-256 of driver_standing.json plus
+(total_races, races_done, simulations, seed) and stored as small JSON files,
+so every worker process and restart reuses them. When the scraper rewrites the
+standings the fingerprint changes, old keys stop matching and their files are
+pruned on the next write.
+
+Warm the cache after scraping (run from the backend directory):
+    python -m agents.odds_cache
+"""
+import os
+import json
+import tempfile
+from typing import Dict, Optional
+import numpy as np
+from agents.odds_engine import (
+    SHARDED_MIN_SIMULATIONS,
+    DEFAULT_TARGET_HALF_WIDTH,
+    resolve_races_done,
+    run_adaptive_championship_simulation,
+    run_championship_simulation,
+    run_sharded_championship_simulation,
+)
+from agents.standings_store import get_standings
+
+_default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraped_data", "odds_cache")
+ODDS_CACHE_DIR = os.getenv("ODDS_CACHE_DIR", _default_dir)
+
+# Length of the fingerprint prefix used in file names (64 bits is plenty to tell snapshots apart)
+_FINGERPRINT_PREFIX = 16
+
+# Wall-clock budget (seconds) for sharded runs; they stop adding shards once it is spent
+ODDS_TIME_BUDGET = float(os.getenv("ODDS_TIME_BUDGET", "30"))
+
+# Sharded runs also stop once the 95% interval on the title odds is this narrow (0.001 = ±0.1 points)
+ODDS_TARGET_HALF_WIDTH = float(os.getenv("ODDS_TARGET_HALF_WIDTH", "0.001"))
+
+# Entries already read by this process, so repeated tool calls skip the disk
+_memory: Dict[str, dict] = {}
+
+
+def cache_key(fingerprint: str, total_races: int, races_done: int, simulations: int, seed: Optional[int] = None,
+              target_half_width: Optional[float] = None, driver_idx: Optional[int] = None) -> str:
+    """
+    Build the cache key; runs without an explicit seed share the 'any' slot.
+    Adaptive runs stop on a precision target for one driver (or all), so both are part of their key.
+    """
+    seed_part = "any" if seed is None else str(int(seed))
+    key = f"{fingerprint[:_FINGERPRINT_PREFIX]}-{int(total_races)}-{int(races_done)}-{int(simulations)}-{seed_part}"
+    if target_half_width:
+        key += f"-hw{float(target_half_width):g}-{'all' if driver_idx is None else int(driver_idx)}"
+    return key
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(ODDS_CACHE_DIR, f"{key}.json")
+
+
+def load_cached_simulation(key: str) -> Optional[dict]:
+    """Return a cached simulation result (same shape as run_championship_simulation) or None."""
+    if key in _memory:
+        return _memory[key]
+    try:
+        with open(_entry_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    result = {
+        "wins": np.array(entry["wins"], dtype=np.float64),
+        "points_sum": np.array(entry["points_sum"], dtype=np.float64),
+        "position_counts": np.array(entry["position_counts"], dtype=np.int64),
+        "simulations": int(entry["simulations"]),
+    }
+    _memory[key] = result
+    return result
+
+
+def _prune(fingerprint: str) -> None:
+    """Drop entries (in memory and on disk) that belong to other standings snapshots."""
+    prefix = fingerprint[:_FINGERPRINT_PREFIX]
+    for key in [k for k in _memory if not k.startswith(prefix)]:
+        _memory.pop(key, None)
+    try:
+        names = os.listdir(ODDS_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith(".json") and not name.startswith(prefix):
+            try:
+                os.remove(os.path.join(ODDS_CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def store_cached_simulation(key: str, fingerprint: str, result: dict) -> None:
+    """Write a result atomically (temp file + rename) so concurrent readers never see partial JSON."""
+    _memory[key] = result
+    entry = {
+        "standings_sha256": fingerprint,
+        "wins": result["wins"].tolist(),
+        "points_sum": result["points_sum"].tolist(),
+        "position_counts": result["position_counts"].tolist(),
+        "simulations": int(result["simulations"]),
+    }
+    try:
+        os.makedirs(ODDS_CACHE_DIR, exist_ok=True)
+        _prune(fingerprint)
+        fd, tmp_path = tempfile.mkstemp(dir=ODDS_CACHE_DIR, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _entry_path(key))
+    except OSError as e:
+        # A read-only or full disk only costs us the cache, never the answer
+        print(f"Could not write odds cache entry {key}: {e}")
+
+
+def cached_championship_simulation(fingerprint: str, base_points: np.ndarray, total_races: int, races_done: int,
+                                   simulations: int, seed: Optional[int] = None,
+                                   driver_idx: Optional[int] = None,
+                                   target_half_width: Optional[float] = None) -> dict:
+    """
+    Return the simulation result for this standings snapshot and parameters,
+    running (and storing) it only on a cache miss.
+    - Runs of SHARDED_MIN_SIMULATIONS or more are sharded across processes and stop early on
+      ODDS_TIME_BUDGET or on target_half_width (ODDS_TARGET_HALF_WIDTH when none is given: a large
+      run is an explicit request for precision).
+    - Smaller runs with a target_half_width are adaptive and stop once that precision is reached.
+    Either way `result["simulations"]` can be lower than requested.
+    """
+    sharded = simulations >= SHARDED_MIN_SIMULATIONS
+    if sharded:
+        target_half_width = target_half_width or ODDS_TARGET_HALF_WIDTH
+    # Runs stop on target_half_width for driver_idx, so they are keyed by both
+    key = cache_key(fingerprint, total_races, races_done, simulations, seed, target_half_width, driver_idx)
+    result = load_cached_simulation(key)
+    if result is None:
+        remaining = total_races - races_done
+        if sharded:
+            result = run_sharded_championship_simulation(
+                base_points, remaining, simulations, seed,
+                time_budget=ODDS_TIME_BUDGET, target_half_width=target_half_width,
+                driver_idx=driver_idx,
+            )
+        elif target_half_width:
+            result = run_adaptive_championship_simulation(
+                base_points, remaining, simulations, target_half_width, seed, driver_idx,
+            )
+        else:
+            result = run_championship_simulation(base_points, remaining, simulations, seed)
+        store_cached_simulation(key, fingerprint, result)
+    return result
+
+
+def warm_odds_cache(total_races: int = 24, races_done: Optional[int] = None, simulations: int = 1000) -> int:
+    """
+    Precompute the runs behind the odds tools' default arguments (the whole grid plus
+    every single driver) for the current standings file. Returns the number of entries warmed.
+    """
+    standings = get_standings()
+    drivers = standings.drivers
+    races_done, _ = resolve_races_done(races_done)
+    base_points = np.array([d.points for d in drivers], dtype=np.float64)
+    for driver_idx in [None] + list(range(len(drivers))):
+        cached_championship_simulation(standings.driver_fingerprint, base_points, total_races, races_done, simulations,
+                                       driver_idx=driver_idx, target_half_width=DEFAULT_TARGET_HALF_WIDTH)
+    return len(drivers) + 1
+
+
+if __name__ == "__main__":
+    count = warm_odds_cache()
+    print(f"✅ Odds cache warmed: {count} entries")
@@ -0,0 +1,241 @@
+"""
+NumPy Monte Carlo engine for championship odds.
+Kept free of LangChain imports so it can run in the scraper job and worker processes.
+"""
+import os
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+
+# Standard F1 points for positions 1-10
+POINTS_SCHEME = np.array([25, 18, 15, 12, 10, 8, 6, 4, 2, 1], dtype=np.float64)
+
+# Simulations processed per NumPy batch (bounds peak memory to a few tens of MB)
+SIM_BATCH_SIZE = 20_000
+
+# Default precision target for adaptive runs: stop once the 95% interval is within ±1 percentage point
+DEFAULT_TARGET_HALF_WIDTH = 0.01
+
+# First batch of an adaptive run; later batches double up to SIM_BATCH_SIZE
+ADAPTIVE_BATCH_SIZE = 250
+
+# Runs at or above this many simulations are split into shards across a process pool
+SHARDED_MIN_SIMULATIONS = int(os.getenv("ODDS_SHARDED_MIN_SIMULATIONS", "1000000"))
+
+# Default number of shards for a sharded run (fixing it keeps seeded results reproducible across machines)
+DEFAULT_SHARDS = int(os.getenv("ODDS_SHARDS", "16"))
+
+
+def simulate_final_points(base_points: np.ndarray, remaining: int, simulations: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Simulate the remaining races of `simulations` seasons in one batch.
+    Returns a (simulations, drivers) array of final championship points.
+
+    Finishing orders follow the Plackett-Luce model with weight `points + 1`, i.e. the same
+    distribution as picking drivers one by one with probability proportional to their weight.
+    Each driver draws an exponential "arrival time" scaled by 1 / weight and the race is
+    finished in order of arrival, which samples every (simulation, race) pair in a single argsort.
+    """
+    base_points = np.asarray(base_points, dtype=np.float64)
+    n_drivers = base_points.size
+    scored = min(len(POINTS_SCHEME), n_drivers)
+    if remaining <= 0 or simulations <= 0:
+        return np.tile(base_points, (max(simulations, 0), 1))
+
+    weights = (base_points + 1.0).astype(np.float32)
+    keys = rng.standard_exponential((simulations, remaining, n_drivers), dtype=np.float32)
+    keys /= weights
+    # Driver indices of the top finishers of every race: (simulations, remaining, scored)
+    podium = np.argsort(keys, axis=-1)[..., :scored]
+
+    # Sum race points per (simulation, driver) with one bincount over flattened indices
+    podium += (np.arange(simulations) * n_drivers)[:, None, None]
+    awarded = np.broadcast_to(POINTS_SCHEME[:scored], podium.shape)
+    race_points = np.bincount(podium.ravel(), weights=awarded.ravel(), minlength=simulations * n_drivers)
+    return base_points + race_points.reshape(simulations, n_drivers)
+
+
+def championship_win_shares(final_points: np.ndarray) -> np.ndarray:
+    """
+    Count championship wins per driver over simulated seasons.
+    Ties for the title are split evenly, so a two-way tie gives each driver 0.5 of a win.
+    """
+    leaders = final_points == final_points.max(axis=1, keepdims=True)
+    return (leaders / leaders.sum(axis=1, keepdims=True)).sum(axis=0)
+
+
+def run_championship_simulation(base_points: np.ndarray, remaining: int, simulations: int,
+                                seed: Union[int, np.random.SeedSequence, np.random.Generator, None] = None) -> Dict[str, np.ndarray]:
+    """
+    Run the full Monte Carlo once and keep the results for every driver.
+    `seed` may also be a Generator, which is used as-is (lets callers continue one random stream).
+    Returns a dict with:
+      wins: (drivers,) fractional title wins
+      points_sum: (drivers,) sum of final points (divide by simulations for the expectation)
+      position_counts: (drivers, drivers) how often driver i finished the season in position j
+      simulations: number of simulated seasons
+    Final-standings ties are broken by the current standings order.
+    """
+    base_points = np.asarray(base_points, dtype=np.float64)
+    n_drivers = base_points.size
+    rng = np.random.default_rng(seed)
+
+    wins = np.zeros(n_drivers)
+    points_sum = np.zeros(n_drivers)
+    position_counts = np.zeros(n_drivers * n_drivers, dtype=np.int64)
+    for start in range(0, simulations, SIM_BATCH_SIZE):
+        batch = min(SIM_BATCH_SIZE, simulations - start)
+        final_points = simulate_final_points(base_points, remaining, batch, rng)
+        wins += championship_win_shares(final_points)
+        points_sum += final_points.sum(axis=0)
+        # standings[s, p] = driver finishing the season in position p of simulation s
+        standings = np.argsort(-final_points, axis=1, kind="stable")
+        flat = standings * n_drivers + np.arange(n_drivers)
+        position_counts += np.bincount(flat.ravel(), minlength=n_drivers * n_drivers)
+
+    return {
+        "wins": wins,
+        "points_sum": points_sum,
+        "position_counts": position_counts.reshape(n_drivers, n_drivers),
+        "simulations": simulations,
+    }
+
+
+def wilson_interval(successes: np.ndarray, trials: int, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilson score interval for a win rate (95% by default). Works element-wise on arrays,
+    and stays sensible for rates near 0% or 100% where the normal approximation breaks down.
+    """
+    successes = np.asarray(successes, dtype=np.float64)
+    if trials <= 0:
+        return np.zeros_like(successes), np.ones_like(successes)
+    p = successes / trials
+    denom = 1.0 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * np.sqrt(p * (1.0 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return np.clip(centre - half, 0.0, 1.0), np.clip(centre + half, 0.0, 1.0)
+
+
+def merge_simulation_results(results: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Add up independent simulation results (e.g. shards) into one result of the same shape."""
+    merged = {
+        "wins": sum(r["wins"] for r in results),
+        "points_sum": sum(r["points_sum"] for r in results),
+        "position_counts": sum(r["position_counts"] for r in results),
+        "simulations": sum(r["simulations"] for r in results),
+    }
+    return merged
+
+
+def run_adaptive_championship_simulation(base_points: np.ndarray, remaining: int, max_simulations: int,
+                                         target_half_width: float, seed: Optional[int] = None,
+                                         driver_idx: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Simulate in growing batches and stop as soon as the 95% Wilson interval half-width of the
+    title odds is at most target_half_width (for driver_idx, or the widest driver when None),
+    or max_simulations is reached. Clear-cut cases (a runaway leader, a 0.01% outsider) settle
+    after a few hundred seasons instead of the full budget.
+
+    Deterministic for a given seed. Returns the merged result plus `ci_low` and `ci_high`.
+    """
+    rng = np.random.default_rng(seed)
+    batch = ADAPTIVE_BATCH_SIZE
+    merged = None
+    while merged is None or merged["simulations"] < max_simulations:
+        size = min(batch, max_simulations - (merged["simulations"] if merged else 0))
+        result = run_championship_simulation(base_points, remaining, size, rng)
+        merged = result if merged is None else merge_simulation_results([merged, result])
+
+        low, high = wilson_interval(merged["wins"], merged["simulations"])
+        half_width = (high - low) / 2.0
+        widest = half_width[driver_idx] if driver_idx is not None else half_width.max()
+        if widest <= target_half_width:
+            break
+        batch = min(batch * 2, SIM_BATCH_SIZE)
+
+    merged["ci_low"], merged["ci_high"] = low, high
+    return merged
+
+
+def _run_shard(args: Tuple[np.ndarray, int, int, np.random.SeedSequence]) -> Dict[str, np.ndarray]:
+    # Top-level so it can be pickled into pool workers
+    base_points, remaining, simulations, seed_seq = args
+    return run_championship_simulation(base_points, remaining, simulations, seed_seq)
+
+
+def run_sharded_championship_simulation(base_points: np.ndarray, remaining: int, simulations: int,
+                                        seed: Optional[int] = None, shards: int = DEFAULT_SHARDS,
+                                        workers: Optional[int] = None, time_budget: Optional[float] = None,
+                                        target_half_width: Optional[float] = None,
+                                        driver_idx: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Split `simulations` into `shards` independently seeded shards and run them on a process pool.
+
+    Shard i always gets the i-th child of SeedSequence(seed) and shards are merged in index order.
+    The run stops early
+    - after the first shard (in index order) that brings the 95% Wilson interval half-width of the
+      title odds to target_half_width or below (for driver_idx, or the widest driver when None);
+      shards of the same wave past it are dropped, so this stop does not depend on `workers`
+    - when time_budget (seconds) would be exceeded by another wave of `workers` shards
+    Without a time_budget, a given (seed, shards, target_half_width, driver_idx) always gives the same
+    result. A time_budget stop depends on the machine and its load; the result is still the prefix of
+    `shards_used` shards.
+
+    Returns the merged result plus `shards_used`, `ci_low` and `ci_high` (per-driver win-rate bounds).
+    """
+    base_points = np.asarray(base_points, dtype=np.float64)
+    shards = max(1, min(int(shards), simulations))
+    workers = max(1, min(workers or os.cpu_count() or 1, shards))
+    sizes = [simulations // shards + (1 if i < simulations % shards else 0) for i in range(shards)]
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+
+    started = time.monotonic()
+    shards_used = 0
+    merged = None
+    precise = False
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for wave_start in range(0, shards, workers):
+            wave_began = time.monotonic()
+            wave = range(wave_start, min(wave_start + workers, shards))
+            for result in pool.map(_run_shard, [(base_points, remaining, sizes[i], seeds[i]) for i in wave]):
+                merged = result if merged is None else merge_simulation_results([merged, result])
+                shards_used += 1
+                low, high = wilson_interval(merged["wins"], merged["simulations"])
+                half_width = (high - low) / 2.0
+                widest = half_width[driver_idx] if driver_idx is not None else half_width.max()
+                if target_half_width is not None and widest <= target_half_width:
+                    precise = True
+                    break
+            if precise:
+                break
+            wave_seconds = time.monotonic() - wave_began
+            if time_budget is not None and time.monotonic() - started + wave_seconds > time_budget:
+                break
+
+    merged["shards_used"] = shards_used
+    merged["ci_low"], merged["ci_high"] = low, high
+    return merged
+
+
+def resolve_races_done(races_done: Optional[int]) -> Tuple[int, bool]:
+    """
+    Return (races_done, auto_notice). If races_done wasn't provided, try to read it from
+    a scraped season metadata file; auto_notice is True when falling back to the old default.
+    """
+    if races_done is not None:
+        return races_done, False
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    season_meta_path = os.path.join(base_path, "..", "scraped_data", "season_meta.json")
+    try:
+        with open(season_meta_path, "r", encoding="utf-8") as smf:
+            meta = json.load(smf)
+            # Accept multiple possible keys
+            return int(meta.get("races_done") or meta.get("completed_races") or meta.get("current_round") or 0), False
+    except FileNotFoundError:
+        # fallback to previous default (keeps backward compatibility)
+        return 18, True
+    except Exception:
+        return 18, True
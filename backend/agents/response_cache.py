@@ -0,0 +1,276 @@
+"""
+Response cache for the opening question of a chat session.
+
+Many sessions open with the same question ("who leads the championship?"),
+and each one used to cost a full agent run with its tool calls. A first turn
+has no conversational context, so its answer depends only on the question and
+on the data behind it. ResponseCache stores the agent's reply under:
+- the folded question (case, accents, punctuation and spacing ignored, word
+  order kept: "Is Hamilton faster than Leclerc?" and "is leclerc faster than
+  hamilton" are different questions)
+- a data fingerprint: the standings file hash plus a time bucket sized like
+  the search cache TTLs (minutes for live/news questions, half an hour for the
+  current season, a week for past seasons, ten minutes for weather)
+
+Questions that are worded differently but mean the same thing are matched by
+embedding similarity (cosine >= RESPONSE_CACHE_SIMILARITY) against the cached
+questions with the same fingerprint. Embeddings barely tell "Hamilton at Monza"
+from "Leclerc at Monza", so a similar question is only served when it names the
+same drivers, teams and circuits, in the same order within each kind. The
+vectors are kept per process; the replies live in a ToolCache backend
+(in-process or Mongo, see tool_cache.py).
+
+Hit rates are counted per kind (exact / semantic) and logged every
+RESPONSE_CACHE_LOG_EVERY lookups.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from agents.circuit_index import CIRCUITS
+from agents.name_index import fold
+from agents.standings_store import get_standings
+from agents.tool_cache import ToolCache, make_backend
+from agents.weather_service import WEATHER_TTL
+from agents.web_search_agent import search_ttl
+
+# RESPONSE_CACHE=off disables the cache; RESPONSE_CACHE_EMBEDDINGS=off keeps exact matching only
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "on").lower() != "off"
+EMBEDDINGS_ENABLED = os.getenv("RESPONSE_CACHE_EMBEDDINGS", "on").lower() != "off"
+EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "models/text-embedding-004")
+
+# Cosine similarity above which two questions count as the same question
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.93"))
+
+# Question vectors kept per process
+MAX_VECTORS = int(os.getenv("RESPONSE_CACHE_MAX_VECTORS", "4096"))
+
+LOG_EVERY = int(os.getenv("RESPONSE_CACHE_LOG_EVERY", "100"))
+
+_WEATHER_WORDS = {"weather", "forecast", "rain", "raining", "temperature", "wet", "windy", "sunny"}
+
+
+def question_entities(normalized: str) -> Tuple[Tuple[str, ...], ...]:
+    """
+    The drivers, teams and circuits a question names, each in order of mention. A first name
+    alone names a driver; the leading words of team and circuit names are sponsors or
+    descriptions ("Kick", "Autodromo") and need the rest of the name (see NameIndex.mentions).
+    """
+    standings = get_standings()
+    return (
+        tuple(d.name for d in standings.driver_index.mentions(normalized)),
+        tuple(t.name for t in standings.team_index.mentions(normalized, inner_words=False)),
+        tuple(c.id for c in CIRCUITS.name_index.mentions(normalized, inner_words=False)),
+    )
+
+
+class CacheProbe(NamedTuple):
+    key: str
+    fingerprint: str
+    # Seconds until the fingerprint's time bucket ends
+    ttl: float
+    # Unit-length question embedding (None when embeddings are off or failed)
+    vector: Optional[np.ndarray]
+    # Drivers, teams and circuits the question names (see question_entities)
+    entities: Tuple[Tuple[str, ...], ...]
+    # Cached reply and how it was found ("exact" or "semantic"); None on a miss
+    reply: Optional[str]
+    kind: Optional[str]
+
+
+class ResponseCache:
+    def __init__(self, cache: ToolCache, embed=None, aembed=None):
+        self.cache = cache
+        self._embed = embed
+        self._aembed = aembed
+        self._lock = threading.Lock()
+        # fingerprint -> (matrix of unit vectors, cache keys, bucket end, entities per key)
+        self._vectors: Dict[str, tuple] = {}
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+
+    # --- keys ---
+
+    def _bucket(self, normalized: str) -> int:
+        if set(normalized.split()) & _WEATHER_WORDS:
+            return WEATHER_TTL
+        return search_ttl(normalized)
+
+    def _key(self, query: str):
+        normalized = fold(query)
+        bucket = self._bucket(normalized)
+        now = time.time()
+        index = int(now // bucket)
+        # Driver points drive the team totals too, so the driver file hash covers both standings files
+        fingerprint = f"{get_standings().driver_fingerprint[:16]}:{bucket}:{index}"
+        key = hashlib.sha256(f"{fingerprint}|{normalized}".encode("utf-8")).hexdigest()
+        return key, fingerprint, (index + 1) * bucket - now
+
+    # --- semantic index ---
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else None
+
+    def _nearest(self, fingerprint: str, vector: np.ndarray, entities: tuple) -> Optional[str]:
+        group = self._vectors.get(fingerprint)
+        if group is None:
+            return None
+        matrix, keys, _, named = group
+        same = [i for i, e in enumerate(named) if e == entities]
+        if not same:
+            return None
+        scores = matrix[same] @ vector
+        best = int(np.argmax(scores))
+        return keys[same[best]] if scores[best] >= SIMILARITY_THRESHOLD else None
+
+    def _remember(self, probe: CacheProbe) -> None:
+        now = time.time()
+        with self._lock:
+            # Buckets that ended can never be hit again
+            for fingerprint in [f for f, g in self._vectors.items() if g[2] <= now]:
+                del self._vectors[fingerprint]
+            matrix, keys, ends, named = self._vectors.get(
+                probe.fingerprint, (np.empty((0, probe.vector.size), np.float32), [], now + probe.ttl, []))
+            if probe.key in keys or matrix.shape[1] != probe.vector.size:
+                return
+            if sum(len(g[1]) for g in self._vectors.values()) >= MAX_VECTORS:
+                # Drop the group closest to expiry rather than growing without bound
+                del self._vectors[min(self._vectors, key=lambda f: self._vectors[f][2])]
+            self._vectors[probe.fingerprint] = (np.vstack([matrix, probe.vector]), keys + [probe.key], ends,
+                                                named + [probe.entities])
+
+    # --- lookups ---
+
+    def _count(self, kind: Optional[str]) -> None:
+        with self._lock:
+            self.lookups += 1
+            if kind == "exact":
+                self.exact_hits += 1
+            elif kind == "semantic":
+                self.semantic_hits += 1
+            report = LOG_EVERY > 0 and self.lookups % LOG_EVERY == 0
+        if report:
+            print(f"Response cache: {self.hit_rate_text()}")
+
+    def hit_rate_text(self) -> str:
+        hits = self.exact_hits + self.semantic_hits
+        rate = hits / self.lookups * 100 if self.lookups else 0.0
+        return f"{hits}/{self.lookups} hits ({rate:.1f}%; {self.exact_hits} exact, {self.semantic_hits} semantic)"
+
+    def _embedding_failed(self, e: Exception) -> None:
+        print(f"Response cache: embedding failed, exact matching only for this question: {e}")
+
+    def lookup(self, query: str) -> CacheProbe:
+        """Look a first-turn question up; pass the returned probe to store() after a miss."""
+        key, fingerprint, ttl = self._key(query)
+        reply = self.cache.get(key)
+        if reply is not None:
+            self._count("exact")
+            return CacheProbe(key, fingerprint, ttl, None, (), reply, "exact")
+        vector = None
+        if self._embed is not None:
+            try:
+                vector = self._unit(self._embed(query))
+            except Exception as e:
+                self._embedding_failed(e)
+        return self._semantic_lookup(key, fingerprint, ttl, vector, question_entities(fold(query)))
+
+    async def alookup(self, query: str) -> CacheProbe:
+        key, fingerprint, ttl = self._key(query)
+        reply = await self._aget(key)
+        if reply is not None:
+            self._count("exact")
+            return CacheProbe(key, fingerprint, ttl, None, (), reply, "exact")
+        vector = None
+        if self._aembed is not None:
+            try:
+                vector = self._unit(await self._aembed(query))
+            except Exception as e:
+                self._embedding_failed(e)
+        return await self._asemantic_lookup(key, fingerprint, ttl, vector, question_entities(fold(query)))
+
+    def _semantic_lookup(self, key, fingerprint, ttl, vector, entities) -> CacheProbe:
+        similar = self._nearest(fingerprint, vector, entities) if vector is not None else None
+        reply = self.cache.get(similar) if similar else None
+        self._count("semantic" if reply is not None else None)
+        return CacheProbe(key, fingerprint, ttl, vector, entities, reply, "semantic" if reply is not None else None)
+
+    async def _asemantic_lookup(self, key, fingerprint, ttl, vector, entities) -> CacheProbe:
+        similar = self._nearest(fingerprint, vector, entities) if vector is not None else None
+        reply = await self._aget(similar) if similar else None
+        self._count("semantic" if reply is not None else None)
+        return CacheProbe(key, fingerprint, ttl, vector, entities, reply, "semantic" if reply is not None else None)
+
+    async def _aget(self, key: str):
+        if self.cache.backend.blocking:
+            return await asyncio.to_thread(self.cache.get, key)
+        return self.cache.get(key)
+
+    def store(self, probe: CacheProbe, reply: str) -> None:
+        """Cache the agent's reply to a missed question until its fingerprint's bucket ends."""
+        # Gemini replies made of content parts are left uncached
+        if not reply or not isinstance(reply, str) or probe.reply is not None:
+            return
+        self.cache.put(probe.key, reply, probe.ttl)
+        if probe.vector is not None:
+            self._remember(probe)
+
+    async def astore(self, probe: CacheProbe, reply: str) -> None:
+        if self.cache.backend.blocking:
+            await asyncio.to_thread(self.store, probe, reply)
+        else:
+            self.store(probe, reply)
+
+
+def _embedding_functions():
+    if not EMBEDDINGS_ENABLED:
+        return None, None
+    try:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    except Exception as e:
+        print(f"Response cache: embeddings unavailable, exact matching only: {e}")
+        return None, None
+    return embeddings.embed_query, embeddings.aembed_query
+
+
+response_cache = ResponseCache(ToolCache("Responses", make_backend("ResponseCache")), *_embedding_functions())
+
+
+def has_context(session_doc: dict) -> bool:
+    """Whether a session already has turns; the title is set on the first one (see app.session_title_update)."""
+    return "title" in session_doc
+
+
+def lookup_first_turn(session_doc: dict, query: str) -> Optional[CacheProbe]:
+    """Probe the cache for the first turn of a session; None when the cache does not apply."""
+    if not RESPONSE_CACHE_ENABLED or has_context(session_doc):
+        return None
+    return response_cache.lookup(query)
+
+
+async def alookup_first_turn(session_doc: dict, query: str) -> Optional[CacheProbe]:
+    if not RESPONSE_CACHE_ENABLED or has_context(session_doc):
+        return None
+    return await response_cache.alookup(query)
+
+
+def cached_turn_messages(query: str, reply: str) -> List:
+    return [HumanMessage(content=query), AIMessage(content=reply)]
+
+
+def record_cached_turn(agent, query: str, reply: str, config: dict) -> None:
+    """Save a cache hit into the agent's checkpoint, so the session history shows the turn."""
+    agent.update_state(config, {"messages": cached_turn_messages(query, reply)}, as_node="agent")
+
+
+async def arecord_cached_turn(agent, query: str, reply: str, config: dict) -> None:
+    await agent.aupdate_state(config, {"messages": cached_turn_messages(query, reply)}, as_node="agent")
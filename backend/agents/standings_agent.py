@@ -1,50 +1,42 @@
 from langchain.tools import tool
-import os
-import json
+from agents.standings_store import get_standings, format_points, suggestion_text
 
 @tool
 def get_f1_standings(query: str = "drivers", driver_name: str = "", top: int = 10) -> str:
     """
     Retrieve F1 driver or team standings from local scraped data.
     - query: "drivers" (default) or "teams"
-    - driver_name: if provided, returns only that driver's standing
+    - driver_name: if provided, returns only that driver's standing. Accepts full names, surnames,
+      first names, three-letter codes ("VER"), nicknames ("Checo") and small misspellings
     - top: if query is "drivers", returns top N drivers (default 10); if "all", returns all drivers
     """
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    driver_path = os.path.join(base_path, "..", "scraped_data", "driver_standing.json")
-    team_path = os.path.join(base_path, "..", "scraped_data", "team_standing.json")
+    standings = get_standings()
 
     if query.lower() == "teams":
-        with open(team_path, "r", encoding="utf-8") as f:
-            teams = json.load(f)
         lines = ["🏆 **F1 Constructors' Standings**"]
-        for t in teams[:10]:
-            lines.append(f"{t['POS.']}. {t['TEAM']} — {t['PTS.']} pts")
+        for t in standings.teams[:10]:
+            lines.append(f"{t.position}. {t.name} — {format_points(t.points)} pts")
         return "\n".join(lines)
 
     # Default: drivers
-    with open(driver_path, "r", encoding="utf-8") as f:
-        drivers = json.load(f)
-
     if driver_name:
-        found = [d for d in drivers if driver_name.lower() in d['DRIVER'].lower()]
-        if not found:
-            return f"No driver found for '{driver_name}'."
-        d = found[0]
+        d, candidates = standings.match_driver(driver_name)
+        if not d:
+            return f"No driver found for '{driver_name}'.{suggestion_text(candidates)}"
         return (
-            f"**{d['DRIVER']}**\n"
-            f"- Position: {d['POS.']}\n"
-            f"- Team: {d['TEAM']}\n"
-            f"- Nationality: {d['NATIONALITY']}\n"
-            f"- Points: {d['PTS.']}"
+            f"**{d.name}**\n"
+            f"- Position: {d.position}\n"
+            f"- Team: {d.team}\n"
+            f"- Nationality: {d.nationality}\n"
+            f"- Points: {format_points(d.points)}"
         )
 
     # If 'all' in query, return all drivers
     if "all" in query.lower():
-        show = drivers
+        show = standings.drivers
     else:
-        show = drivers[:top]
+        show = standings.drivers[:top]
     lines = ["🏁 **F1 Drivers' Standings**"]
     for d in show:
-        lines.append(f"{d['POS.']}. {d['DRIVER']} ({d['TEAM']}) — {d['PTS.']} pts")
+        lines.append(f"{d.position}. {d.name} ({d.team}) — {format_points(d.points)} pts")
     return "\n".join(lines)
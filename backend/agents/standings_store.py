@@ -0,0 +1,220 @@
+"""
+In-memory store for the scraped driver and team standings.
+
+The JSON files are parsed once into compact, typed records with lookup indexes.
+Every call to get_standings() only stats the files; they are re-read when the
+mtime or size changes, and the indexes are rebuilt only if the content hash
+changed too. Tools therefore serve lookups from memory on every invocation.
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from agents.name_index import Match, NameIndex, fold, suggestion_text
+
+_base_path = os.path.dirname(os.path.abspath(__file__))
+DRIVER_STANDINGS_PATH = os.path.join(_base_path, "..", "scraped_data", "driver_standing.json")
+TEAM_STANDINGS_PATH = os.path.join(_base_path, "..", "scraped_data", "team_standing.json")
+
+# Nicknames and official codes that can't be derived from the name (keys are folded full names)
+DRIVER_ALIASES: Dict[str, List[str]] = {
+    "max verstappen": ["mad max", "super max"],
+    "sergio perez": ["checo"],
+    "nico hulkenberg": ["hulk"],
+    "kimi antonelli": ["andrea kimi antonelli"],
+    "carlos sainz": ["smooth operator"],
+    "zhou guanyu": ["ZHO", "guanyu zhou"],
+    "nyck de vries": ["DEV"],
+}
+
+TEAM_ALIASES: Dict[str, List[str]] = {
+    "red bull racing": ["red bull", "rbr"],
+    "racing bulls": ["rb", "vcarb", "visa cash app rb"],
+    "kick sauber": ["sauber", "stake"],
+    "aston martin": ["aston", "amr"],
+    "mercedes": ["merc", "mercedes amg"],
+    "ferrari": ["scuderia ferrari"],
+    "haas": ["haas f1"],
+    "mclaren": ["papaya"],
+}
+
+
+class DriverStanding(NamedTuple):
+    position: int
+    name: str
+    nationality: str
+    team: str
+    points: float
+    # Three-letter code ("VER"); scraped when available, else derived from the surname
+    code: str
+
+
+class TeamStanding(NamedTuple):
+    position: int
+    name: str
+    points: float
+
+
+class StandingsSnapshot(NamedTuple):
+    drivers: Tuple[DriverStanding, ...]
+    teams: Tuple[TeamStanding, ...]
+    driver_by_name: Dict[str, DriverStanding]
+    driver_by_position: Dict[int, DriverStanding]
+    drivers_by_team: Dict[str, Tuple[DriverStanding, ...]]
+    team_by_name: Dict[str, TeamStanding]
+    driver_index: NameIndex
+    team_index: NameIndex
+    # SHA-256 of driver_standing.json, used to key cached odds
+    driver_fingerprint: str
+
+    def match_driver(self, query: str) -> Tuple[Optional[DriverStanding], List[Match]]:
+        """
+        Resolve a driver by full name, surname, first name, code ("VER"), alias ("checo")
+        or a misspelling ("Verstapen"). Returns (driver, candidates); driver is None when
+        nothing matches or the query is ambiguous, and candidates are ranked suggestions.
+        """
+        exact = self.driver_by_name.get(fold(query))
+        if exact:
+            return exact, [Match(exact, 1.0, fold(query))]
+        return self.driver_index.resolve(query)
+
+    def match_team(self, query: str) -> Tuple[Optional[TeamStanding], List[Match]]:
+        """Resolve a team by name, alias or misspelling (see match_driver)."""
+        exact = self.team_by_name.get(fold(query))
+        if exact:
+            return exact, [Match(exact, 1.0, fold(query))]
+        return self.team_index.resolve(query)
+
+    def find_driver(self, query: str) -> Optional[DriverStanding]:
+        return self.match_driver(query)[0]
+
+    def find_team(self, query: str) -> Optional[TeamStanding]:
+        return self.match_team(query)[0]
+
+    def team_drivers(self, team_name: str) -> Tuple[DriverStanding, ...]:
+        team = self.find_team(team_name)
+        return self.drivers_by_team.get(team.name.lower(), ()) if team else ()
+
+
+def format_points(points: float) -> str:
+    """Render points the way the scraped data shows them ("336", "12.5")."""
+    return f"{points:g}"
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_position(value, fallback: int) -> int:
+    # Non-numeric positions (e.g. "DQ") keep their row order
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+def _driver_code(name: str) -> str:
+    surname = fold(name).split()[-1:] or [""]
+    return surname[0][:3].upper()
+
+
+def _parse_drivers(raw: bytes) -> Tuple[DriverStanding, ...]:
+    rows = json.loads(raw.decode("utf-8"))
+    return tuple(
+        DriverStanding(
+            position=_to_position(r.get("POS."), i),
+            name=r.get("DRIVER", ""),
+            nationality=r.get("NATIONALITY", ""),
+            team=r.get("TEAM", ""),
+            points=_to_float(r.get("PTS.", 0)),
+            code=r.get("CODE") or _driver_code(r.get("DRIVER", "")),
+        )
+        for i, r in enumerate(rows, start=1)
+    )
+
+
+def _parse_teams(raw: bytes) -> Tuple[TeamStanding, ...]:
+    rows = json.loads(raw.decode("utf-8"))
+    return tuple(
+        TeamStanding(
+            position=_to_position(r.get("POS."), i),
+            name=r.get("TEAM", ""),
+            points=_to_float(r.get("PTS.", 0)),
+        )
+        for i, r in enumerate(rows, start=1)
+    )
+
+
+def _build_snapshot(drivers: Tuple[DriverStanding, ...], teams: Tuple[TeamStanding, ...],
+                    driver_fingerprint: str) -> StandingsSnapshot:
+    by_team: Dict[str, List[DriverStanding]] = {}
+    for d in drivers:
+        by_team.setdefault(d.team.lower(), []).append(d)
+
+    driver_index: NameIndex = NameIndex()
+    for d in drivers:
+        driver_index.add(d, [d.name, d.code, *DRIVER_ALIASES.get(fold(d.name), [])])
+    team_index: NameIndex = NameIndex()
+    for t in teams:
+        team_index.add(t, [t.name, *TEAM_ALIASES.get(fold(t.name), [])])
+
+    return StandingsSnapshot(
+        drivers=drivers,
+        teams=teams,
+        driver_by_name={fold(d.name): d for d in drivers},
+        driver_by_position={d.position: d for d in drivers},
+        drivers_by_team={k: tuple(v) for k, v in by_team.items()},
+        team_by_name={fold(t.name): t for t in teams},
+        driver_index=driver_index,
+        team_index=team_index,
+        driver_fingerprint=driver_fingerprint,
+    )
+
+
+class _StandingsStore:
+    """Holds the current snapshot; reloads are serialized, reads never block on them."""
+
+    def __init__(self, driver_path: str, team_path: str):
+        self.driver_path = driver_path
+        self.team_path = team_path
+        self._lock = threading.Lock()
+        self._snapshot: Optional[StandingsSnapshot] = None
+        self._stats: Tuple = ()
+        self._hashes: Tuple[str, str] = ("", "")
+
+    def _stat(self) -> Tuple:
+        st_d = os.stat(self.driver_path)
+        st_t = os.stat(self.team_path)
+        return (st_d.st_mtime_ns, st_d.st_size, st_t.st_mtime_ns, st_t.st_size)
+
+    def get(self) -> StandingsSnapshot:
+        stats = self._stat()
+        snapshot = self._snapshot
+        if snapshot is not None and stats == self._stats:
+            return snapshot
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._snapshot is not None and stats == self._stats:
+                return self._snapshot
+            with open(self.driver_path, "rb") as f:
+                driver_raw = f.read()
+            with open(self.team_path, "rb") as f:
+                team_raw = f.read()
+            hashes = (hashlib.sha256(driver_raw).hexdigest(), hashlib.sha256(team_raw).hexdigest())
+            if self._snapshot is None or hashes != self._hashes:
+                self._snapshot = _build_snapshot(_parse_drivers(driver_raw), _parse_teams(team_raw), hashes[0])
+                self._hashes = hashes
+            self._stats = stats
+            return self._snapshot
+
+
+_store = _StandingsStore(DRIVER_STANDINGS_PATH, TEAM_STANDINGS_PATH)
+
+
+def get_standings() -> StandingsSnapshot:
+    """Return the current standings snapshot (reloaded only when the files change)."""
+    return _store.get()
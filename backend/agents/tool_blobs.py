@@ -0,0 +1,206 @@
+"""
+Compact tool outputs for the agent's checkpoints.
+
+LangGraph re-serializes a thread's whole message list into the checkpoint
+collection on every step, so five full Tavily results or a page of YouTube
+markdown were written (and read back by get_state) again and again. Tool
+outputs longer than COMPACT_MIN_CHARS are now stored once in a
+content-addressed blob store (F1_chatbot.ToolBlobs, keyed by the SHA-256 of
+the body, so repeated results are stored once). The ToolMessage keeps:
+- content: a short digest (the opening of the output plus the links it cites)
+- artifact: {"blob": <sha256>, "chars": <full length>}
+
+The model needs the full output only in the turn that called the tool;
+context_window.py rehydrates those messages from the blob store when it builds
+the model input. Older turns see only the digest.
+
+Each put refreshes the blob's last_used. The checkpoint retention job
+(checkpoint_retention.py) deletes blobs that no remaining checkpoint refers to
+once they have not been put for a while.
+"""
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import StructuredTool
+from agents.tool_cache import shared_db
+
+# Outputs up to this size stay inline; standings and odds tables are usually below it
+COMPACT_MIN_CHARS = int(os.getenv("TOOL_OUTPUT_COMPACT_MIN_CHARS", "800"))
+# Opening characters of an output kept in its digest
+DIGEST_CHARS = 300
+# Links kept in a digest (the model cites them in the Sources section)
+DIGEST_MAX_LINKS = 5
+
+# Recently written or read blobs kept per process, so rehydrating the current turn needs no round-trip
+_LOCAL_MAX_BLOBS = 256
+
+BLOB_COLLECTION = "ToolBlobs"
+
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+
+class BlobStore:
+    """Content-addressed store of tool outputs: Mongo for durability, a small LRU in front."""
+
+    def __init__(self, collection=None):
+        self._collection = collection
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = shared_db()[BLOB_COLLECTION]
+        return self._collection
+
+    def _remember(self, digest: str, body: str) -> None:
+        with self._lock:
+            self._local[digest] = body
+            self._local.move_to_end(digest)
+            while len(self._local) > _LOCAL_MAX_BLOBS:
+                self._local.popitem(last=False)
+
+    def put(self, body: str) -> str:
+        """Store body (once per distinct content) and return its SHA-256."""
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        self._remember(digest, body)
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.update_one(
+                {"_id": digest},
+                {"$setOnInsert": {"body": body, "chars": len(body), "created_at": now}, "$set": {"last_used": now}},
+                upsert=True,
+            )
+        except Exception as e:
+            # Still served from the local copy in this process; other workers fall back to the digest
+            print(f"Tool blob write failed: {e}")
+        return digest
+
+    def _get_local(self, digest: str) -> Optional[str]:
+        with self._lock:
+            body = self._local.get(digest)
+            if body is not None:
+                self._local.move_to_end(digest)
+            return body
+
+    def get(self, digest: str) -> Optional[str]:
+        body = self._get_local(digest)
+        if body is not None:
+            return body
+        try:
+            doc = self.collection.find_one({"_id": digest}, {"body": 1})
+        except Exception as e:
+            print(f"Tool blob read failed: {e}")
+            return None
+        if doc is None:
+            return None
+        self._remember(digest, doc["body"])
+        return doc["body"]
+
+    async def aget(self, digest: str) -> Optional[str]:
+        body = self._get_local(digest)
+        if body is not None:
+            return body
+        # pymongo blocks; keep the event loop free
+        return await asyncio.to_thread(self.get, digest)
+
+
+blob_store = BlobStore()
+
+
+def digest_text(body: str, blob: str) -> str:
+    """Short stand-in for a stored output: its opening, the links it cites and a blob reference."""
+    head = body[:DIGEST_CHARS].rstrip()
+    links = []
+    for url in _URL.findall(body[DIGEST_CHARS:]):
+        if url not in links and url not in head:
+            links.append(url)
+        if len(links) == DIGEST_MAX_LINKS:
+            break
+    lines = [f"{head} …"]
+    if links:
+        lines.append("Links: " + " ".join(links))
+    lines.append(f"[full output: {len(body)} chars, blob {blob[:12]}]")
+    return "\n".join(lines)
+
+
+def compact_output(body) -> Tuple[str, Optional[dict]]:
+    """(content, artifact) to keep in the checkpoint for a tool output; artifact is None when kept inline."""
+    if not isinstance(body, str) or len(body) <= COMPACT_MIN_CHARS:
+        return body, None
+    blob = blob_store.put(body)
+    return digest_text(body, blob), {"blob": blob, "chars": len(body)}
+
+
+async def acompact_output(body) -> Tuple[str, Optional[dict]]:
+    if not isinstance(body, str) or len(body) <= COMPACT_MIN_CHARS:
+        return body, None
+    # pymongo blocks; keep the event loop free
+    return await asyncio.to_thread(compact_output, body)
+
+
+def compact_tool(tool: StructuredTool) -> StructuredTool:
+    """
+    The same tool (name, description, arguments) returning (digest, blob reference) as
+    content and artifact, so ToolNode stores the compact form in the checkpoint.
+    """
+    func, coroutine = tool.func, tool.coroutine
+
+    def run(*args, **kwargs):
+        return compact_output(func(*args, **kwargs))
+
+    async def arun(*args, **kwargs):
+        if coroutine is None:
+            body = await asyncio.to_thread(func, *args, **kwargs)
+        else:
+            body = await coroutine(*args, **kwargs)
+        return await acompact_output(body)
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=run if func is not None else None,
+        coroutine=arun,
+        response_format="content_and_artifact",
+    )
+
+
+def compact_tools(tools: List[StructuredTool]) -> List[StructuredTool]:
+    return [compact_tool(t) for t in tools]
+
+
+def compact_tool_message(message: ToolMessage) -> ToolMessage:
+    """A ToolMessage with its content moved to the blob store (for turns written outside ToolNode)."""
+    if message.artifact:
+        return message
+    content, artifact = compact_output(message.content)
+    if artifact is None:
+        return message
+    return message.model_copy(update={"content": content, "artifact": artifact})
+
+
+def _blob_ref(message) -> Optional[str]:
+    artifact = message.artifact if isinstance(message, ToolMessage) else None
+    return artifact["blob"] if isinstance(artifact, dict) and "blob" in artifact else None
+
+
+def _with_body(message: ToolMessage, body: Optional[str]) -> ToolMessage:
+    return message if body is None else message.model_copy(update={"content": body})
+
+
+def rehydrate(message: ToolMessage) -> ToolMessage:
+    """The message with its full output restored from the blob store (unchanged if it is not compacted or the blob is gone)."""
+    blob = _blob_ref(message)
+    return message if blob is None else _with_body(message, blob_store.get(blob))
+
+
+async def arehydrate(message: ToolMessage) -> ToolMessage:
+    blob = _blob_ref(message)
+    return message if blob is None else _with_body(message, await blob_store.aget(blob))
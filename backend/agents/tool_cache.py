@@ -0,0 +1,326 @@
+"""
+TTL cache with request coalescing for upstream API calls made by the tools.
+
+A ToolCache maps a caller-normalized key to a JSON-serializable value with a
+per-entry TTL. Concurrent callers that miss on the same key share one upstream
+call: the first one fetches, the rest wait for its result (threads on the Flask
+path, tasks on the ASGI path). Caches created with a stale_ttl keep expired
+entries that long, and serve them when the upstream call fails or when the
+caller asks to spare the upstream (e.g. its quota is nearly used up).
+Storage is pluggable:
+- LRUBackend: in-process, bounded, lost on restart (default)
+- MongoBackend: one collection shared by every worker, documents past their
+  stale window are removed by a MongoDB TTL index
+
+Backends are picked per cache from TOOL_CACHE_BACKEND ("memory" or "mongo").
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+TOOL_CACHE_BACKEND = os.getenv("TOOL_CACHE_BACKEND", "memory").lower()
+
+# Entries kept per in-process cache before the least recently used ones are evicted
+LRU_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "2048"))
+
+
+class LRUBackend:
+    """Bounded in-process store of (expires_at, stale_until, value) entries."""
+
+    # Reads and writes are dict operations; safe to call from the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at), or None once the entry is past its stale window."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2], entry[0]
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        with self._lock:
+            now = time.time()
+            self._entries[key] = (now + ttl, now + ttl + stale_ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class MongoBackend:
+    """Store shared by all workers: one document per key, purged by a TTL index on stale_until."""
+
+    # pymongo calls block, so the async path runs them in a worker thread
+    blocking = True
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    def _ensure_index(self) -> None:
+        if not self._indexed:
+            self.collection.create_index("stale_until", expireAfterSeconds=0)
+            self._indexed = True
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        # The TTL monitor runs once a minute, so the stale window is also checked here
+        doc = self.collection.find_one({"_id": key})
+        if doc is None or doc["stale_until"].timestamp() <= time.time():
+            return None
+        return doc["value"], doc["expires_at"].timestamp()
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        self._ensure_index()
+        now = time.time()
+        doc = {
+            "_id": key,
+            "value": value,
+            "expires_at": datetime.fromtimestamp(now + ttl, tz=timezone.utc),
+            "stale_until": datetime.fromtimestamp(now + ttl + stale_ttl, tz=timezone.utc),
+        }
+        self.collection.replace_one({"_id": key}, doc, upsert=True)
+
+
+_mongo_db = None
+
+
+def shared_db():
+    """The F1_chatbot database on one MongoClient shared by the caches (opened on first use)."""
+    global _mongo_db
+    if _mongo_db is None:
+        from pymongo import MongoClient
+        _mongo_db = MongoClient(os.getenv("MONGO_URI"), tz_aware=True)["F1_chatbot"]
+    return _mongo_db
+
+
+def make_backend(collection_name: str):
+    """Build the backend selected by TOOL_CACHE_BACKEND; "mongo" uses F1_chatbot.<collection_name>."""
+    if TOOL_CACHE_BACKEND == "mongo":
+        return MongoBackend(shared_db()[collection_name])
+    return LRUBackend()
+
+
+def _quota_day() -> str:
+    # Google API quotas reset at midnight Pacific time
+    from zoneinfo import ZoneInfo
+    return datetime.now(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d")
+
+
+class QuotaBudget:
+    """
+    Daily API quota spent by this deployment. Counted per process with the memory
+    backend, and in F1_chatbot.ApiQuota (shared by every worker) with the mongo backend.
+    """
+
+    def __init__(self, name: str, daily_units: int, reserve_units: int):
+        self.name = name
+        self.daily_units = daily_units
+        # Once fewer units than this are left, callers should prefer stale cache entries
+        self.reserve_units = reserve_units
+        self._lock = threading.Lock()
+        self._day = ""
+        self._used = 0
+        self._collection = shared_db()["ApiQuota"] if TOOL_CACHE_BACKEND == "mongo" else None
+
+    @property
+    def blocking(self) -> bool:
+        """True when the counters are in Mongo (pymongo calls block; async callers use a thread)."""
+        return self._collection is not None
+
+    def _doc_id(self, day: str) -> str:
+        return f"{self.name}:{day}"
+
+    def used(self) -> int:
+        day = _quota_day()
+        if self._collection is not None:
+            try:
+                doc = self._collection.find_one({"_id": self._doc_id(day)})
+                return int(doc["used"]) if doc else 0
+            except Exception as e:
+                print(f"{self.name} quota read failed: {e}")
+        with self._lock:
+            return self._used if self._day == day else 0
+
+    def spend(self, units: int) -> None:
+        day = _quota_day()
+        with self._lock:
+            if self._day != day:
+                self._day, self._used = day, 0
+            self._used += units
+        if self._collection is not None:
+            try:
+                self._collection.update_one({"_id": self._doc_id(day)}, {"$inc": {"used": units}}, upsert=True)
+            except Exception as e:
+                print(f"{self.name} quota write failed: {e}")
+
+    def exhaust(self) -> None:
+        """Record that the upstream reported the quota as exceeded."""
+        self.spend(max(self.daily_units - self.used(), 0))
+
+    def remaining(self) -> int:
+        return max(self.daily_units - self.used(), 0)
+
+    def nearly_exhausted(self) -> bool:
+        return self.remaining() <= self.reserve_units
+
+
+class ToolCache:
+    """Read-through cache with per-key request coalescing; see the module docstring."""
+
+    def __init__(self, name: str, backend=None, stale_ttl: float = 0):
+        self.name = name
+        self.backend = backend if backend is not None else LRUBackend()
+        # How long expired entries are kept as a fallback
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def _get(self, key: str) -> Tuple[Optional[Any], Optional[Any]]:
+        """Return (fresh_value, stale_value); at most one of them is set."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            # A broken cache store only costs us the cache, never the answer
+            print(f"{self.name} cache read failed: {e}")
+            return None, None
+        if entry is None:
+            return None, None
+        value, expires_at = entry
+        return (value, None) if expires_at > time.time() else (None, value)
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self.backend.set(key, value, ttl, self.stale_ttl)
+        except Exception as e:
+            print(f"{self.name} cache write failed: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """The fresh value stored under key, or None; never fetches."""
+        return self._get(key)[0]
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value fetched outside get_or_fetch (e.g. by a scheduled refresh)."""
+        self._set(key, value, ttl)
+
+    def _use_stale(self, key: str, stale: Any, reason: str) -> Any:
+        self.stale_hits += 1
+        print(f"{self.name} cache: serving stale entry for '{key}' ({reason})")
+        return stale
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], ttl: float,
+                     prefer_stale: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Return the cached value for key, or call fetch() once for all concurrent callers and cache it.
+        An expired entry still inside the stale window is returned instead of fetching when
+        prefer_stale() is true, and instead of raising when fetch() fails.
+        """
+        value, stale = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if stale is not None and prefer_stale is not None and prefer_stale():
+            return self._use_stale(key, stale, "upstream budget low")
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self.hits += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            value = fetch()
+            if value is not None:
+                self._set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            if stale is not None:
+                future.set_result(stale)
+                return self._use_stale(key, stale, f"fetch failed: {e}")
+            future.set_exception(e)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: float,
+                            prefer_stale: Optional[Callable[[], bool]] = None) -> Any:
+        """Async counterpart of get_or_fetch; callers on the same event loop share one fetch()."""
+        if self.backend.blocking:
+            value, stale = await asyncio.to_thread(self._get, key)
+        else:
+            value, stale = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if stale is not None and prefer_stale is not None:
+            use_stale = await asyncio.to_thread(prefer_stale) if self.backend.blocking else prefer_stale()
+            if use_stale:
+                return self._use_stale(key, stale, "upstream budget low")
+
+        # Futures belong to one loop, so in-flight requests are tracked per loop
+        slot = (id(asyncio.get_running_loop()), key)
+        future = self._ainflight.get(slot)
+        if future is not None:
+            try:
+                value = await asyncio.shield(future)
+                self.hits += 1
+                return value
+            except asyncio.CancelledError:
+                # The leader was cancelled (client went away); fetch on our own behalf
+                # unless we are the ones being cancelled
+                if not future.cancelled():
+                    raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._ainflight[slot] = future
+        try:
+            value = await fetch()
+            if value is not None:
+                if self.backend.blocking:
+                    await asyncio.to_thread(self._set, key, value, ttl)
+                else:
+                    self._set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if stale is not None:
+                future.set_result(stale)
+                return self._use_stale(key, stale, f"fetch failed: {e}")
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        finally:
+            if self._ainflight.get(slot) is future:
+                del self._ainflight[slot]
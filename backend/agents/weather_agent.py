@@ -1,36 +1,103 @@
-from langchain.tools import tool
-import requests
-import json
-import os
-
-def load_circuits():
-    with open("f1-locations.json", "r") as f:
-        return json.load(f)
-
-def get_circuit_by_name(name):
-    circuits = load_circuits()
-    for circuit in circuits:
-        if name.lower() in circuit["name"].lower():
-            return circuit
-    return None
-
-open_weather_key = os.getenv('OPEN_WEATHER_API_KEY')
-
-@tool
-def get_weather_by_circuit_name(circuit_name: str) -> str:
+from langchain.tools import StructuredTool
+from typing import List
+from agents.circuit_index import find_circuit
+from agents.name_index import suggestion_text
+from agents.weather_forecast import get_calendar, resolve_session, weekend_at, weekend_forecast_text
+from agents.weather_service import (
+    acurrent_weather, acurrent_weather_many, aforecast_series, current_weather, current_weather_many, forecast_series,
+)
+
+
+def not_found_text(circuit_name, candidates):
+    return f"Circuit named '{circuit_name}' not found.{suggestion_text(candidates)}"
+
+
+# Returns (error_text, weekend, session) for forecast mode; error_text is None when the forecast can be looked up
+def _forecast_request(circuit, session):
+    resolved = resolve_session(session)
+    if resolved is None:
+        return (f"Unknown session '{session}'. Use FP1, FP2, FP3, Sprint Qualifying, Sprint, "
+                f"Qualifying, Race or 'weekend'."), None, None
+    if not get_calendar():
+        # Missing or empty scraped_data/race_calendar.json: say so rather than that there is no race here
+        return ("The race calendar is not loaded, so session forecasts are unavailable right now. "
+                "Current conditions can still be looked up."), None, None
+    weekend = weekend_at(circuit)
+    if weekend is None:
+        return f"No race weekend at {circuit.name} in the current calendar.", None, None
+    return None, weekend, resolved
+
+
+def _get_weather_by_circuit_name(circuit_name: str, session: str = "") -> str:
     """
     Get current weather for a Formula 1 circuit, including chance of rain, humidity, and wind.
+    - circuit_name: circuit name, city, country or Grand Prix ("Monza", "Baku", "COTA", "Italian GP"),
+      or "lat, lon" coordinates for the nearest circuit
+    - session: leave empty for current conditions. For the forecast at the start of a session of the
+      circuit's current/next race weekend, pass "FP1", "FP2", "FP3", "Sprint Qualifying", "Sprint",
+      "Qualifying" or "Race" (e.g. "chance of rain at race start"), or "weekend" for every session
     """
-    circuit = get_circuit_by_name(circuit_name)
+    circuit, candidates = find_circuit(circuit_name)
     if not circuit:
-        return f"Circuit named '{circuit_name}' not found."
-    lat = circuit["lat"]
-    lon = circuit["lon"]
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={open_weather_key}&units=metric"
-    response = requests.get(url)
-    if response.status_code != 200:
+        return not_found_text(circuit_name, candidates)
+    if session:
+        error, weekend, resolved = _forecast_request(circuit, session)
+        if error:
+            return error
+        return weekend_forecast_text(weekend, resolved, forecast_series(circuit))
+    data = current_weather(circuit)
+    if data is None:
         return "Error fetching weather data."
-    data = response.json()
+    return format_weather(circuit, data)
+
+
+async def _aget_weather_by_circuit_name(circuit_name: str, session: str = "") -> str:
+    circuit, candidates = find_circuit(circuit_name)
+    if not circuit:
+        return not_found_text(circuit_name, candidates)
+    if session:
+        error, weekend, resolved = _forecast_request(circuit, session)
+        if error:
+            return error
+        return weekend_forecast_text(weekend, resolved, await aforecast_series(circuit))
+    data = await acurrent_weather(circuit)
+    if data is None:
+        return "Error fetching weather data."
+    return format_weather(circuit, data)
+
+
+def _format_batch(circuit_names, matches, results):
+    lines = []
+    for name, (circuit, candidates), data in zip(circuit_names, matches, results):
+        if not circuit:
+            lines.append(f"- {not_found_text(name, candidates)}")
+        elif data is None:
+            lines.append(f"- {circuit.name}: error fetching weather data.")
+        else:
+            lines.append(f"- {format_weather(circuit, data)}")
+    return "\n".join(lines)
+
+
+def _get_weather_for_circuits(circuit_names: List[str]) -> str:
+    """
+    Get current weather for several Formula 1 circuits in one call (e.g. the next three races).
+    - circuit_names: circuit names, e.g. ["Monza", "Baku City Circuit", "Marina Bay"]
+    Prefer this over calling get_weather_by_circuit_name once per circuit.
+    """
+    matches = [find_circuit(name) for name in circuit_names]
+    found = list({c.id: c for c, _ in matches if c}.values())
+    by_id = dict(zip([c.id for c in found], current_weather_many(found)))
+    return _format_batch(circuit_names, matches, [by_id.get(c.id) if c else None for c, _ in matches])
+
+
+async def _aget_weather_for_circuits(circuit_names: List[str]) -> str:
+    matches = [find_circuit(name) for name in circuit_names]
+    found = list({c.id: c for c, _ in matches if c}.values())
+    by_id = dict(zip([c.id for c in found], await acurrent_weather_many(found)))
+    return _format_batch(circuit_names, matches, [by_id.get(c.id) if c else None for c, _ in matches])
+
+
+def format_weather(circuit, data):
     weather = data.get("weather", [{}])[0]
     main = data.get("main", {})
     wind = data.get("wind", {})
@@ -43,7 +110,21 @@ def get_weather_by_circuit_name(circuit_name: str) -> str:
         # Compose a natural, Gemini-style summary
     rain_str = f"Rain volume: {rain_volume} mm." if isinstance(rain_volume, (int, float)) or (isinstance(rain_volume, str) and rain_volume.replace('.', '', 1).isdigit()) else "No rain data available."
     return (
-            f"Currently at {circuit['name']} in {circuit['location']}, the weather is {description.lower()} with a temperature of {temperature}°C. "
+            f"Currently at {circuit.name} in {circuit.location}, the weather is {description.lower()} with a temperature of {temperature}°C. "
             f"Humidity is {humidity}%, and wind is blowing at {wind_speed} m/s. "
             f"{rain_str}"
         )
+
+
+get_weather_by_circuit_name = StructuredTool.from_function(
+    func=_get_weather_by_circuit_name,
+    coroutine=_aget_weather_by_circuit_name,
+    name="get_weather_by_circuit_name",
+)
+
+
+get_weather_for_circuits = StructuredTool.from_function(
+    func=_get_weather_for_circuits,
+    coroutine=_aget_weather_for_circuits,
+    name="get_weather_for_circuits",
+)
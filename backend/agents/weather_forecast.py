@@ -0,0 +1,193 @@
+"""
+Race-weekend forecast mode for the weather tools.
+
+The season calendar (scraped_data/race_calendar.json, written by
+web_scraping/race_calendar.py) gives each round's session start times. Every
+round is mapped once to a circuit of the circuit index (nearest to the venue's
+coordinates), so "chance of rain at race start" is a lookup of the session's
+start time in that circuit's cached forecast series, interpolated between the
+3-hour forecast steps.
+
+A background thread refreshes the forecasts of every circuit with a session in
+the forecast horizon every FORECAST_REFRESH_INTERVAL seconds, so a weekend's
+traffic costs a few upstream calls per circuit rather than one per question.
+"""
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from agents.circuit_index import CIRCUITS, Circuit
+from agents.weather_service import FORECAST_TTL, fetch_forecast, forecast_cache
+
+RACE_CALENDAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraped_data", "race_calendar.json")
+
+# OpenWeather's free forecast covers 5 days ahead
+FORECAST_HORIZON = 5 * 24 * 3600
+
+# Seconds between scheduled forecast refreshes (0 disables the background thread)
+FORECAST_REFRESH_INTERVAL = int(os.getenv("FORECAST_REFRESH_INTERVAL", str(FORECAST_TTL)))
+
+# A calendar venue further than this from every known circuit is matched by name instead
+_MAX_VENUE_DISTANCE_KM = 30.0
+
+# What users call each session -> calendar session name
+SESSION_ALIASES: Dict[str, str] = {
+    "fp1": "FP1", "practice 1": "FP1", "first practice": "FP1",
+    "fp2": "FP2", "practice 2": "FP2", "second practice": "FP2",
+    "fp3": "FP3", "practice 3": "FP3", "third practice": "FP3",
+    "sprint qualifying": "Sprint Qualifying", "sprint shootout": "Sprint Qualifying", "sq": "Sprint Qualifying",
+    "sprint": "Sprint", "sprint race": "Sprint",
+    "qualifying": "Qualifying", "quali": "Qualifying", "q": "Qualifying",
+    "race": "Race", "grand prix": "Race", "gp": "Race", "race start": "Race",
+}
+WEEKEND_WORDS = {"weekend", "all", "sessions", "all sessions", "race weekend"}
+
+
+class RaceWeekend(NamedTuple):
+    round: int
+    race_name: str
+    circuit: Circuit
+    # Calendar order (FP1 ... Race) with UTC start times as unix seconds
+    sessions: Tuple[Tuple[str, int], ...]
+
+
+_calendar_lock = threading.Lock()
+_calendar: Tuple[float, Tuple[RaceWeekend, ...]] = (-1.0, ())
+
+
+def _to_unix(iso: str) -> int:
+    return int(datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp())
+
+
+def _circuit_for(race: dict) -> Optional[Circuit]:
+    nearest = CIRCUITS.nearest(race["lat"], race["lon"])
+    if nearest and nearest[0][1] <= _MAX_VENUE_DISTANCE_KM:
+        return nearest[0][0]
+    return CIRCUITS.match(race.get("circuit_name", ""))[0]
+
+
+def get_calendar() -> Tuple[RaceWeekend, ...]:
+    """Race weekends of the scraped calendar, re-read only when the file changes; empty if missing."""
+    global _calendar
+    try:
+        mtime = os.stat(RACE_CALENDAR_PATH).st_mtime
+    except OSError:
+        return ()
+    if mtime == _calendar[0]:
+        return _calendar[1]
+    with _calendar_lock:
+        if mtime != _calendar[0]:
+            with open(RACE_CALENDAR_PATH, "r", encoding="utf-8") as f:
+                races = json.load(f).get("races", [])
+            weekends = []
+            for race in races:
+                circuit = _circuit_for(race)
+                if circuit is None:
+                    print(f"Race calendar: no circuit found for {race.get('race_name')}")
+                    continue
+                sessions = sorted(((name, _to_unix(iso)) for name, iso in race["sessions"].items()), key=lambda s: s[1])
+                weekends.append(RaceWeekend(race["round"], race["race_name"], circuit, tuple(sessions)))
+            _calendar = (mtime, tuple(weekends))
+        return _calendar[1]
+
+
+def weekend_at(circuit: Circuit, now: Optional[float] = None) -> Optional[RaceWeekend]:
+    """The circuit's current or next race weekend (the last one if the season there is over)."""
+    now = time.time() if now is None else now
+    weekends = [w for w in get_calendar() if w.circuit.id == circuit.id]
+    for w in weekends:
+        # Still "current" until a few hours after the race starts
+        if w.sessions and w.sessions[-1][1] + 4 * 3600 >= now:
+            return w
+    return weekends[-1] if weekends else None
+
+
+def resolve_session(session: str) -> Optional[str]:
+    """Calendar session name for user input ("quali" -> "Qualifying"); "" for the whole weekend; None if unknown."""
+    key = " ".join((session or "").lower().replace("-", " ").split())
+    if not key or key in WEEKEND_WORDS:
+        return ""
+    return SESSION_ALIASES.get(key)
+
+
+def forecast_at(series: dict, ts: int) -> Optional[dict]:
+    """Conditions at unix time ts, linearly interpolated between forecast steps; None outside the series."""
+    times = series["t"]
+    if not times or ts < times[0] - 3 * 3600 or ts > times[-1]:
+        return None
+    i = bisect_left(times, ts)
+    if i == 0 or times[i] == ts:
+        return {k: series[k][i] for k in series}
+    lo, hi = i - 1, i
+    w = (ts - times[lo]) / (times[hi] - times[lo])
+    point = {"t": ts, "desc": series["desc"][lo if w < 0.5 else hi]}
+    for k in ("temp", "pop", "rain", "wind", "humidity"):
+        a, b = series[k][lo], series[k][hi]
+        point[k] = a if a is None or b is None else a + (b - a) * w
+    return point
+
+
+def format_session_forecast(name: str, start: int, point: Optional[dict]) -> str:
+    when = datetime.fromtimestamp(start, tz=timezone.utc).strftime("%a %d %b %H:%M UTC")
+    if point is None:
+        return f"- {name} ({when}): forecast not available yet (forecasts cover the next 5 days)"
+    temp = f"{point['temp']:.0f}°C" if point["temp"] is not None else "N/A"
+    wind = f"{point['wind']:.1f} m/s" if point["wind"] is not None else "N/A"
+    humidity = f"{point['humidity']:.0f}%" if point["humidity"] is not None else "N/A"
+    return (
+        f"- {name} ({when}): {point['desc'] or 'N/A'}, {temp}, "
+        f"{point['pop'] * 100:.0f}% chance of rain ({point['rain']:.1f} mm per 3 h), wind {wind}, humidity {humidity}"
+    )
+
+
+def weekend_forecast_text(weekend: RaceWeekend, session: str, series: Optional[dict]) -> str:
+    """Render the forecast for one session (or every session when session is "") of a race weekend."""
+    sessions = [s for s in weekend.sessions if not session or s[0] == session]
+    if not sessions:
+        available = ", ".join(name for name, _ in weekend.sessions)
+        return f"The {weekend.race_name} has no {session} session. Sessions: {available}."
+    header = f"🌦️ **{weekend.race_name} forecast — {weekend.circuit.name}**"
+    if series is None:
+        return f"{header}\nForecast data is unavailable right now."
+    return "\n".join([header] + [format_session_forecast(name, start, forecast_at(series, start)) for name, start in sessions])
+
+
+def _refresh_due_forecasts() -> int:
+    now = time.time()
+    due = {}
+    for w in get_calendar():
+        if any(now - 4 * 3600 <= start <= now + FORECAST_HORIZON for _, start in w.sessions):
+            due[w.circuit.id] = w.circuit
+    for circuit in due.values():
+        series = fetch_forecast(circuit)
+        if series is not None:
+            forecast_cache.put(circuit.id, series, FORECAST_TTL)
+    return len(due)
+
+
+def _refresh_forever(interval: int) -> None:
+    while True:
+        try:
+            _refresh_due_forecasts()
+        except Exception as e:
+            print(f"Forecast refresh failed: {e}")
+        time.sleep(interval)
+
+
+_refresher_started = False
+_refresher_lock = threading.Lock()
+
+
+def start_forecast_refresher(interval: int = FORECAST_REFRESH_INTERVAL) -> None:
+    """Start the scheduled forecast refresh in a daemon thread (once per process; no-op when interval is 0)."""
+    global _refresher_started
+    if interval <= 0:
+        return
+    with _refresher_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_forever, args=(interval,), name="forecast-refresher", daemon=True).start()
@@ -0,0 +1,153 @@
+"""
+OpenWeather access for the weather tools.
+
+Current conditions are cached per circuit id for WEATHER_TTL seconds (and
+concurrent requests for the same circuit share one upstream call), so repeated
+questions on a race weekend never go upstream. Calls use the shared pooled
+HTTP clients with timeouts, and batch lookups fetch every circuit concurrently.
+
+Forecasts (5 days in 3-hour steps) are stored per circuit as a compact
+columnar time series for FORECAST_TTL seconds; weather_forecast.py refreshes
+them on a schedule for upcoming race weekends.
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from agents.circuit_index import Circuit
+from agents.http_client import REQUESTS_TIMEOUT, get_async_client, http_session
+from agents.tool_cache import ToolCache, make_backend
+
+OPEN_WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+OPEN_WEATHER_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+
+# Current conditions barely move within ten minutes (OpenWeather itself updates about that often)
+WEATHER_TTL = int(os.getenv("WEATHER_TTL", "600"))
+
+# Upper bound on circuits fetched at once by a batch lookup
+MAX_BATCH_WORKERS = 8
+
+# Forecasts are refreshed every few hours upstream; stale ones remain useful if a refresh fails
+FORECAST_TTL = int(os.getenv("FORECAST_TTL", str(3 * 3600)))
+
+weather_cache = ToolCache("OpenWeather", make_backend("WeatherCache"))
+forecast_cache = ToolCache("OpenWeather forecast", make_backend("ForecastCache"), stale_ttl=12 * 3600)
+
+
+def _params(circuit: Circuit) -> dict:
+    return {"lat": circuit.lat, "lon": circuit.lon, "appid": os.getenv("OPEN_WEATHER_API_KEY"), "units": "metric"}
+
+
+class WeatherUnavailable(Exception):
+    """OpenWeather could not be reached or returned no usable data."""
+
+
+# The fetchers raise rather than return None, so ToolCache can fall back to a stale entry;
+# the public functions below turn the error into None after the cache call
+def _fetch(circuit: Circuit, url: str = OPEN_WEATHER_URL) -> dict:
+    try:
+        response = http_session.get(url, params=_params(circuit), timeout=REQUESTS_TIMEOUT)
+    except Exception as e:
+        raise WeatherUnavailable(f"OpenWeather request for {circuit.id} failed: {e}") from e
+    if response.status_code != 200:
+        raise WeatherUnavailable(f"OpenWeather returned {response.status_code} for {circuit.id}")
+    return response.json()
+
+
+async def _afetch(circuit: Circuit, url: str = OPEN_WEATHER_URL) -> dict:
+    try:
+        response = await get_async_client().get(url, params=_params(circuit))
+    except Exception as e:
+        raise WeatherUnavailable(f"OpenWeather request for {circuit.id} failed: {e}") from e
+    if response.status_code != 200:
+        raise WeatherUnavailable(f"OpenWeather returned {response.status_code} for {circuit.id}")
+    return response.json()
+
+
+def current_weather(circuit: Circuit) -> Optional[dict]:
+    """OpenWeather's current-conditions payload for a circuit, or None if it could not be fetched."""
+    try:
+        return weather_cache.get_or_fetch(circuit.id, lambda: _fetch(circuit), WEATHER_TTL)
+    except WeatherUnavailable as e:
+        print(e)
+        return None
+
+
+async def acurrent_weather(circuit: Circuit) -> Optional[dict]:
+    try:
+        return await weather_cache.aget_or_fetch(circuit.id, lambda: _afetch(circuit), WEATHER_TTL)
+    except WeatherUnavailable as e:
+        print(e)
+        return None
+
+
+def current_weather_many(circuits: List[Circuit]) -> List[Optional[dict]]:
+    """current_weather for several circuits, fetched concurrently; results keep the input order."""
+    if len(circuits) <= 1:
+        return [current_weather(c) for c in circuits]
+    with ThreadPoolExecutor(max_workers=min(len(circuits), MAX_BATCH_WORKERS)) as pool:
+        return list(pool.map(current_weather, circuits))
+
+
+async def acurrent_weather_many(circuits: List[Circuit]) -> List[Optional[dict]]:
+    return list(await asyncio.gather(*(acurrent_weather(c) for c in circuits)))
+
+
+def compact_forecast(data: Optional[dict]) -> Optional[dict]:
+    """
+    Reduce OpenWeather's forecast payload to parallel lists, one value per 3-hour step:
+    t (unix seconds), temp (°C), pop (chance of precipitation, 0-1), rain (mm per 3 h),
+    wind (m/s), humidity (%) and desc.
+    """
+    if not data or not data.get("list"):
+        return None
+    series = {"t": [], "temp": [], "pop": [], "rain": [], "wind": [], "humidity": [], "desc": []}
+    for step in data["list"]:
+        series["t"].append(int(step["dt"]))
+        series["temp"].append(step.get("main", {}).get("temp"))
+        series["pop"].append(float(step.get("pop", 0.0)))
+        series["rain"].append(float(step.get("rain", {}).get("3h", 0.0)))
+        series["wind"].append(step.get("wind", {}).get("speed"))
+        series["humidity"].append(step.get("main", {}).get("humidity"))
+        series["desc"].append((step.get("weather") or [{}])[0].get("description", ""))
+    return series
+
+
+def _forecast_or_raise(circuit: Circuit, data: dict) -> dict:
+    series = compact_forecast(data)
+    if series is None:
+        raise WeatherUnavailable(f"OpenWeather returned an empty forecast for {circuit.id}")
+    return series
+
+
+def fetch_forecast(circuit: Circuit) -> Optional[dict]:
+    """Fetch a fresh forecast series for a circuit (bypasses the cache), or None if unavailable."""
+    try:
+        return _forecast_or_raise(circuit, _fetch(circuit, OPEN_WEATHER_FORECAST_URL))
+    except WeatherUnavailable as e:
+        print(e)
+        return None
+
+
+def forecast_series(circuit: Circuit) -> Optional[dict]:
+    """
+    The cached forecast series for a circuit (see compact_forecast), or None if unavailable.
+    When OpenWeather fails, an expired series is still served for up to 12 hours.
+    """
+    try:
+        return forecast_cache.get_or_fetch(
+            circuit.id, lambda: _forecast_or_raise(circuit, _fetch(circuit, OPEN_WEATHER_FORECAST_URL)), FORECAST_TTL,
+        )
+    except WeatherUnavailable as e:
+        print(e)
+        return None
+
+
+async def aforecast_series(circuit: Circuit) -> Optional[dict]:
+    async def fetch():
+        return _forecast_or_raise(circuit, await _afetch(circuit, OPEN_WEATHER_FORECAST_URL))
+    try:
+        return await forecast_cache.aget_or_fetch(circuit.id, fetch, FORECAST_TTL)
+    except WeatherUnavailable as e:
+        print(e)
+        return None
@@ -1,7 +1,11 @@
-from langchain.tools import tool
-from tavily import TavilyClient
-import os 
+from langchain.tools import StructuredTool
+from tavily import TavilyClient, AsyncTavilyClient
+import os
+import re
+from datetime import datetime
 from dotenv import load_dotenv
+from agents.name_index import fold
+from agents.tool_cache import ToolCache, make_backend
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,62 +13,119 @@ load_dotenv()
 tavily_search_key = os.getenv("TAVILY_SEARCH_KEY")
 
 tavily_client = TavilyClient()
-@tool
-def tavily_search(query: str) -> str:
+async_tavily_client = AsyncTavilyClient()
+
+# Identical searches (after normalization) share one upstream call and are served from this cache.
+# Set TOOL_CACHE_BACKEND=mongo to share it across workers (collection F1_chatbot.SearchCache)
+search_cache = ToolCache("Tavily search", make_backend("SearchCache"))
+
+# Seconds a result stays fresh, by how time-sensitive the query is
+SEARCH_TTL_LIVE = int(os.getenv("SEARCH_TTL_LIVE", "300"))            # "latest", "today", "live", ...
+SEARCH_TTL_CURRENT = int(os.getenv("SEARCH_TTL_CURRENT", "1800"))     # current season or no year at all
+SEARCH_TTL_HISTORICAL = int(os.getenv("SEARCH_TTL_HISTORICAL", "604800"))  # only past seasons mentioned
+
+_LIVE_WORDS = {"latest", "today", "tonight", "now", "live", "breaking", "just", "news", "yesterday", "currently"}
+
+
+def normalize_search_query(query: str) -> str:
+    """
+    Cache key for a search: accent-folded and lowercased, with punctuation and whitespace
+    collapsed, so "Who won the Azerbaijan GP?" and "who won the azerbaijan gp" share an entry.
+    Word order is kept: "Hamilton faster than Leclerc" and "Leclerc faster than Hamilton"
+    are different searches.
+    """
+    return fold(query)
+
+
+def search_ttl(normalized_query: str) -> int:
+    """Live/news queries expire in minutes, current-season ones in half an hour, past seasons in a week."""
+    words = set(normalized_query.split())
+    if words & _LIVE_WORDS:
+        return SEARCH_TTL_LIVE
+    years = {int(y) for y in re.findall(r"\b(?:19|20)\d{2}\b", normalized_query)}
+    if years and max(years) < datetime.now().year:
+        return SEARCH_TTL_HISTORICAL
+    return SEARCH_TTL_CURRENT
+
+
+def format_search_results(response: dict) -> str:
+    results = response.get("results", [])
+    if not results:
+        return "No results found."
+
+    # Format results with emphasis on sources
+    output = []
+    sources_list = []
+
+    # Include top 5 results for better accuracy (especially for race-specific queries)
+    for i, r in enumerate(results[:5], 1):
+        title = r.get("title", "")
+        content = r.get("content", "")
+        url = r.get("url", "")
+
+        # Add formatted result
+        output.append(f"🔹 Result {i}: {title}\n{content}\n🔗 Source: {url}")
+
+        # Collect source for summary
+        sources_list.append(f"  {i}. {url}")
+
+    # Add prominent source section at the end
+    sources_section = "\n\n" + "="*50 + "\n📚 SOURCES - Include these in your response:\n" + "\n".join(sources_list) + "\n" + "="*50
+
+    return "\n\n".join(output) + sources_section
+
+
+def _tavily_search(query: str) -> str:
     """
     Search the web for current, accurate, and factual Formula 1 information using Tavily.
-    
+
     ⚠️ CRITICAL REQUIREMENTS:
     1. ALWAYS verify current information - F1 lineups and teams change frequently
     2. ALWAYS provide SOURCE URLs in your response - never give info without citing sources
     3. Include EXACT Grand Prix name for race-specific queries (DNFs, incidents, results)
-    
+
     KEY EXAMPLES:
-    
+
     Example 1 - Team Changes (2025 season):
-        WRONG: Search "Lewis Hamilton team" 
+        WRONG: Search "Lewis Hamilton team"
         CORRECT: Search "Lewis Hamilton team 2025 current" → He's at Ferrari now, not Mercedes
-    
+
     Example 2 - Race-Specific Queries (DNFs, incidents):
         WRONG: Search "Oscar Piastri DNF 2025"
         CORRECT: Search "Oscar Piastri DNF Azerbaijan Grand Prix 2025" → Include exact race name
-    
+
     Example 3 - Response Format (ALWAYS include sources):
         "Lewis Hamilton drives for Ferrari in 2025 alongside Charles Leclerc.
-        
+
         Sources:
         - Formula1.com: [URL]
         - Autosport: [URL]"
-    
+
     SEARCH TIPS:
     - Always include "2025" or "current season" in queries
     - Use full Grand Prix names (e.g., "Azerbaijan Grand Prix" not "Baku")
     - For DNFs/incidents: "driver name DNF/incident [Grand Prix Name] 2025"
-    
+
     ⚠️ Never assume historical data is current. Always verify the latest information.
     """
-    response = tavily_client.search(query=query, search_depth="advanced")
-    results = response.get("results", [])
-    if not results:
-        return "No results found."
-    
-    # Format results with emphasis on sources
-    output = []
-    sources_list = []
-    
-    # Include top 5 results for better accuracy (especially for race-specific queries)
-    for i, r in enumerate(results[:5], 1):
-        title = r.get("title", "")
-        content = r.get("content", "")
-        url = r.get("url", "")
-        
-        # Add formatted result
-        output.append(f"🔹 Result {i}: {title}\n{content}\n🔗 Source: {url}")
-        
-        # Collect source for summary
-        sources_list.append(f"  {i}. {url}")
-    
-    # Add prominent source section at the end
-    sources_section = "\n\n" + "="*50 + "\n📚 SOURCES - Include these in your response:\n" + "\n".join(sources_list) + "\n" + "="*50
-    
-    return "\n\n".join(output) + sources_section
+    key = normalize_search_query(query)
+    response = search_cache.get_or_fetch(
+        key, lambda: tavily_client.search(query=query, search_depth="advanced"), search_ttl(key),
+    )
+    return format_search_results(response)
+
+
+async def _atavily_search(query: str) -> str:
+    # Used by the async agent (asgi.py), so concurrent tool calls of one turn overlap their network waits
+    key = normalize_search_query(query)
+    response = await search_cache.aget_or_fetch(
+        key, lambda: async_tavily_client.search(query=query, search_depth="advanced"), search_ttl(key),
+    )
+    return format_search_results(response)
+
+
+tavily_search = StructuredTool.from_function(
+    func=_tavily_search,
+    coroutine=_atavily_search,
+    name="tavily_search",
+)
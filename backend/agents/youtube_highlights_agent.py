@@ -1,15 +1,114 @@
-from langchain.tools import tool
+from langchain.tools import StructuredTool
 import re
+import json
+import asyncio
 import textwrap
 from googleapiclient.discovery import build
 import os
 from datetime import datetime
+from googleapiclient.errors import HttpError
+from agents.highlights_index import search_index
+from agents.http_client import get_async_client
+from agents.name_index import fold
+from agents.tool_cache import QuotaBudget, ToolCache, make_backend
 youtube_key = os.getenv('YOUTUBE_API_KEY')
 youtube = build('youtube', 'v3', developerKey=youtube_key)
 
+# Same endpoint the discovery client calls; used directly by the async tool
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
 
-@tool
-def get_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3) -> str:
+# Quota units charged for one search.list call
+SEARCH_COST = 100
+
+# Daily YouTube Data API quota of the project; once less than the reserve is left,
+# expired cache entries are served instead of searching again
+youtube_quota = QuotaBudget(
+    "youtube",
+    daily_units=int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")),
+    reserve_units=int(os.getenv("YOUTUBE_QUOTA_RESERVE", "1000")),
+)
+
+# Seconds a search result stays fresh: highlights of past seasons never change, the newest uploads do
+HIGHLIGHTS_TTL_PAST_YEAR = int(os.getenv("HIGHLIGHTS_TTL_PAST_YEAR", str(30 * 24 * 3600)))
+HIGHLIGHTS_TTL_CURRENT_YEAR = int(os.getenv("HIGHLIGHTS_TTL_CURRENT_YEAR", str(6 * 3600)))
+HIGHLIGHTS_TTL_LATEST = int(os.getenv("HIGHLIGHTS_TTL_LATEST", str(30 * 60)))
+
+# Expired results are kept this long to ride out quota exhaustion or API errors
+highlights_cache = ToolCache("YouTube highlights", make_backend("HighlightsCache"),
+                             stale_ttl=int(os.getenv("HIGHLIGHTS_STALE_TTL", str(7 * 24 * 3600))))
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def highlights_cache_key(search_params):
+    year = search_params["publishedAfter"][:4] if "publishedAfter" in search_params else "latest"
+    return f"{fold(search_params['q'])}|{year}|{search_params['order']}|{search_params['maxResults']}"
+
+
+def highlights_ttl(search_params):
+    if "publishedAfter" not in search_params:
+        return HIGHLIGHTS_TTL_LATEST
+    if int(search_params["publishedAfter"][:4]) < datetime.now().year:
+        return HIGHLIGHTS_TTL_PAST_YEAR
+    return HIGHLIGHTS_TTL_CURRENT_YEAR
+
+
+def _is_quota_error(status, body):
+    if status != 403:
+        return False
+    errors = (body or {}).get("error", {}).get("errors", [])
+    return any(e.get("reason") in ("quotaExceeded", "dailyLimitExceeded") for e in errors)
+
+
+def _reserve_search():
+    """Charge one search to the daily quota; raises QuotaExceeded when it is used up."""
+    if youtube_quota.remaining() < SEARCH_COST:
+        raise QuotaExceeded("YouTube quota used up for today")
+    youtube_quota.spend(SEARCH_COST)
+
+
+async def _aquota(call):
+    # The quota counters are pymongo calls with the mongo backend; keep the event loop free
+    if youtube_quota.blocking:
+        return await asyncio.to_thread(call)
+    return call()
+
+
+def _search_videos(search_params):
+    _reserve_search()
+    request = youtube.search().list(**search_params)
+    try:
+        response = request.execute()
+    except HttpError as e:
+        try:
+            body = json.loads(e.content)
+        except ValueError:
+            body = None
+        if _is_quota_error(e.resp.status, body):
+            youtube_quota.exhaust()
+            raise QuotaExceeded("YouTube quota exceeded") from e
+        raise
+    return response.get("items", [])
+
+
+async def _asearch_videos(search_params):
+    await _aquota(_reserve_search)
+    response = await get_async_client().get(YOUTUBE_SEARCH_URL, params={**search_params, "key": youtube_key})
+    if response.status_code == 403:
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if _is_quota_error(403, body):
+            await _aquota(youtube_quota.exhaust)
+            raise QuotaExceeded("YouTube quota exceeded")
+    response.raise_for_status()
+    return response.json().get("items", [])
+
+
+def _get_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3) -> str:
     """
     Fetches Formula 1 highlight videos from the official Formula 1 YouTube channel.
     If a year is specified, searches for highlights from that year.
@@ -20,6 +119,38 @@ def get_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3)
     - "Singapore Grand Prix" - Gets most recent Singapore GP highlights
     - "highlights 2022" - Gets general F1 highlights from 2022
     """
+    search_query, search_params = build_search_params(query, max_results)
+    # The local index of the channel's uploads answers most queries without touching the API
+    videos = search_index(search_params)
+    if videos:
+        return format_highlights(search_query, videos, max_results)
+    try:
+        videos = highlights_cache.get_or_fetch(
+            highlights_cache_key(search_params), lambda: _search_videos(search_params),
+            highlights_ttl(search_params), prefer_stale=youtube_quota.nearly_exhausted,
+        )
+    except QuotaExceeded:
+        return "YouTube highlights are unavailable right now (daily API quota used up). Please try again later."
+    return format_highlights(search_query, videos, max_results)
+
+
+async def _aget_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3) -> str:
+    search_query, search_params = build_search_params(query, max_results)
+    videos = search_index(search_params)
+    if videos:
+        return format_highlights(search_query, videos, max_results)
+    try:
+        videos = await highlights_cache.aget_or_fetch(
+            highlights_cache_key(search_params), lambda: _asearch_videos(search_params),
+            highlights_ttl(search_params), prefer_stale=youtube_quota.nearly_exhausted,
+        )
+    except QuotaExceeded:
+        return "YouTube highlights are unavailable right now (daily API quota used up). Please try again later."
+    return format_highlights(search_query, videos, max_results)
+
+
+# Returns (search_query, params for youtube.search().list)
+def build_search_params(query, max_results):
     current_year = datetime.now().year
     
     # Detect an explicit year in the user's query (e.g., "2024", "2023")
@@ -51,11 +182,11 @@ def get_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3)
     else:
         # For most recent, order by date
         search_params["order"] = "date"
-    
-    request = youtube.search().list(**search_params)
-    response = request.execute()
-    videos = response.get("items", [])
-    
+
+    return search_query, search_params
+
+
+def format_highlights(search_query, videos, max_results):
     if not videos:
         return f"No F1 videos found for '{search_query}'."
     
@@ -84,3 +215,10 @@ def get_f1_highlights(query: str = "Formula 1 highlights", max_results: int = 3)
         output.append(formatted)
     
     return "".join(output)
+
+
+get_f1_highlights = StructuredTool.from_function(
+    func=_get_f1_highlights,
+    coroutine=_aget_f1_highlights,
+    name="get_f1_highlights",
+)
@@ -1,16 +1,26 @@
 from flask import Flask, request, jsonify, redirect, url_for, session
-from flask import send_from_directory
+from flask import send_from_directory, Response, stream_with_context
 from flask_pymongo import PyMongo
+from pymongo.errors import DuplicateKeyError
 from flask_cors import CORS
 from authlib.integrations.flask_client import OAuth
 from uuid import uuid4
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 import os
+import json
 from werkzeug.utils import secure_filename
+from langchain_core.messages import AIMessageChunk, ToolMessage
 from main import agent_executor, HumanMessage, AIMessage, memory
-from security.input_validator import validate_user_input
+from security.input_validator import validate_user_input, start_rule_reloader
 from security.nosql_protection import protect_session_id, protect_user_id, sanitize_for_mongodb
+from agents.highlights_index import start_background_crawler
+from agents.weather_forecast import start_forecast_refresher
+from agents.intent_router import route_intent, answer_routed
+from agents.response_cache import lookup_first_turn, record_cached_turn, response_cache
+from chat_history import history_etag, load_page, parse_page_args, rebuild_projection, record_turn
+from checkpoint_retention import start_checkpoint_retention
+from db_indexes import ensure_indexes
 
 # Load environment variables
 load_dotenv()
@@ -25,11 +35,27 @@ app.config["MONGO_URI"] = os.getenv("MONGO_URI")
 mongo = PyMongo(app)
 users = mongo.db.Users  # Collection for user profiles
 sessions = mongo.db.Sessions  # Collection for session metadata (title, visibility, ownership)
-# Note: Actual chat messages are stored by LangGraph in its checkpoint collection
+# Note: Actual chat messages are stored by LangGraph in its checkpoint collection;
+# ChatMessages holds a read-only projection of the visible messages for the history endpoints (see chat_history.py)
+chat_messages = mongo.db.ChatMessages
 
 # Allow CORS (for frontend)
 CORS(app, supports_credentials=True)
 
+# Keep the local YouTube highlights index, upcoming race-weekend forecasts and input rules fresh
+start_background_crawler()
+start_forecast_refresher()
+start_rule_reloader()
+
+# Indexes for the queries of the routes below and the retention job (see db_indexes.py)
+try:
+    ensure_indexes(mongo.db)
+except Exception as e:
+    print(f"Could not create indexes: {e}")
+
+# Trim old checkpoints and purge the conversations of long-deleted sessions (see checkpoint_retention.py)
+start_checkpoint_retention(memory, sessions, chat_messages)
+
 # OAuth setup
 app.config['SERVER_NAME'] = 'localhost:5000'
 
@@ -123,8 +149,12 @@ def google_auth():
             "favorite_driver": None,
             "favorite_team": None
         }
-        users.insert_one(user_data)
-        print("New user added to database:", user_data)
+        try:
+            users.insert_one(user_data)
+            print("New user added to database:", user_data)
+        except DuplicateKeyError:
+            # A concurrent first login created the user first (email is unique, see db_indexes.py)
+            user_data = users.find_one({"email": email})
 
     # Save user session (Flask session)
     session['user'] = {
@@ -161,7 +191,9 @@ def create_session_api():
     doc = {
         "_id": session_id,
         "created_at": datetime.now(timezone.utc),
-        "visible": True
+        "visible": True,
+        # Number of messages in the ChatMessages projection (also the history ETag)
+        "message_count": 0
     }
     if owner_id:
         doc["user_id"] = owner_id
@@ -170,53 +202,218 @@ def create_session_api():
     return jsonify({"session_id": session_id})
 
 
-# Send a message to the bot and get a response
-# This endpoint processes user queries using LangGraph agent executor
-# Messages are automatically stored in LangGraph's checkpoint (not in Sessions.messages)
-@app.route("/api/chat", methods=["POST"])
-def chat_api():
-    data = request.json
+# Framework-independent checks for the chat endpoints (also used by the ASGI app in asgi.py)
+# Returns (error_message, status_code, session_id, sanitized_query); error_message is None when valid
+def check_chat_payload(data):
+    data = data or {}
     session_id = data.get("session_id")
     query = data.get("query")
 
     if not session_id or not query:
-        return jsonify({"error": "session_id and query are required"}), 400
+        return "session_id and query are required", 400, None, None
 
     # Protect against NoSQL injection in session_id
     is_valid_session, error_msg = protect_session_id(session_id)
     if not is_valid_session:
-        return jsonify({"error": error_msg}), 400
+        return error_msg, 400, None, None
 
     # Validate and sanitize user input to prevent prompt injection attacks
     is_valid, error_message, sanitized_query = validate_user_input(query)
     if not is_valid:
-        return jsonify({"error": error_message}), 400
+        return error_message, 400, None, None
+
+    return None, 200, session_id, sanitized_query
+
+
+SESSION_NOT_FOUND_ERROR = "Session does not exist. Please create a session first."
+
+
+# Shared request checks for the chat endpoints
+# Returns (error_response, session_doc, session_id, sanitized_query); error_response is None when valid
+def _validate_chat_request(data):
+    error, status, session_id, sanitized_query = check_chat_payload(data)
+    if error:
+        return (jsonify({"error": error}), status), None, None, None
 
     s = sessions.find_one({"_id": session_id, "visible": True})
     if not s:
-        return jsonify({"error": "Session does not exist. Please create a session first."}), 404
-
-    # Invoke agent with thread_id - LangGraph automatically:
-    # 1. Retrieves conversation history for this thread_id
-    # 2. Processes the new message with full context
-    # 3. Stores updated conversation in its checkpoint collection
-    # Use sanitized_query instead of raw query
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=sanitized_query)]},
-        config={"configurable": {"thread_id": session_id}}
-    )
-    agent_reply = response["messages"][-1].content
+        return (jsonify({"error": SESSION_NOT_FOUND_ERROR}), 404), None, None, None
 
-    # Set session title from first user message (use sanitized query)
+    return None, s, session_id, sanitized_query
+
+
+# Set session title from first user message (use sanitized query)
+def session_title_update(s, sanitized_query):
+    """Return the $set update for a session without a title yet, else None."""
     if "title" not in s:
-        sessions.update_one(
-            {"_id": session_id},
-            {"$set": {"title": sanitized_query[:50]}}
+        return {"$set": {"title": sanitized_query[:50]}}
+    return None
+
+
+def _set_session_title(s, session_id, sanitized_query):
+    update = session_title_update(s, sanitized_query)
+    if update:
+        sessions.update_one({"_id": session_id}, update)
+
+
+# Send a message to the bot and get a response
+# This endpoint processes user queries using LangGraph agent executor
+# Messages are automatically stored in LangGraph's checkpoint (not in Sessions.messages)
+@app.route("/api/chat", methods=["POST"])
+def chat_api():
+    error, s, session_id, sanitized_query = _validate_chat_request(request.json)
+    if error:
+        return error
+
+    config = {"configurable": {"thread_id": session_id}}
+
+    # Clear standings, odds and weather questions skip the LLM: one tool call, templated answer,
+    # and the turn is still saved into the checkpoint
+    route = route_intent(sanitized_query)
+    # Opening questions are answered from the response cache when the same question was asked recently
+    probe = None if route else lookup_first_turn(s, sanitized_query)
+    if route:
+        agent_reply = answer_routed(agent_executor, route, sanitized_query, config)[-1].content
+    elif probe and probe.reply is not None:
+        agent_reply = probe.reply
+        record_cached_turn(agent_executor, sanitized_query, agent_reply, config)
+    else:
+        # Invoke agent with thread_id - LangGraph automatically:
+        # 1. Retrieves conversation history for this thread_id
+        # 2. Processes the new message with full context
+        # 3. Stores updated conversation in its checkpoint collection
+        # Use sanitized_query instead of raw query
+        response = agent_executor.invoke(
+            {"messages": [HumanMessage(content=sanitized_query)]},
+            config=config
         )
+        agent_reply = response["messages"][-1].content
+        if probe:
+            response_cache.store(probe, agent_reply)
+
+    _set_session_title(s, session_id, sanitized_query)
+    record_turn(sessions, chat_messages, session_id, sanitized_query, message_text(agent_reply))
 
     return jsonify({"response": agent_reply})
 
 
+# Format one Server-Sent Event
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+# Gemini may return message content as a list of parts; keep only the text
+def message_text(content):
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+AGENT_STREAM_MODES = ["messages", "updates"]
+
+
+# Translate one item of agent_executor.stream(..., stream_mode=AGENT_STREAM_MODES) into (event, payload) pairs
+# The agent's final answer is reported as a ("final", {"response": ...}) pair instead of an SSE event
+def agent_stream_events(mode, chunk):
+    if mode == "messages":
+        message, metadata = chunk
+        if isinstance(message, AIMessageChunk) and metadata.get("langgraph_node") == "agent":
+            text = message_text(message.content)
+            if text:
+                yield "token", {"content": text}
+        return
+
+    for update in chunk.values():
+        for msg in (update or {}).get("messages", []):
+            if isinstance(msg, ToolMessage):
+                yield "tool_end", {"tool": msg.name, "id": msg.tool_call_id, "status": getattr(msg, "status", "success")}
+            elif isinstance(msg, AIMessage) and msg.tool_calls:
+                for call in msg.tool_calls:
+                    yield "tool_start", {"tool": call["name"], "args": call["args"], "id": call["id"]}
+            elif isinstance(msg, AIMessage):
+                yield "final", {"response": message_text(msg.content)}
+
+
+# Replay a routed turn (see agents/intent_router.py) as the (mode, chunk) items agent_executor.stream yields,
+# so clients get the same tool_start / tool_end / token / done events as for an agent turn
+def routed_stream_chunks(messages):
+    reply = messages[-1]
+    return [
+        ("updates", {"agent": {"messages": [messages[1]]}}),
+        ("updates", {"tools": {"messages": [messages[2]]}}),
+        ("messages", (AIMessageChunk(content=reply.content), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [reply]}}),
+    ]
+
+
+# Replay a reply from the response cache (see agents/response_cache.py) as one token event and the final answer
+def cached_stream_chunks(reply):
+    return [
+        ("messages", (AIMessageChunk(content=reply), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [AIMessage(content=reply)]}}),
+    ]
+
+
+# Streaming variant of /api/chat (Server-Sent Events)
+# Events: token (LLM text as it is generated), tool_start / tool_end (tool calls of the ReAct loop),
+# done (final answer, sent after the session title is updated) and error
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream_api():
+    error, s, session_id, sanitized_query = _validate_chat_request(request.json)
+    if error:
+        return error
+
+    def generate():
+        final_reply = ""
+        config = {"configurable": {"thread_id": session_id}}
+        try:
+            route = route_intent(sanitized_query)
+            probe = None if route else lookup_first_turn(s, sanitized_query)
+            if route:
+                # A routed turn is reported with the same events as an agent turn with one tool call
+                chunks = routed_stream_chunks(answer_routed(agent_executor, route, sanitized_query, config))
+            elif probe and probe.reply is not None:
+                record_cached_turn(agent_executor, sanitized_query, probe.reply, config)
+                chunks = cached_stream_chunks(probe.reply)
+            else:
+                # "messages" yields LLM token chunks, "updates" yields each node's output (tool calls and results)
+                chunks = agent_executor.stream(
+                    {"messages": [HumanMessage(content=sanitized_query)]},
+                    config=config,
+                    stream_mode=AGENT_STREAM_MODES,
+                )
+            for mode, chunk in chunks:
+                for event, payload in agent_stream_events(mode, chunk):
+                    if event == "final":
+                        final_reply = payload["response"]
+                    else:
+                        yield sse_event(event, payload)
+            if probe and probe.reply is None:
+                response_cache.store(probe, final_reply)
+        except Exception:
+            import traceback
+            print("Error while streaming chat response:", traceback.format_exc())
+            yield sse_event("error", {"error": "Internal server error"})
+            return
+
+        _set_session_title(s, session_id, sanitized_query)
+        record_turn(sessions, chat_messages, session_id, sanitized_query, final_reply)
+        yield sse_event("done", {"response": final_reply})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Disable proxy buffering so events reach the browser as soon as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # List all visible chat sessions for the current user
 @app.route("/api/sessions", methods=["GET"])
 def list_sessions_api():
@@ -324,47 +521,56 @@ def update_profile():
 #     return jsonify({"photo_url": public_url})
 
 
-# Get message history of a specific session
-# Retrieves messages from LangGraph's checkpoint storage
-@app.route("/api/session/<session_id>", methods=["GET"])
-def get_history_api(session_id):
+# Shared part of the history endpoints: the session's page of projected messages, with the
+# message count as ETag so an unchanged history is answered with 304 Not Modified
+def _history_response(session_id, before=None, limit=None):
     # Protect against NoSQL injection in session_id
     is_valid_session, error_msg = protect_session_id(session_id)
     if not is_valid_session:
         return jsonify({"error": error_msg}), 400
-    
-    s = sessions.find_one({"_id": session_id, "visible": True})
+
+    s = sessions.find_one({"_id": session_id, "visible": True}, {"message_count": 1})
     if not s:
         return jsonify({"error": "Session not found"}), 404
-    
-    # Retrieve messages from LangGraph's checkpoint using get_state()
-    config = {"configurable": {"thread_id": session_id}}
+
     try:
-        state = agent_executor.get_state(config)
-        messages = []
-        
-        if state and hasattr(state, 'values') and 'messages' in state.values:
-            for msg in state.values['messages']:
-                # Determine role based on message type
-                if isinstance(msg, HumanMessage):
-                    role = "user"
-                elif isinstance(msg, AIMessage):
-                    role = "assistant"
-                else:
-                    # Skip other message types (ToolMessage, SystemMessage, etc.)
-                    continue
-                
-                messages.append({
-                    "role": role,
-                    "content": msg.content
-                })
-        
-        return jsonify({"messages": messages})
+        if "message_count" not in s:
+            # Session from before the projection (or a failed projection write): rebuild it once from the checkpoint
+            state = agent_executor.get_state({"configurable": {"thread_id": session_id}})
+            s = rebuild_projection(sessions, chat_messages, session_id, state)
+
+        etag = history_etag(s)
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = jsonify(load_page(chat_messages, session_id, before, limit))
     except Exception as e:
-        print(f"Error retrieving messages from checkpoint: {e}")
+        print(f"Error retrieving messages of session {session_id}: {e}")
         import traceback
         print(traceback.format_exc())
-        return jsonify({"messages": []})
+        return jsonify({"messages": [], "next_before": None})
+
+    resp.set_etag(etag)
+    # Let the browser keep the history but revalidate it on every load
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+# Get message history of a specific session (all messages)
+@app.route("/api/session/<session_id>", methods=["GET"])
+def get_history_api(session_id):
+    return _history_response(session_id)
+
+
+# Get one page of a session's messages, oldest first
+# Query: limit (default 50, max 200) and before (seq cursor, from next_before of the previous page)
+# Returns: {"messages": [{seq, role, content}], "next_before": seq cursor of the older page or null}
+@app.route("/api/session/<session_id>/messages", methods=["GET"])
+def get_messages_api(session_id):
+    before, limit, error = parse_page_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return _history_response(session_id, before, limit)
 
 
 # Soft delete a session (mark as invisible)
@@ -375,7 +581,8 @@ def delete_session_api(session_id):
     if not is_valid_session:
         return jsonify({"error": error_msg}), 400
     
-    result = sessions.update_one({"_id": session_id}, {"$set": {"visible": False}})
+    # deleted_at starts the grace period before the conversation data is purged (see checkpoint_retention.py)
+    result = sessions.update_one({"_id": session_id}, {"$set": {"visible": False, "deleted_at": datetime.now(timezone.utc)}})
 
     if result.matched_count > 0:
         return jsonify({"message": f"Session {session_id} deleted successfully."})
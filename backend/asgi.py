@@ -0,0 +1,249 @@
+"""
+Async serving mode for the chat API.
+
+The Flask app in app.py holds a worker thread for the whole LLM and tool latency
+of every /api/chat request. This module serves the chat routes natively on an
+ASGI stack instead: the agent runs with ainvoke/astream on an AsyncMongoDBSaver,
+session metadata goes through pymongo's AsyncMongoClient, and one event loop
+can hold hundreds of conversations that are mostly waiting on Gemini, Tavily,
+YouTube or OpenWeather. Every other route (OAuth, profile, session management)
+is still served by the Flask app, mounted underneath.
+
+Run from the backend directory:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import os
+import traceback
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from dotenv import load_dotenv
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from pymongo import AsyncMongoClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app,
+    sessions,
+    chat_messages,
+    AGENT_STREAM_MODES,
+    SESSION_NOT_FOUND_ERROR,
+    agent_stream_events,
+    cached_stream_chunks,
+    check_chat_payload,
+    message_text,
+    routed_stream_chunks,
+    session_title_update,
+    sse_event,
+)
+from main import build_agent, memory, HumanMessage
+from agents.intent_router import route_intent, aanswer_routed
+from agents.response_cache import alookup_first_turn, arecord_cached_turn, response_cache
+from chat_history import aload_page, arebuild_projection, arecord_turn, etag_matches, history_etag, parse_page_args
+from security.nosql_protection import protect_session_id
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # AsyncMongoDBSaver binds to the running event loop, so it is created here rather than at import time
+    client = AsyncMongoClient(MONGO_URI)
+    # Same database and collections as the sync checkpointer, so both servers see the same conversations
+    checkpointer = AsyncMongoDBSaver(
+        client,
+        db_name=memory.checkpoint_collection.database.name,
+        checkpoint_collection_name=memory.checkpoint_collection.name,
+        writes_collection_name=memory.writes_collection.name,
+    )
+    app.state.agent = build_agent(checkpointer)
+    app.state.sessions = client[sessions.database.name][sessions.name]
+    app.state.chat_messages = client[chat_messages.database.name][chat_messages.name]
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+async def _validate_chat_request(request):
+    """Async counterpart of app._validate_chat_request; returns (error_response, session_doc, session_id, query)."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    error, status, session_id, sanitized_query = check_chat_payload(data)
+    if error:
+        return JSONResponse({"error": error}, status_code=status), None, None, None
+
+    s = await request.app.state.sessions.find_one({"_id": session_id, "visible": True})
+    if not s:
+        return JSONResponse({"error": SESSION_NOT_FOUND_ERROR}, status_code=404), None, None, None
+
+    return None, s, session_id, sanitized_query
+
+
+async def _set_session_title(request, s, session_id, sanitized_query):
+    update = session_title_update(s, sanitized_query)
+    if update:
+        await request.app.state.sessions.update_one({"_id": session_id}, update)
+
+
+# Same contract as POST /api/chat in app.py
+async def chat_api(request):
+    error, s, session_id, sanitized_query = await _validate_chat_request(request)
+    if error:
+        return error
+
+    config = {"configurable": {"thread_id": session_id}}
+    route = route_intent(sanitized_query)
+    probe = None if route else await alookup_first_turn(s, sanitized_query)
+    if route:
+        messages = await aanswer_routed(request.app.state.agent, route, sanitized_query, config)
+        agent_reply = messages[-1].content
+    elif probe and probe.reply is not None:
+        agent_reply = probe.reply
+        await arecord_cached_turn(request.app.state.agent, sanitized_query, agent_reply, config)
+    else:
+        response = await request.app.state.agent.ainvoke(
+            {"messages": [HumanMessage(content=sanitized_query)]},
+            config=config
+        )
+        agent_reply = response["messages"][-1].content
+        if probe:
+            await response_cache.astore(probe, agent_reply)
+
+    await _set_session_title(request, s, session_id, sanitized_query)
+    await arecord_turn(request.app.state.sessions, request.app.state.chat_messages, session_id, sanitized_query,
+                       message_text(agent_reply))
+
+    return JSONResponse({"response": agent_reply})
+
+
+# (mode, chunk) items of one turn: the agent's astream, or the replay of a routed or cached turn
+async def _turn_chunks(agent, route, probe, sanitized_query, config):
+    if route:
+        for item in routed_stream_chunks(await aanswer_routed(agent, route, sanitized_query, config)):
+            yield item
+        return
+    if probe and probe.reply is not None:
+        await arecord_cached_turn(agent, sanitized_query, probe.reply, config)
+        for item in cached_stream_chunks(probe.reply):
+            yield item
+        return
+    async for item in agent.astream(
+        {"messages": [HumanMessage(content=sanitized_query)]},
+        config=config,
+        stream_mode=AGENT_STREAM_MODES,
+    ):
+        yield item
+
+
+# Same events as POST /api/chat/stream in app.py
+async def chat_stream_api(request):
+    error, s, session_id, sanitized_query = await _validate_chat_request(request)
+    if error:
+        return error
+
+    async def generate():
+        final_reply = ""
+        config = {"configurable": {"thread_id": session_id}}
+        try:
+            route = route_intent(sanitized_query)
+            probe = None if route else await alookup_first_turn(s, sanitized_query)
+            async for mode, chunk in _turn_chunks(request.app.state.agent, route, probe, sanitized_query, config):
+                for event, payload in agent_stream_events(mode, chunk):
+                    if event == "final":
+                        final_reply = payload["response"]
+                    else:
+                        yield sse_event(event, payload)
+            if probe and probe.reply is None:
+                await response_cache.astore(probe, final_reply)
+        except Exception:
+            print("Error while streaming chat response:", traceback.format_exc())
+            yield sse_event("error", {"error": "Internal server error"})
+            return
+
+        await _set_session_title(request, s, session_id, sanitized_query)
+        await arecord_turn(request.app.state.sessions, request.app.state.chat_messages, session_id, sanitized_query,
+                           final_reply)
+        yield sse_event("done", {"response": final_reply})
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Same contract as app._history_response
+async def _history_response(request, before=None, limit=None):
+    session_id = request.path_params["session_id"]
+    is_valid_session, error_msg = protect_session_id(session_id)
+    if not is_valid_session:
+        return JSONResponse({"error": error_msg}, status_code=400)
+
+    s = await request.app.state.sessions.find_one({"_id": session_id, "visible": True}, {"message_count": 1})
+    if not s:
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+
+    try:
+        if "message_count" not in s:
+            state = await request.app.state.agent.aget_state({"configurable": {"thread_id": session_id}})
+            s = await arebuild_projection(request.app.state.sessions, request.app.state.chat_messages, session_id, state)
+
+        etag = history_etag(s)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            resp = Response(status_code=304)
+        else:
+            resp = JSONResponse(await aload_page(request.app.state.chat_messages, session_id, before, limit))
+    except Exception as e:
+        print(f"Error retrieving messages of session {session_id}: {e}")
+        print(traceback.format_exc())
+        return JSONResponse({"messages": [], "next_before": None})
+
+    resp.headers["ETag"] = f'"{etag}"'
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+# Same contract as GET /api/session/<session_id> in app.py
+async def get_history_api(request):
+    return await _history_response(request)
+
+
+# Same contract as GET /api/session/<session_id>/messages in app.py
+async def get_messages_api(request):
+    before, limit, error = parse_page_args(request.query_params)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    return await _history_response(request, before, limit)
+
+
+async def handle_exception(request, exc):
+    print("Internal server error:", traceback.format_exc())
+    return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+
+app = Starlette(
+    routes=[
+        Route("/api/chat", chat_api, methods=["POST"]),
+        Route("/api/chat/stream", chat_stream_api, methods=["POST"]),
+        Route("/api/session/{session_id}", get_history_api, methods=["GET"]),
+        Route("/api/session/{session_id}/messages", get_messages_api, methods=["GET"]),
+        # Everything else (OAuth, profile, session management) is still handled by Flask
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    # Mirrors CORS(app, supports_credentials=True) in app.py for the native routes
+    middleware=[
+        Middleware(CORSMiddleware, allow_origin_regex=".*", allow_credentials=True,
+                   allow_methods=["*"], allow_headers=["*"]),
+    ],
+    exception_handlers={Exception: handle_exception},
+    lifespan=lifespan,
+)
@@ -0,0 +1,171 @@
+"""
+Chat-message projection for the history endpoints.
+
+Loading a session used to mean agent_executor.get_state(): reading and
+deserializing the thread's latest checkpoint (every tool call and tool output
+included) just to list user and assistant texts. The history is now projected
+into F1_chatbot.ChatMessages, one document per visible message:
+    {_id: "<session_id>:<seq>", session_id, seq, role, content, created_at}
+written after each turn, with the session's message count kept on the session
+document (Sessions.message_count). Reads are a single range query on the
+(session_id, seq) index (see db_indexes.py), paginated with a "before" cursor, and the message count
+doubles as the ETag, so an unchanged history answers 304 after one
+session lookup.
+
+Sessions created before the projection have no message_count; their first
+history read rebuilds the projection from the checkpoint. A failed projection
+write clears message_count, so the next read rebuilds it the same way.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from langchain_core.messages import AIMessage, HumanMessage
+from pymongo import DESCENDING, ReturnDocument
+from agents.context_window import message_text
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+_PAGE_FIELDS = {"_id": 0, "seq": 1, "role": 1, "content": 1}
+
+
+def checkpoint_messages(state) -> List[Tuple[str, str]]:
+    """(role, content) of the user and assistant messages of a checkpoint state; tool-call steps are skipped."""
+    messages = []
+    values = getattr(state, "values", None) or {}
+    for msg in values.get("messages", []):
+        if isinstance(msg, HumanMessage):
+            messages.append(("user", message_text(msg)))
+        elif isinstance(msg, AIMessage):
+            text = message_text(msg)
+            if text:
+                messages.append(("assistant", text))
+    return messages
+
+
+def _docs(session_id: str, first_seq: int, messages: List[Tuple[str, str]]) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {"_id": f"{session_id}:{seq}", "session_id": session_id, "seq": seq, "role": role, "content": content, "created_at": now}
+        for seq, (role, content) in enumerate(messages, first_seq)
+    ]
+
+
+def history_etag(session_doc: dict) -> str:
+    # Messages are append-only, so the count identifies the history's state
+    return f"{session_doc['_id']}-{session_doc.get('message_count', 0)}"
+
+
+def parse_page_args(args) -> Tuple[Optional[int], int, Optional[str]]:
+    """(before, limit, error) from the query string of a paginated history request."""
+    try:
+        before = int(args["before"]) if args.get("before") not in (None, "") else None
+        limit = int(args.get("limit") or HISTORY_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return None, 0, "before and limit must be integers"
+    if limit < 1 or limit > HISTORY_MAX_PAGE_SIZE:
+        return None, 0, f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}"
+    return before, limit, None
+
+
+def _page_query(session_id: str, before: Optional[int]) -> dict:
+    query = {"session_id": session_id}
+    if before is not None:
+        query["seq"] = {"$lt": before}
+    return query
+
+
+def _page(docs: List[dict], limit: Optional[int]) -> dict:
+    """Docs come newest first (one more than limit, to know whether older ones exist); pages go oldest first."""
+    more = limit is not None and len(docs) > limit
+    docs = docs[:limit] if limit is not None else docs
+    docs.reverse()
+    return {"messages": docs, "next_before": docs[0]["seq"] if more and docs else None}
+
+
+def _count_update(session_id: str) -> Tuple[dict, dict]:
+    # Reserves two seqs for the turn; sessions without a projection are left alone
+    return {"_id": session_id, "message_count": {"$exists": True}}, {"$inc": {"message_count": 2}}
+
+
+_COUNT_UPDATE_OPTIONS = {"projection": {"message_count": 1}, "return_document": ReturnDocument.AFTER}
+
+
+def _invalidate(session_id: str) -> Tuple[dict, dict]:
+    # A session without message_count is rebuilt from its checkpoint on the next read
+    return {"_id": session_id}, {"$unset": {"message_count": ""}}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value lists etag (for the ASGI app; Flask parses the header itself)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/").strip('"') == etag for t in tags)
+
+
+# --- sync (Flask) ---
+
+def record_turn(sessions, chat_messages, session_id: str, query: str, reply: str) -> None:
+    """Append a finished turn (user message and assistant reply) to the projection."""
+    try:
+        s = sessions.find_one_and_update(*_count_update(session_id), **_COUNT_UPDATE_OPTIONS)
+        if s is None:
+            # Not projected yet; the next history read rebuilds everything from the checkpoint
+            return
+        chat_messages.insert_many(_docs(session_id, s["message_count"] - 2, [("user", query), ("assistant", reply)]))
+    except Exception as e:
+        print(f"Chat history projection write failed for {session_id}: {e}")
+        try:
+            sessions.update_one(*_invalidate(session_id))
+        except Exception as e:
+            print(f"Chat history projection of {session_id} could not be invalidated: {e}")
+
+
+def rebuild_projection(sessions, chat_messages, session_id: str, state) -> dict:
+    """Project a session's history from its checkpoint state; returns the updated message_count fields."""
+    messages = checkpoint_messages(state)
+    chat_messages.delete_many({"session_id": session_id})
+    if messages:
+        chat_messages.insert_many(_docs(session_id, 0, messages))
+    sessions.update_one({"_id": session_id}, {"$set": {"message_count": len(messages)}})
+    return {"_id": session_id, "message_count": len(messages)}
+
+
+def load_page(chat_messages, session_id: str, before: Optional[int] = None, limit: Optional[int] = HISTORY_PAGE_SIZE) -> dict:
+    """The limit messages before seq `before` (newest if None), oldest first; limit None loads everything."""
+    cursor = chat_messages.find(_page_query(session_id, before), _PAGE_FIELDS).sort("seq", DESCENDING)
+    if limit is not None:
+        cursor = cursor.limit(limit + 1)
+    return _page(list(cursor), limit)
+
+
+# --- async (ASGI, pymongo AsyncMongoClient) ---
+
+async def arecord_turn(sessions, chat_messages, session_id: str, query: str, reply: str) -> None:
+    try:
+        s = await sessions.find_one_and_update(*_count_update(session_id), **_COUNT_UPDATE_OPTIONS)
+        if s is None:
+            return
+        await chat_messages.insert_many(_docs(session_id, s["message_count"] - 2, [("user", query), ("assistant", reply)]))
+    except Exception as e:
+        print(f"Chat history projection write failed for {session_id}: {e}")
+        try:
+            await sessions.update_one(*_invalidate(session_id))
+        except Exception as e:
+            print(f"Chat history projection of {session_id} could not be invalidated: {e}")
+
+
+async def arebuild_projection(sessions, chat_messages, session_id: str, state) -> dict:
+    messages = checkpoint_messages(state)
+    await chat_messages.delete_many({"session_id": session_id})
+    if messages:
+        await chat_messages.insert_many(_docs(session_id, 0, messages))
+    await sessions.update_one({"_id": session_id}, {"$set": {"message_count": len(messages)}})
+    return {"_id": session_id, "message_count": len(messages)}
+
+
+async def aload_page(chat_messages, session_id: str, before: Optional[int] = None, limit: Optional[int] = HISTORY_PAGE_SIZE) -> dict:
+    cursor = chat_messages.find(_page_query(session_id, before), _PAGE_FIELDS).sort("seq", DESCENDING)
+    if limit is not None:
+        cursor = cursor.limit(limit + 1)
+    return _page(await cursor.to_list(None), limit)
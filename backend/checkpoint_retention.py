@@ -0,0 +1,314 @@
+"""
+Retention for the LangGraph checkpoint collections.
+
+MongoDBSaver keeps every intermediate checkpoint of every thread (one per
+graph step, so several per chat turn) together with the pending writes of
+each step, and soft-deleted sessions keep all of theirs. The agent only ever
+loads a thread's latest checkpoint and that checkpoint's writes, so a
+retention pass:
+- keeps the CHECKPOINT_KEEP_LAST newest checkpoints of each thread (per
+  checkpoint namespace) and deletes the older ones
+- deletes the writes of every checkpoint but the newest; a newer checkpoint
+  already contains their effect (this also removes writes left behind by
+  deleted checkpoints)
+- purges the checkpoints, writes and message projection (see chat_history.py)
+  of sessions deleted more than CHECKPOINT_PURGE_AFTER_DAYS ago. The session
+  document stays, marked purged_at. Sessions deleted before deleted_at was
+  recorded get it stamped on the first pass, so their grace period starts then.
+- deletes the tool outputs in ToolBlobs (see agents/tool_blobs.py) that no
+  remaining checkpoint or write refers to. A blob is shared by every thread
+  whose messages carry its hash, so it is kept while any of them does; blobs
+  stored in the last CHECKPOINT_BLOB_GRACE seconds are kept too, as the
+  checkpoint of a run in progress may not be saved yet.
+
+Threads (and, for the blob sweep, checkpoint and write documents) are walked
+in batches of CHECKPOINT_RETENTION_BATCH with a pause after each batch, so a
+pass never competes with the chat traffic for long. Every CHECKPOINT_RETENTION_INTERVAL
+seconds one worker (holding a lease in the Maintenance collection) runs a
+pass. Progress is logged and kept on the lease document:
+    db.Maintenance.findOne({_id: "checkpoint_retention"})
+
+One pass by hand, from the backend directory:
+    python checkpoint_retention.py
+"""
+import os
+import re
+import time
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from agents.tool_blobs import BLOB_COLLECTION
+
+# Checkpoints kept per thread; never fewer than two, so a run in progress always finds its own
+CHECKPOINT_KEEP_LAST = max(2, int(os.getenv("CHECKPOINT_KEEP_LAST", "5")))
+# Days a deleted session keeps its conversation data
+CHECKPOINT_PURGE_AFTER_DAYS = float(os.getenv("CHECKPOINT_PURGE_AFTER_DAYS", "30"))
+# Seconds between passes (0 disables the background job)
+CHECKPOINT_RETENTION_INTERVAL = int(os.getenv("CHECKPOINT_RETENTION_INTERVAL", "21600"))
+# Threads (or purged sessions) handled per batch, and the pause after each batch
+CHECKPOINT_RETENTION_BATCH = int(os.getenv("CHECKPOINT_RETENTION_BATCH", "100"))
+CHECKPOINT_RETENTION_PAUSE = float(os.getenv("CHECKPOINT_RETENTION_PAUSE", "1.0"))
+# Seconds after its last put during which a tool blob is never deleted
+CHECKPOINT_BLOB_GRACE = int(os.getenv("CHECKPOINT_BLOB_GRACE", "3600"))
+# Progress is logged every this many batches
+PROGRESS_EVERY = 10
+
+MAINTENANCE_COLLECTION = "Maintenance"
+LEASE_ID = "checkpoint_retention"
+
+# A blob reference ({"blob": <sha256>} in a ToolMessage artifact) as it appears in the serialized
+# checkpoint; any other SHA-256-shaped string only keeps a blob that could have gone
+_BLOB_REF = re.compile(rb"[0-9a-f]{64}")
+
+
+def blob_refs(value) -> Set[str]:
+    """Blob hashes found in a serialized checkpoint or write value."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if not isinstance(value, (bytes, bytearray)):
+        return set()
+    return {ref.decode("ascii") for ref in _BLOB_REF.findall(value)}
+
+
+class RetentionStats:
+    """Counters of one retention pass."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.threads_scanned = 0
+        self.threads_compacted = 0
+        self.checkpoints_deleted = 0
+        self.writes_deleted = 0
+        self.sessions_purged = 0
+        self.blobs_deleted = 0
+        self.batches = 0
+
+    def snapshot(self) -> Dict:
+        end = self.finished_at or datetime.now(timezone.utc)
+        return {
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_s": round((end - self.started_at).total_seconds(), 1),
+            "threads_scanned": self.threads_scanned,
+            "threads_compacted": self.threads_compacted,
+            "checkpoints_deleted": self.checkpoints_deleted,
+            "writes_deleted": self.writes_deleted,
+            "sessions_purged": self.sessions_purged,
+            "blobs_deleted": self.blobs_deleted,
+            "batches": self.batches,
+        }
+
+    def summary(self) -> str:
+        s = self.snapshot()
+        return (
+            f"{s['threads_scanned']} threads scanned ({s['threads_compacted']} compacted), "
+            f"{s['checkpoints_deleted']} checkpoints and {s['writes_deleted']} writes deleted, "
+            f"{s['sessions_purged']} deleted sessions purged, "
+            f"{s['blobs_deleted']} unreferenced tool blobs deleted in {s['elapsed_s']}s"
+        )
+
+
+class CheckpointRetention:
+    def __init__(self, checkpoints, writes, sessions, chat_messages, maintenance=None, blobs=None,
+                 keep_last: int = CHECKPOINT_KEEP_LAST, purge_after_days: float = CHECKPOINT_PURGE_AFTER_DAYS,
+                 batch: int = CHECKPOINT_RETENTION_BATCH, pause: float = CHECKPOINT_RETENTION_PAUSE,
+                 blob_grace: float = CHECKPOINT_BLOB_GRACE):
+        self.checkpoints = checkpoints
+        self.writes = writes
+        self.sessions = sessions
+        self.chat_messages = chat_messages
+        self.maintenance = maintenance if maintenance is not None else sessions.database[MAINTENANCE_COLLECTION]
+        # ToolBlobs lives next to the checkpoints in F1_chatbot
+        self.blobs = blobs if blobs is not None else checkpoints.database[BLOB_COLLECTION]
+        self.keep_last = max(2, keep_last)
+        self.purge_after = timedelta(days=purge_after_days)
+        self.batch = max(1, batch)
+        self.pause = pause
+        self.blob_grace = timedelta(seconds=blob_grace)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats: Optional[RetentionStats] = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    # --- compaction ---
+
+    def _next_thread(self, after: Optional[str]) -> Optional[str]:
+        # One index seek per thread: the smallest thread_id above the previous one
+        query = {} if after is None else {"thread_id": {"$gt": after}}
+        doc = self.checkpoints.find_one(query, {"_id": 0, "thread_id": 1}, sort=[("thread_id", ASCENDING)])
+        return doc["thread_id"] if doc else None
+
+    def compact_thread(self, thread_id: str) -> None:
+        """Keep the newest checkpoints of a thread and the writes of its newest checkpoint only."""
+        ids: Dict[str, List[str]] = {}
+        cursor = self.checkpoints.find(
+            {"thread_id": thread_id},
+            {"_id": 0, "checkpoint_ns": 1, "checkpoint_id": 1},
+            sort=[("checkpoint_ns", ASCENDING), ("checkpoint_id", DESCENDING)],
+        )
+        for doc in cursor:
+            ids.setdefault(doc["checkpoint_ns"], []).append(doc["checkpoint_id"])
+
+        compacted = False
+        for ns, checkpoint_ids in ids.items():
+            if len(checkpoint_ids) > self.keep_last:
+                deleted = self.checkpoints.delete_many(
+                    {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": {"$lt": checkpoint_ids[self.keep_last - 1]}}
+                ).deleted_count
+                self.stats.checkpoints_deleted += deleted
+                compacted = compacted or deleted > 0
+            # Checkpoint ids sort by creation time, so everything below the newest is superseded
+            deleted = self.writes.delete_many(
+                {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": {"$lt": checkpoint_ids[0]}}
+            ).deleted_count
+            self.stats.writes_deleted += deleted
+            compacted = compacted or deleted > 0
+        self.stats.threads_scanned += 1
+        self.stats.threads_compacted += compacted
+
+    def compact_all(self) -> None:
+        thread_id = self._next_thread(None)
+        while thread_id is not None:
+            self.compact_thread(thread_id)
+            if self.stats.threads_scanned % self.batch == 0:
+                self._end_batch()
+            thread_id = self._next_thread(thread_id)
+
+    # --- purge of deleted sessions ---
+
+    def purge_session(self, session_id: str) -> None:
+        self.stats.writes_deleted += self.writes.delete_many({"thread_id": session_id}).deleted_count
+        self.stats.checkpoints_deleted += self.checkpoints.delete_many({"thread_id": session_id}).deleted_count
+        self.chat_messages.delete_many({"session_id": session_id})
+        self.sessions.update_one({"_id": session_id}, {"$set": {"purged_at": datetime.now(timezone.utc)}})
+        self.stats.sessions_purged += 1
+
+    def purge_deleted(self) -> None:
+        now = datetime.now(timezone.utc)
+        # Start the grace period of sessions deleted before deleted_at existed
+        self.sessions.update_many({"visible": False, "deleted_at": {"$exists": False}}, {"$set": {"deleted_at": now}})
+        query = {"visible": False, "deleted_at": {"$lt": now - self.purge_after}, "purged_at": {"$exists": False}}
+        while True:
+            ids = [s["_id"] for s in self.sessions.find(query, {"_id": 1}, limit=self.batch)]
+            for session_id in ids:
+                self.purge_session(session_id)
+            if len(ids) < self.batch:
+                break
+            self._end_batch()
+
+    # --- sweep of unreferenced tool blobs ---
+
+    def _scan_refs(self, collection, field: str, refs: Set[str]) -> None:
+        # Checkpoints and writes are the largest documents: read one field, a batch at a time, pausing between
+        last = None
+        while True:
+            query = {} if last is None else {"_id": {"$gt": last}}
+            docs = list(collection.find(query, {field: 1}, sort=[("_id", ASCENDING)], limit=self.batch))
+            for doc in docs:
+                refs |= blob_refs(doc.get(field))
+            if len(docs) < self.batch:
+                return
+            last = docs[-1]["_id"]
+            self._end_batch()
+
+    def _referenced_blobs(self) -> Set[str]:
+        refs: Set[str] = set()
+        self._scan_refs(self.checkpoints, "checkpoint", refs)
+        self._scan_refs(self.writes, "value", refs)
+        return refs
+
+    def sweep_blobs(self) -> None:
+        """Delete the blobs no remaining checkpoint or write refers to (mark, then sweep)."""
+        cutoff = datetime.now(timezone.utc) - self.blob_grace
+        # Blobs stored before last_used existed fall back to created_at
+        idle = {"$or": [{"last_used": {"$lt": cutoff}}, {"last_used": {"$exists": False}, "created_at": {"$lt": cutoff}}]}
+        referenced = self._referenced_blobs()
+        unreferenced = [doc["_id"] for doc in self.blobs.find(idle, {"_id": 1}) if doc["_id"] not in referenced]
+        for start in range(0, len(unreferenced), self.batch):
+            # idle again: a put since the mark refreshed last_used and keeps the blob
+            self.stats.blobs_deleted += self.blobs.delete_many(
+                {"_id": {"$in": unreferenced[start:start + self.batch]}, **idle}
+            ).deleted_count
+            if start + self.batch < len(unreferenced):
+                self._end_batch()
+
+    # --- passes ---
+
+    def _end_batch(self) -> None:
+        self.stats.batches += 1
+        self._report_progress()
+        if self.stats.batches % PROGRESS_EVERY == 0:
+            print(f"Checkpoint retention in progress: {self.stats.summary()}")
+        time.sleep(self.pause)
+
+    def _report_progress(self) -> None:
+        try:
+            self.maintenance.update_one({"_id": LEASE_ID}, {"$set": {"progress": self.stats.snapshot()}})
+        except Exception as e:
+            print(f"Checkpoint retention progress could not be saved: {e}")
+
+    def _acquire_lease(self, seconds: float) -> bool:
+        """Whether this process may run the pass; at most one worker holds the lease at a time."""
+        now = datetime.now(timezone.utc)
+        try:
+            self.maintenance.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"lease_until": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "lease_until": now + timedelta(seconds=seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+        return True
+
+    def run_pass(self) -> RetentionStats:
+        """Run one full pass (compaction of every thread, the purge of deleted sessions, then the blob sweep)."""
+        self.stats = RetentionStats()
+        self.compact_all()
+        self.purge_deleted()
+        self.sweep_blobs()
+        self.stats.finished_at = datetime.now(timezone.utc)
+        try:
+            self.maintenance.update_one(
+                {"_id": LEASE_ID},
+                {"$set": {"progress": self.stats.snapshot(), "last_pass": self.stats.snapshot()}},
+            )
+        except Exception as e:
+            print(f"Checkpoint retention progress could not be saved: {e}")
+        print(f"Checkpoint retention pass finished: {self.stats.summary()}")
+        return self.stats
+
+    def _run_forever(self, interval: int) -> None:
+        while True:
+            try:
+                if self._acquire_lease(interval):
+                    self.run_pass()
+            except Exception as e:
+                print(f"Checkpoint retention pass failed: {e}")
+            time.sleep(interval)
+
+    def start(self, interval: int = CHECKPOINT_RETENTION_INTERVAL) -> None:
+        """Run a pass every interval seconds in a daemon thread (once per process; no-op when interval is 0)."""
+        if interval <= 0:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run_forever, args=(interval,), name="checkpoint-retention", daemon=True).start()
+
+
+def start_checkpoint_retention(memory, sessions, chat_messages) -> CheckpointRetention:
+    """Start the retention job for a MongoDBSaver's collections."""
+    retention = CheckpointRetention(memory.checkpoint_collection, memory.writes_collection, sessions, chat_messages)
+    retention.start()
+    return retention
+
+
+if __name__ == "__main__":
+    from main import memory, db
+    CheckpointRetention(memory.checkpoint_collection, memory.writes_collection, db["Sessions"], db["ChatMessages"]).run_pass()
@@ -0,0 +1,155 @@
+"""
+Indexes of the app's own collections, and a query-plan audit for them.
+
+Every route used to query Users and Sessions without a supporting index, so
+list_sessions_api scanned the whole Sessions collection and sorted the user's
+sessions in memory on each sidebar load. INDEXES declares what each query
+needs and ensure_indexes() creates it at startup (create_index is a no-op for
+an index that already exists).
+
+audit_query_plans() runs explain() on the queries the routes and background
+jobs issue (AUDITED_QUERIES) and reports every plan that scans the whole
+collection (COLLSCAN) or sorts in memory (SORT). Run it after changing a
+query or an index, against a database that has the indexes:
+    python db_indexes.py --ensure
+    python db_indexes.py --audit    # exit status 1 if any query plans a COLLSCAN
+
+The LangGraph checkpoint collections are indexed by MongoDBSaver itself.
+"""
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: list
+    name: str
+    unique: bool = False
+
+
+INDEXES = [
+    # google_auth looks users up by email; unique so two concurrent first logins cannot create two users
+    IndexSpec("Users", [("email", ASCENDING)], "email_unique", unique=True),
+    # /api/me/ and the profile routes
+    IndexSpec("Users", [("user_id", ASCENDING)], "user_id_unique", unique=True),
+    # list_sessions_api: equality on user_id and visible, newest first, without an in-memory sort
+    IndexSpec("Sessions", [("user_id", ASCENDING), ("visible", ASCENDING), ("created_at", DESCENDING)], "user_visible_created"),
+    # checkpoint_retention.purge_deleted: deleted sessions past their grace period
+    IndexSpec("Sessions", [("visible", ASCENDING), ("deleted_at", ASCENDING)], "visible_deleted_at"),
+    # History pages (chat_history.load_page) and the purge of a session's projection
+    IndexSpec("ChatMessages", [("session_id", ASCENDING), ("seq", ASCENDING)], "session_seq_unique", unique=True),
+    # checkpoint_retention.sweep_blobs: blobs not put within the grace period
+    IndexSpec("ToolBlobs", [("last_used", ASCENDING)], "last_used"),
+]
+
+
+class AuditedQuery(NamedTuple):
+    # Where the query is issued
+    label: str
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    limit: int = 0
+
+
+# Sample values stand in for the request's; the plan depends only on the query's shape
+_SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+
+AUDITED_QUERIES = [
+    AuditedQuery("google_auth: user by email", "Users", {"email": "audit@example.com"}, limit=1),
+    AuditedQuery("me_api / profile: user by user_id", "Users", {"user_id": _SAMPLE_ID}, limit=1),
+    AuditedQuery("list_sessions_api", "Sessions", {"visible": True, "user_id": _SAMPLE_ID}, [("created_at", DESCENDING)]),
+    AuditedQuery("chat / history: visible session", "Sessions", {"_id": _SAMPLE_ID, "visible": True}, limit=1),
+    AuditedQuery("chat_history.record_turn", "Sessions", {"_id": _SAMPLE_ID, "message_count": {"$exists": True}}, limit=1),
+    AuditedQuery("retention: stamp deleted_at", "Sessions", {"visible": False, "deleted_at": {"$exists": False}}),
+    AuditedQuery(
+        "retention: sessions to purge", "Sessions",
+        {"visible": False, "deleted_at": {"$lt": datetime(2000, 1, 1, tzinfo=timezone.utc)}, "purged_at": {"$exists": False}},
+    ),
+    AuditedQuery("history page", "ChatMessages", {"session_id": _SAMPLE_ID, "seq": {"$lt": 50}}, [("seq", DESCENDING)], 51),
+    AuditedQuery("retention / rebuild: session projection", "ChatMessages", {"session_id": _SAMPLE_ID}),
+    AuditedQuery(
+        "retention: idle tool blobs", "ToolBlobs",
+        {"$or": [{"last_used": {"$lt": datetime(2000, 1, 1, tzinfo=timezone.utc)}},
+                 {"last_used": {"$exists": False}, "created_at": {"$lt": datetime(2000, 1, 1, tzinfo=timezone.utc)}}]},
+    ),
+]
+
+
+def ensure_indexes(db) -> None:
+    """Create the declared indexes; an index that cannot be built is logged and the others still created."""
+    for spec in INDEXES:
+        try:
+            db[spec.collection].create_index(spec.keys, name=spec.name, unique=spec.unique)
+        except (DuplicateKeyError, OperationFailure) as e:
+            # Typically duplicate emails or an index of the same name with other options; fix the data and restart
+            print(f"Could not create index {spec.collection}.{spec.name}: {e}")
+
+
+def plan_stages(plan) -> List[str]:
+    """All stage names of an explain() plan tree (classic and slot-based engine layouts)."""
+    stages = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key in ("inputStage", "inputStages", "queryPlan", "winningPlan", "shards", "innerStage", "outerStage"):
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def explain_query(db, query: AuditedQuery) -> List[str]:
+    cursor = db[query.collection].find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    if query.limit:
+        cursor = cursor.limit(query.limit)
+    return plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+
+
+def audit_query_plans(db) -> Dict[str, List[str]]:
+    """label -> problems ("COLLSCAN", "SORT") of each audited query; queries with a clean plan are left out."""
+    problems = {}
+    for query in AUDITED_QUERIES:
+        stages = explain_query(db, query)
+        found = [stage for stage in ("COLLSCAN", "SORT") if stage in stages]
+        if found:
+            problems[query.label] = found
+    return problems
+
+
+def _database():
+    from pymongo import MongoClient
+    # The database named in MONGO_URI, as in app.py (F1_chatbot when the URI names none, as in main.py)
+    return MongoClient(os.getenv("MONGO_URI")).get_default_database("F1_chatbot")
+
+
+def _audit(db) -> int:
+    problems = audit_query_plans(db)
+    for query in AUDITED_QUERIES:
+        found = problems.get(query.label)
+        if found:
+            print(f"{'❌' if 'COLLSCAN' in found else '⚠️ '} {query.label}: {', '.join(found)}")
+        else:
+            print(f"✅ {query.label}")
+    return 1 if any("COLLSCAN" in found for found in problems.values()) else 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    args = sys.argv[1:]
+    if args == ["--ensure"]:
+        ensure_indexes(_database())
+        sys.exit(0)
+    if args == ["--audit"]:
+        sys.exit(_audit(_database()))
+    print(__doc__)
+    sys.exit(2)
@@ -9,9 +9,11 @@ import os
 
 from agents.web_search_agent import tavily_search
 from agents.youtube_highlights_agent import get_f1_highlights
-from agents.weather_agent import get_weather_by_circuit_name
+from agents.weather_agent import get_weather_by_circuit_name, get_weather_for_circuits
 from agents.standings_agent import get_f1_standings
-from agents.champ_estimate import get_championship_odds
+from agents.champ_estimate import get_championship_odds, get_championship_grid_odds
+from agents.context_window import ContextState, make_context_hook, make_context_prompt
+from agents.tool_blobs import compact_tools
 
 # Load environment variables from .env file
 load_dotenv()
@@ -39,7 +41,8 @@ llm = ChatGoogleGenerativeAI(
     temperature=0.2
 )
 
-tools = [tavily_search, get_f1_highlights, get_weather_by_circuit_name, get_f1_standings,get_championship_odds]
+# Long tool outputs are kept in checkpoints as a digest plus a blob-store reference (agents/tool_blobs.py)
+tools = compact_tools([tavily_search, get_f1_highlights, get_weather_by_circuit_name, get_weather_for_circuits, get_f1_standings,get_championship_odds, get_championship_grid_odds])
 
 prompt = f"""
 You are a Formula 1 news assistant with access to real-time and data-driven tools.
@@ -61,9 +64,13 @@ Always ensure the information you provide is current, reliable, and verifiable f
 Your available tools include:
 1. Web Search Tool – Retrieves the most recent and authoritative Formula 1 information, including driver stats, team details, and current season data.
 2. YouTube Highlights Tool – Fetches official or verified Formula 1 highlights. If a specific year or season is requested, show highlights for that year; otherwise, show the most recent ones.
-3. Weather Tool – Provides live circuit weather updates and race weekend conditions.
+3. Weather Tool – Provides live circuit weather updates and race weekend conditions. For questions about an upcoming session ("chance of rain at race start", "weather for qualifying"), pass the session to get the forecast at its start time.
 4. Standings Tool – Returns the latest driver and constructor standings directly from official Formula 1 data.
 5. Championship Odds Estimator – Generates current statistical projections for championship outcomes based on points, form, and remaining races.
+6. Whole-Grid Championship Odds – Returns title chances, expected final points and likely final positions for every driver in one call. Use it instead of calling the Championship Odds Estimator once per driver (e.g. "who can still win the title?").
+7. Multi-Circuit Weather – Current weather for several circuits in one call (e.g. "weather at the next three races"). Use it instead of calling the Weather Tool once per circuit.
+
+When a question needs several tools (e.g. "can Norris still win?" needs standings, odds and recent news), request all of them in the same step rather than one after another; calls made together run in parallel.
 
 If the user’s request is unrelated to Formula 1, respond:
 "I’m only equipped to answer Formula 1 news-related questions."
@@ -100,11 +107,23 @@ If the user’s request is unrelated to Formula 1, respond:
 Your top priority is to provide the most accurate, up-to-date Formula 1 coverage possible, automatically selecting the most appropriate data sources and tools as needed.
 """
 
+# Build the ReAct agent on top of a checkpointer
+# When the model emits several tool calls in one step, the agent's ToolNode runs them concurrently:
+# on a thread pool under invoke/stream, and with asyncio.gather (using each tool's coroutine) under ainvoke/astream
+# The Flask app uses the sync MongoDBSaver below; asgi.py builds a second agent on an AsyncMongoDBSaver
+# The model sees a bounded context (agents/context_window.py): a running summary of older turns, trimmed
+# tool outputs and the last few turns verbatim; the checkpoint still holds the full history
+def build_agent(checkpointer):
+    return create_react_agent(
+        tools=tools,
+        model=llm,
+        prompt=make_context_prompt(prompt),
+        pre_model_hook=make_context_hook(llm),
+        state_schema=ContextState,
+        checkpointer=checkpointer
+    )
+
+
 # Create the agent
-agent_executor = create_react_agent(
-    tools=tools,
-    model=llm,
-    prompt=prompt,
-    checkpointer=memory
-)
+agent_executor = build_agent(memory)
 #config = {"configurable": {"thread_id": "abc123"}}
@@ -1,7 +1,7 @@
 """
 Security module for input validation and sanitization
 """
-from .input_validator import validate_user_input, InputValidator
+from .input_validator import validate_user_input, InputValidator, start_rule_reloader
 from .nosql_protection import (
     NoSQLInjectionProtector,
     protect_session_id,
@@ -12,6 +12,7 @@ from .nosql_protection import (
 __all__ = [
     'validate_user_input', 
     'InputValidator', 
+    'start_rule_reloader',
     'NoSQLInjectionProtector',
     'protect_session_id',
     'protect_user_id',
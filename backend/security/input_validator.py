@@ -3,6 +3,7 @@ Input validation and sanitization for chat messages to prevent prompt injection
 """
 import re
 from typing import Tuple, Optional
+from .rule_engine import RuleEngine, load_bundled_rules, make_rule_source
 
 class InputValidator:
     """
@@ -19,46 +20,14 @@ class InputValidator:
     # Minimum length to prevent empty spam
     MIN_LENGTH = 1
     
-    # Suspicious patterns that might indicate prompt injection
-    SUSPICIOUS_PATTERNS = [
-        # System prompt override attempts
-        r'ignore\s+(all\s+)?(previous|above|prior)\s+(instructions?|prompts?|directions?)',
-        r'forget\s+(everything|all|previous)',
-        r'disregard\s+(previous|above|all)',
-        r'new\s+(instructions?|task|role|system)',
-        r'you\s+are\s+now',
-        r'act\s+as\s+(if|a|an)',
-        r'pretend\s+(to\s+be|you)',
-        r'roleplay\s+as',
-        r'simulate\s+being',
-        
-        # Direct system/role manipulation
-        r'</?\s*system\s*>',
-        r'</?\s*assistant\s*>',
-        r'</?\s*user\s*>',
-        r'\[SYSTEM\]',
-        r'\[ASSISTANT\]',
-        r'\[USER\]',
-        
-        # Prompt extraction attempts
-        r'show\s+(me\s+)?(your|the)\s+(prompt|instructions?|system\s+message)',
-        r'what\s+(is|are)\s+your\s+(instructions?|prompt|rules)',
-        r'repeat\s+(your|the)\s+(instructions?|prompt)',
-        r'print\s+(your|the)\s+(instructions?|prompt)',
-        
-        # Command injection patterns
-        r'<!--',
-        r'-->',
-        r'<script',
-        r'</script>',
-        r'javascript:',
-        r'eval\s*\(',
-        r'exec\s*\(',
-        
-        # Excessive special characters (possible obfuscation)
-        r'[^\w\s\.\,\?\!\-\:\;\'\"]{10,}',
-    ]
-    
+    # Injection rules shipped in security/injection_rules.json (the only copy of the rule set), as
+    # Rule(id, pattern, literals); used until the rules source loads (see security/rule_engine.py) and
+    # if it never does
+    INJECTION_RULES = load_bundled_rules()
+
+    # Plain pattern list, kept for callers that only need the regexes
+    SUSPICIOUS_PATTERNS = [rule.pattern for rule in INJECTION_RULES]
+
     @staticmethod
     def validate_length(text: str) -> Tuple[bool, Optional[str]]:
         """
@@ -73,18 +42,28 @@ class InputValidator:
         
         return True, None
     
+    @staticmethod
+    def match_injection_rule(text: str) -> Optional[str]:
+        """
+        Return the id of the first injection rule matching text, or None.
+        Uses the rule engine's active rule set; each call lowercases the text once,
+        checks the rules' literals and runs only the regexes whose literals are present
+        (every regex for text with non-ASCII characters).
+        """
+        return InputValidator.rule_engine.match(text)
+
     @staticmethod
     def detect_prompt_injection(text: str) -> Tuple[bool, Optional[str]]:
         """
         Detect potential prompt injection attempts
         Returns: (is_suspicious, warning_message)
         """
-        text_lower = text.lower()
-        
-        for pattern in InputValidator.SUSPICIOUS_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return True, "Your message contains suspicious patterns. Please rephrase your question."
-        
+        rule_id = InputValidator.match_injection_rule(text)
+        if rule_id:
+            # Rule id only, never the message itself, so logs don't collect user input
+            print(f"Blocked suspicious input (rule {rule_id})")
+            return True, "Your message contains suspicious patterns. Please rephrase your question."
+
         return False, None
     
     @staticmethod
@@ -126,6 +105,17 @@ class InputValidator:
         return True, None, clean_text
 
 
+# The bundled rules are the fallback; the rules source (the same file by default) replaces them
+# at import and whenever a new version is published
+InputValidator.rule_engine = RuleEngine(InputValidator.INJECTION_RULES, make_rule_source())
+InputValidator.rule_engine.reload()
+
+
+def start_rule_reloader() -> None:
+    """Pick up new rule versions in the background (see security/rule_engine.py)."""
+    InputValidator.rule_engine.start_reloader()
+
+
 def validate_user_input(text: str) -> Tuple[bool, Optional[str], str]:
     """
     Convenience function for validating user input
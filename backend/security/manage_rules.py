@@ -0,0 +1,63 @@
+"""
+Manage the input-screening rules (see security/rule_engine.py).
+
+Usage:
+    python -m security.manage_rules --check security/injection_rules.json
+    python -m security.manage_rules --publish security/injection_rules.json   # to Mongo
+    python -m security.manage_rules --bench
+"""
+import sys
+import json
+from security.rule_engine import RULES_COLLECTION, RULES_DOC_ID, MongoRuleSource, RuleSet, parse_rules
+
+
+def _check(path: str) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    try:
+        version, rules = parse_rules(doc)
+        RuleSet(version, rules, path)
+    except ValueError as e:
+        print(f"❌ {path}: {e}")
+        return 1
+    print(f"✅ {path}: version {version}, {len(rules)} enabled rules")
+    return 0
+
+
+def _publish(path: str) -> int:
+    if _check(path):
+        return 1
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    source = MongoRuleSource()
+    current = source.collection.find_one({"_id": RULES_DOC_ID}, {"version": 1})
+    if current and current.get("version") == doc["version"]:
+        # Workers only reload on a version change, so republishing under the same version would be ignored
+        print(f"❌ version {doc['version']} is already published; bump the version")
+        return 1
+    source.collection.replace_one({"_id": RULES_DOC_ID}, {"_id": RULES_DOC_ID, **doc}, upsert=True)
+    print(f"✅ Published version {doc['version']} to {RULES_COLLECTION}")
+    return 0
+
+
+def _bench() -> int:
+    from security.input_validator import InputValidator
+    sample = ("who won the monaco grand prix and what is the weather at silverstone for qualifying " * 25)[:2000]
+    engine = InputValidator.rule_engine
+    for _ in range(2000):
+        engine.match(sample)
+    for rule_id, s in sorted(engine.stats.snapshot().items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+        print(f"{rule_id:<32} {s['evaluations']:>6} evals {s['hits']:>5} hits {s['avg_us']:8.1f} µs avg {s['max_us']:8.1f} µs max")
+    return 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] == "--check":
+        sys.exit(_check(args[1]))
+    if len(args) == 2 and args[0] == "--publish":
+        sys.exit(_publish(args[1]))
+    if args == ["--bench"]:
+        sys.exit(_bench())
+    print(__doc__)
+    sys.exit(2)
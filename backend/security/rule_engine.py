@@ -0,0 +1,266 @@
+"""
+Hot-reloadable rule engine for input screening.
+
+Rules come from a versioned source: a JSON file (injection_rules.json next to
+this module by default) or a single document in the F1_chatbot.InputRules
+collection, shaped as
+    {"version": 3, "rules": [{"id": "...", "pattern": "...", "literals": ["..."], "enabled": true}]}
+
+A background thread polls the source every INPUT_RULES_RELOAD_INTERVAL seconds.
+When the version changes, the new rules are compiled on that thread and the
+active RuleSet is swapped in with a single reference assignment. Requests
+already screening keep the RuleSet they started with, and a version that fails
+to parse or compile is rejected as a whole, so screening never runs with a
+partial rule set.
+
+Every regex evaluation is counted and timed per rule id (across reloads), and
+the reloader logs the most expensive and most frequently hit rules.
+
+security/manage_rules.py checks, publishes and profiles rule files.
+"""
+import os
+import re
+import json
+import time
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Rules shipped with the code: the default source and the fallback when the source cannot be loaded
+BUNDLED_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "injection_rules.json")
+RULES_PATH = os.getenv("INPUT_RULES_PATH", BUNDLED_RULES_PATH)
+
+# "file" or "mongo" (F1_chatbot.InputRules)
+RULES_SOURCE = os.getenv("INPUT_RULES_SOURCE", "file")
+RULES_COLLECTION = "InputRules"
+RULES_DOC_ID = "injection"
+
+# Seconds between checks for a new rules version (0 disables the background thread)
+RULES_RELOAD_INTERVAL = int(os.getenv("INPUT_RULES_RELOAD_INTERVAL", "30"))
+# Seconds between rule statistics log lines
+RULES_STATS_INTERVAL = int(os.getenv("INPUT_RULES_STATS_INTERVAL", "3600"))
+
+
+class Rule(NamedTuple):
+    id: str
+    pattern: str
+    # Lowercase substrings every match must contain; empty means the regex always runs
+    literals: Tuple[str, ...]
+
+
+def parse_rules(doc: dict) -> Tuple[object, List[Rule]]:
+    """Validate a rules document and return (version, enabled rules); raises ValueError on any problem."""
+    if not isinstance(doc, dict) or "version" not in doc or not isinstance(doc.get("rules"), list):
+        raise ValueError('rules document needs a "version" and a "rules" list')
+    rules, seen = [], set()
+    for i, entry in enumerate(doc["rules"]):
+        rule_id = entry.get("id") if isinstance(entry, dict) else None
+        if not rule_id or not isinstance(rule_id, str):
+            raise ValueError(f"rule #{i} has no id")
+        if rule_id in seen:
+            raise ValueError(f"duplicate rule id {rule_id}")
+        seen.add(rule_id)
+        pattern = entry.get("pattern")
+        if not pattern or not isinstance(pattern, str):
+            raise ValueError(f"rule {rule_id} has no pattern")
+        literals = entry.get("literals", [])
+        if not isinstance(literals, list) or not all(isinstance(l, str) and l for l in literals):
+            raise ValueError(f"rule {rule_id}: literals must be non-empty strings")
+        if any(l != l.lower() for l in literals):
+            # Literals are looked up in the lowercased text, so an uppercase one could never be found
+            raise ValueError(f"rule {rule_id}: literals must be lowercase")
+        if entry.get("enabled", True):
+            rules.append(Rule(rule_id, pattern, tuple(literals)))
+    return doc["version"], rules
+
+
+def load_bundled_rules(path: str = BUNDLED_RULES_PATH) -> List[Rule]:
+    """The enabled rules of the bundled rules file; raises ValueError if it is invalid."""
+    with open(path, "r", encoding="utf-8") as f:
+        _, rules = parse_rules(json.load(f))
+    return rules
+
+
+class RuleStats:
+    """Per-rule regex evaluations, hits and match time, shared by every RuleSet of an engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # rule id -> [evaluations, hits, total_ns, max_ns]
+        self._counters: Dict[str, List[int]] = {}
+
+    def record(self, timings: Iterable[Tuple[str, int, bool]]) -> None:
+        # One lock acquisition per screened message, not per rule
+        with self._lock:
+            for rule_id, ns, hit in timings:
+                c = self._counters.get(rule_id)
+                if c is None:
+                    c = self._counters[rule_id] = [0, 0, 0, 0]
+                c[0] += 1
+                c[1] += hit
+                c[2] += ns
+                if ns > c[3]:
+                    c[3] = ns
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                rule_id: {"evaluations": e, "hits": h, "total_ms": t / 1e6, "avg_us": t / e / 1e3 if e else 0.0, "max_us": m / 1e3}
+                for rule_id, (e, h, t, m) in self._counters.items()
+            }
+
+    def summary(self, top: int = 5) -> str:
+        stats = self.snapshot()
+        if not stats:
+            return "no rule evaluations yet"
+        slowest = sorted(stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:top]
+        noisiest = sorted(stats.items(), key=lambda kv: kv[1]["hits"], reverse=True)[:top]
+        return (
+            "most time: " + ", ".join(f"{rid} {s['total_ms']:.1f} ms ({s['avg_us']:.1f} µs avg)" for rid, s in slowest)
+            + " | most hits: " + ", ".join(f"{rid} {s['hits']}" for rid, s in noisiest if s["hits"])
+        )
+
+
+class RuleSet:
+    """
+    One compiled version of the rules: substring checks for every distinct literal,
+    then the precompiled regexes of the rules whose literals were found. Text with
+    non-ASCII characters skips the substring checks (see match).
+    """
+
+    def __init__(self, version, rules: List[Rule], source: str):
+        self.version = version
+        self.source = source
+        self.rules = []
+        for rule in rules:
+            try:
+                regex = re.compile(rule.pattern, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"rule {rule.id}: invalid pattern ({e})")
+            self.rules.append((rule.id, regex, rule.literals))
+        self.literals = sorted({literal for rule in rules for literal in rule.literals})
+
+    def match(self, text_lower: str, stats: Optional[RuleStats] = None) -> Optional[str]:
+        # re.IGNORECASE also matches some non-ASCII letters to ASCII ones (dotless "ı" to "i", long "ſ"
+        # to "s", the Kelvin sign to "k") that lower() leaves alone, so a literal can be missing from
+        # text a regex matches; such text runs every regex
+        prefilter = text_lower.isascii()
+        present = {literal for literal in self.literals if literal in text_lower} if prefilter else set()
+        timings = []
+        matched = None
+        for rule_id, regex, literals in self.rules:
+            if prefilter and literals and not any(literal in present for literal in literals):
+                continue
+            start = time.perf_counter_ns()
+            hit = regex.search(text_lower) is not None
+            timings.append((rule_id, time.perf_counter_ns() - start, hit))
+            if hit:
+                matched = rule_id
+                break
+        if stats is not None:
+            stats.record(timings)
+        return matched
+
+
+class FileRuleSource:
+    def __init__(self, path: str = RULES_PATH):
+        self.path = path
+        self._mtime = None
+
+    def describe(self) -> str:
+        return self.path
+
+    def load_if_changed(self) -> Optional[dict]:
+        """The rules document if the file changed since the last call, else None."""
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        self._mtime = mtime
+        return doc
+
+
+class MongoRuleSource:
+    def __init__(self, collection=None):
+        if collection is None:
+            from pymongo import MongoClient
+            collection = MongoClient(os.getenv("MONGO_URI"))["F1_chatbot"][RULES_COLLECTION]
+        self.collection = collection
+        self._version = None
+
+    def describe(self) -> str:
+        return f"mongo {RULES_COLLECTION}/{RULES_DOC_ID}"
+
+    def load_if_changed(self) -> Optional[dict]:
+        """The rules document if its version changed since the last call, else None (only the version is read)."""
+        head = self.collection.find_one({"_id": RULES_DOC_ID}, {"version": 1})
+        if head is None:
+            raise ValueError(f"no {RULES_DOC_ID} document in {RULES_COLLECTION}")
+        if head.get("version") == self._version:
+            return None
+        doc = self.collection.find_one({"_id": RULES_DOC_ID})
+        self._version = doc.get("version")
+        return doc
+
+
+def make_rule_source():
+    return MongoRuleSource() if RULES_SOURCE == "mongo" else FileRuleSource()
+
+
+class RuleEngine:
+    """
+    Screens text against the active RuleSet. Starts on the bundled rules and moves to the
+    source's rules on the first successful reload; a failed reload keeps the active set.
+    """
+
+    def __init__(self, bundled_rules: List[Rule], source=None):
+        self.source = source
+        self.stats = RuleStats()
+        self.ruleset = RuleSet("bundled", bundled_rules, "bundled")
+        self._reload_lock = threading.Lock()
+
+    def match(self, text: str) -> Optional[str]:
+        """Id of the first rule matching text, or None."""
+        # A single read of self.ruleset: a swap mid-call never mixes two versions
+        return self.ruleset.match(text.lower(), self.stats)
+
+    def reload(self) -> bool:
+        """Load, compile and swap in the source's rules if their version changed; True if swapped."""
+        if self.source is None:
+            return False
+        with self._reload_lock:
+            try:
+                doc = self.source.load_if_changed()
+                if doc is None:
+                    return False
+                version, rules = parse_rules(doc)
+                if version == self.ruleset.version:
+                    return False
+                ruleset = RuleSet(version, rules, self.source.describe())
+            except Exception as e:
+                print(f"Input rules from {self.source.describe()} rejected, keeping version {self.ruleset.version}: {e}")
+                return False
+            self.ruleset = ruleset
+            print(f"Input rules version {version} loaded from {ruleset.source} ({len(rules)} rules)")
+            return True
+
+    def _reload_forever(self, interval: int) -> None:
+        last_stats = time.monotonic()
+        while True:
+            time.sleep(interval)
+            self.reload()
+            if RULES_STATS_INTERVAL > 0 and time.monotonic() - last_stats >= RULES_STATS_INTERVAL:
+                last_stats = time.monotonic()
+                print(f"Input rules v{self.ruleset.version} stats: {self.stats.summary()}")
+
+    _reloader_started = False
+
+    def start_reloader(self, interval: int = RULES_RELOAD_INTERVAL) -> None:
+        """Poll the source for new versions in a daemon thread (once per engine; no-op when interval is 0)."""
+        if interval <= 0 or self.source is None:
+            return
+        with self._reload_lock:
+            if self._reloader_started:
+                return
+            self._reloader_started = True
+        threading.Thread(target=self._reload_forever, args=(interval,), name="input-rules-reloader", daemon=True).start()
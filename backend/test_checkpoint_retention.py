@@ -0,0 +1,132 @@
+"""
+Tests for the checkpoint retention job (checkpoint_retention.py): compaction, the purge of
+deleted sessions, the lease and the sweep of unreferenced tool blobs.
+Run from the backend directory: python -m pytest test_checkpoint_retention.py
+"""
+from datetime import datetime, timedelta, timezone
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from langchain_core.messages import ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from checkpoint_retention import LEASE_ID, CheckpointRetention, RetentionStats
+
+KEPT, IN_WRITE, ORPHAN, FRESH, LEGACY = ("a" * 64, "b" * 64, "c" * 64, "d" * 64, "e" * 64)
+
+
+def _serialized(blob):
+    message = ToolMessage(content="digest", tool_call_id="call-1", artifact={"blob": blob, "chars": 5000})
+    return JsonPlusSerializer().dumps_typed({"channel_values": {"messages": [message]}})
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient(tz_aware=True)["F1_chatbot"]
+
+
+def _retention(db, **kwargs):
+    return CheckpointRetention(db.checkpoints, db.writes, db.Sessions, db.ChatMessages, blobs=db.ToolBlobs,
+                               batch=1, pause=0, **kwargs)
+
+
+@pytest.fixture
+def retention(db):
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    type_, checkpoint = _serialized(KEPT)
+    db.checkpoints.insert_one({"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "1", "type": type_, "checkpoint": checkpoint})
+    type_, value = _serialized(IN_WRITE)
+    db.writes.insert_one({"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "1", "type": type_, "value": value})
+    for blob in (KEPT, IN_WRITE, ORPHAN):
+        db.ToolBlobs.insert_one({"_id": blob, "body": "x" * 5000, "created_at": old, "last_used": old})
+    db.ToolBlobs.insert_one({"_id": FRESH, "body": "x" * 5000, "created_at": old, "last_used": datetime.now(timezone.utc)})
+    db.ToolBlobs.insert_one({"_id": LEGACY, "body": "x" * 5000, "created_at": old})
+    return _retention(db)
+
+
+def _checkpoint_ids(collection, thread_id, ns=""):
+    return sorted(doc["checkpoint_id"] for doc in collection.find({"thread_id": thread_id, "checkpoint_ns": ns}))
+
+
+def test_compaction_keeps_the_newest_checkpoints_and_their_writes(db):
+    for thread_id in ("t1", "t2"):
+        for i in range(8):
+            db.checkpoints.insert_one({"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": f"{i:02d}"})
+            db.writes.insert_one({"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": f"{i:02d}", "idx": 0})
+    # A subgraph namespace with fewer checkpoints than keep_last keeps them all
+    db.checkpoints.insert_one({"thread_id": "t1", "checkpoint_ns": "tools", "checkpoint_id": "00"})
+    retention = _retention(db, keep_last=3)
+    retention.stats = RetentionStats()
+    retention.compact_all()
+    for thread_id in ("t1", "t2"):
+        assert _checkpoint_ids(db.checkpoints, thread_id) == ["05", "06", "07"]
+        # Only the newest checkpoint's writes are still needed
+        assert _checkpoint_ids(db.writes, thread_id) == ["07"]
+    assert _checkpoint_ids(db.checkpoints, "t1", "tools") == ["00"]
+    assert (retention.stats.threads_scanned, retention.stats.threads_compacted) == (2, 2)
+    assert (retention.stats.checkpoints_deleted, retention.stats.writes_deleted) == (10, 14)
+
+
+def test_purge_stamps_deleted_at_and_waits_for_the_grace_period(db):
+    now = datetime.now(timezone.utc)
+    db.Sessions.insert_many([
+        {"_id": "old", "visible": False, "deleted_at": now - timedelta(days=60)},
+        {"_id": "legacy", "visible": False},
+        {"_id": "live", "visible": True},
+    ])
+    for sid in ("old", "legacy", "live"):
+        db.checkpoints.insert_one({"thread_id": sid, "checkpoint_ns": "", "checkpoint_id": "1"})
+        db.ChatMessages.insert_one({"_id": f"{sid}:0", "session_id": sid, "seq": 0})
+    retention = _retention(db)
+    retention.stats = RetentionStats()
+    retention.purge_deleted()
+    assert retention.stats.sessions_purged == 1
+    assert "purged_at" in db.Sessions.find_one({"_id": "old"})
+    # Deleted before deleted_at was recorded: its grace period starts now
+    legacy = db.Sessions.find_one({"_id": "legacy"})
+    assert "deleted_at" in legacy and "purged_at" not in legacy
+    assert sorted(doc["thread_id"] for doc in db.checkpoints.find()) == ["legacy", "live"]
+    assert sorted(doc["session_id"] for doc in db.ChatMessages.find()) == ["legacy", "live"]
+
+
+def test_lease_is_held_by_one_worker_until_it_expires(db):
+    first, second = _retention(db), _retention(db)
+    second.owner = "other-host:1"
+    assert first._acquire_lease(60)
+    assert not second._acquire_lease(60)
+    # The holder renews its own lease
+    assert first._acquire_lease(60)
+    db.Maintenance.update_one({"_id": LEASE_ID}, {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert second._acquire_lease(60)
+    assert db.Maintenance.find_one({"_id": LEASE_ID})["owner"] == "other-host:1"
+
+
+def test_sweep_deletes_only_idle_unreferenced_blobs(retention):
+    assert retention._acquire_lease(60)
+    stats = retention.run_pass()
+    assert sorted(doc["_id"] for doc in retention.blobs.find()) == [KEPT, IN_WRITE, FRESH]
+    assert stats.blobs_deleted == 2
+    # Reported with the pass's progress metrics
+    assert retention.maintenance.find_one({"_id": LEASE_ID})["last_pass"]["blobs_deleted"] == 2
+
+
+def test_blobs_of_purged_sessions_are_swept(retention):
+    retention.sessions.insert_one({"_id": "t1", "visible": False, "deleted_at": datetime.now(timezone.utc) - timedelta(days=60)})
+    stats = retention.run_pass()
+    assert stats.sessions_purged == 1
+    assert [doc["_id"] for doc in retention.blobs.find()] == [FRESH]
+    assert stats.blobs_deleted == 4
+
+
+def test_mark_phase_pauses_between_batches(db, monkeypatch):
+    for i in range(5):
+        type_, checkpoint = _serialized(f"{i:064x}")
+        db.checkpoints.insert_one({"thread_id": f"t{i}", "checkpoint_ns": "", "checkpoint_id": "1", "checkpoint": checkpoint})
+    retention = _retention(db)
+    retention.batch = 2
+    retention.stats = RetentionStats()
+    pauses = []
+    monkeypatch.setattr(retention, "_end_batch", lambda: pauses.append(1))
+    assert retention._referenced_blobs() == {f"{i:064x}" for i in range(5)}
+    # 5 checkpoints in pages of 2 (then the empty writes collection)
+    assert len(pauses) == 2
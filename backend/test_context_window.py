@@ -0,0 +1,49 @@
+"""
+Tests for the bounded model input (agents/context_window.py) and its tool-output blobs.
+Run from the backend directory: python -m pytest test_context_window.py
+"""
+import asyncio
+import threading
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from agents import tool_blobs
+from agents.context_window import make_context_prompt
+
+BODY = "Full Tavily result " * 100
+BLOB = "f" * 64
+
+
+class _Blobs:
+    """ToolBlobs stand-in that records the thread of every read."""
+
+    def __init__(self):
+        self.threads = []
+
+    def find_one(self, query, projection=None):
+        self.threads.append(threading.current_thread())
+        return {"_id": query["_id"], "body": BODY}
+
+
+def _state():
+    call = {"name": "search", "args": {"query": "Monza"}, "id": "call-1"}
+    return {"messages": [
+        HumanMessage(content="Who won at Monza?"),
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content="digest", tool_call_id="call-1", artifact={"blob": BLOB, "chars": len(BODY)}),
+    ]}
+
+
+def test_async_prompt_reads_blobs_off_the_event_loop(monkeypatch):
+    blobs = _Blobs()
+    monkeypatch.setattr(tool_blobs, "blob_store", tool_blobs.BlobStore(blobs))
+    prompt = make_context_prompt("system")
+
+    async def build():
+        return await prompt.ainvoke(_state()), threading.current_thread()
+
+    messages, loop_thread = asyncio.run(build())
+    # The current turn's tool output is shown in full
+    assert messages[-1].content == BODY
+    assert len(blobs.threads) == 1 and blobs.threads[0] is not loop_thread
+    # Now in the local copy: no second read
+    assert prompt.invoke(_state())[-1].content == BODY
+    assert len(blobs.threads) == 1
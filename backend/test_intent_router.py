@@ -0,0 +1,38 @@
+"""
+Tests for the pre-LLM intent router (agents/intent_router.py), on the standings in scraped_data.
+Run from the backend directory: python -m pytest test_intent_router.py
+"""
+import pytest
+from agents.intent_router import route_intent
+
+
+@pytest.mark.parametrize("query", [
+    # Race questions that only mention a driver
+    "Is Hamilton likely to win at Monaco?",
+    "what are Norris chances of a podium",
+    "Leclerc chances of pole",
+    "Is Hamilton likely to win?",
+    "Can Norris win the title at home",
+    "Hamilton standings after the race",
+    # Leftover words that are not (only) a driver name
+    "Ferrari standings",
+    "piastri chances",
+    "Verstappen podium odds",
+])
+def test_non_championship_questions_go_to_the_agent(query):
+    assert route_intent(query) is None
+
+
+@pytest.mark.parametrize("query, intent, args", [
+    ("Norris title odds", "odds", {"driver_name": "Lando Norris"}),
+    ("Verstapen championship chances", "odds", {"driver_name": "Max Verstappen"}),
+    ("Oscar Piastri chances of winning the championship", "odds", {"driver_name": "Oscar Piastri"}),
+    ("who can win the title", "odds", {}),
+    ("standings", "standings", {"query": "drivers"}),
+    ("constructors standings", "standings", {"query": "teams"}),
+    ("Hamilton standings", "standings", {"query": "drivers", "driver_name": "Lewis Hamilton"}),
+])
+def test_championship_questions_are_routed(query, intent, args):
+    route = route_intent(query)
+    assert route is not None
+    assert (route.intent, route.args) == (intent, args)
@@ -0,0 +1,74 @@
+"""
+Tests for the championship simulation cache (agents/odds_cache.py).
+Run from the backend directory: python -m pytest test_odds_cache.py
+"""
+import numpy as np
+import pytest
+from agents import odds_cache
+from agents.odds_engine import run_sharded_championship_simulation
+
+
+@pytest.fixture
+def sharded_runs(tmp_path, monkeypatch):
+    """Route sharded runs to a stub that records the driver and precision each run was asked to converge on."""
+    monkeypatch.setattr(odds_cache, "ODDS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(odds_cache, "_memory", {})
+    monkeypatch.setattr(odds_cache, "SHARDED_MIN_SIMULATIONS", 10)
+    calls = []
+
+    def fake_sharded(base_points, remaining, simulations, seed, time_budget, target_half_width, driver_idx):
+        calls.append((driver_idx, target_half_width))
+        n = len(base_points)
+        return {
+            "wins": np.full(n, float(len(calls))),
+            "points_sum": np.zeros(n),
+            "position_counts": np.zeros((n, n), dtype=np.int64),
+            "simulations": simulations,
+        }
+
+    monkeypatch.setattr(odds_cache, "run_sharded_championship_simulation", fake_sharded)
+    return calls
+
+
+def _run(driver_idx, target_half_width=None):
+    return odds_cache.cached_championship_simulation("f" * 64, np.array([100.0, 90.0, 80.0]), 24, 20, 100,
+                                                     driver_idx=driver_idx, target_half_width=target_half_width)
+
+
+def test_sharded_keys_include_target_and_driver():
+    key_0 = odds_cache.cache_key("f" * 64, 24, 20, 100, None, odds_cache.ODDS_TARGET_HALF_WIDTH, 0)
+    key_1 = odds_cache.cache_key("f" * 64, 24, 20, 100, None, odds_cache.ODDS_TARGET_HALF_WIDTH, 1)
+    key_all = odds_cache.cache_key("f" * 64, 24, 20, 100, None, odds_cache.ODDS_TARGET_HALF_WIDTH, None)
+    assert len({key_0, key_1, key_all}) == 3
+
+
+def test_sharded_runs_are_not_shared_between_drivers(sharded_runs):
+    first = _run(0)
+    second = _run(1)
+    grid = _run(None)
+    default = odds_cache.ODDS_TARGET_HALF_WIDTH
+    assert sharded_runs == [(0, default), (1, default), (None, default)]
+    assert first["wins"][0] != second["wins"][0] != grid["wins"][0]
+    # The same driver again is a hit
+    _run(1)
+    assert len(sharded_runs) == 3
+
+
+def test_sharded_runs_keep_the_requested_precision(sharded_runs):
+    _run(0, 0.02)
+    _run(0)
+    assert sharded_runs == [(0, 0.02), (0, odds_cache.ODDS_TARGET_HALF_WIDTH)]
+    # Each precision has its own entry
+    _run(0, 0.02)
+    assert len(sharded_runs) == 2
+
+
+def test_sharded_precision_stop_does_not_depend_on_workers():
+    points = np.array([100.0, 95.0, 60.0])
+    runs = [run_sharded_championship_simulation(points, 4, 4000, seed=7, shards=8, workers=workers,
+                                                target_half_width=0.03, driver_idx=0)
+            for workers in (1, 3, 8)]
+    assert 1 < runs[0]["shards_used"] < 8
+    for run in runs[1:]:
+        assert run["shards_used"] == runs[0]["shards_used"]
+        assert np.array_equal(run["wins"], runs[0]["wins"])
@@ -0,0 +1,62 @@
+"""
+Tests for the first-turn response cache (agents/response_cache.py).
+Run from the backend directory: python -m pytest test_response_cache.py
+"""
+import asyncio
+import pytest
+from agents.name_index import fold
+from agents.response_cache import ResponseCache, question_entities
+from agents.tool_cache import LRUBackend, ToolCache
+
+
+@pytest.fixture
+def cache():
+    # Every question embeds to the same vector, so only the entity check can tell them apart
+    async def aembed(query):
+        return [1.0, 0.0]
+    return ResponseCache(ToolCache("Responses", LRUBackend()), embed=lambda query: [1.0, 0.0], aembed=aembed)
+
+
+def _answer(cache, question, reply):
+    probe = cache.lookup(question)
+    assert probe.reply is None
+    cache.store(probe, reply)
+
+
+def test_exact_key_ignores_case_and_punctuation_but_not_word_order(cache):
+    cache._embed = None
+    _answer(cache, "Is Hamilton faster than Leclerc?", "Hamilton")
+    assert cache.lookup("is hamilton  faster than leclerc").kind == "exact"
+    assert cache.lookup("Is Leclerc faster than Hamilton?").reply is None
+
+
+def test_similar_question_with_the_same_names_is_served(cache):
+    _answer(cache, "Who will win at Monza?", "Norris")
+    probe = cache.lookup("Who is going to win at Monza")
+    assert (probe.kind, probe.reply) == ("semantic", "Norris")
+    assert asyncio.run(cache.alookup("Who is going to win at Monza")).reply == "Norris"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Is Hamilton faster than Leclerc?", "Is Leclerc faster than Hamilton?"),
+    ("How many points does Hamilton have?", "How many points does Leclerc have?"),
+    ("How many points does Red Bull have?", "How many points does McLaren have?"),
+    ("Will it rain at Monza?", "Will it rain at Spa?"),
+])
+def test_similar_question_about_other_names_is_a_miss(cache, cached, asked):
+    _answer(cache, cached, "cached reply")
+    assert cache.lookup(asked).reply is None
+    assert asyncio.run(cache.alookup(asked)).reply is None
+
+
+@pytest.mark.parametrize("question, entities", [
+    # Short words and codes are not names on their own ("had" is Hadjar's code, "the" a word of COTA)
+    ("Max Verstappen had a crash at Monza in the rain", (("Max Verstappen",), (), ("it-1922",))),
+    # First names name a driver
+    ("Kimi vs Lando at Albert Park", (("Kimi Antonelli", "Lando Norris"), (), ("au-1953",))),
+    # Sponsor and descriptive words need the rest of the name
+    ("Is cash or a kick worth it at the autodromo?", ((), (), ())),
+    ("Kick Sauber and Red Bull at the Circuit of the Americas", ((), ("Kick Sauber", "Red Bull Racing"), ("us-2012",))),
+])
+def test_question_entities(question, entities):
+    assert question_entities(fold(question)) == entities
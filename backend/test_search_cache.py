@@ -0,0 +1,24 @@
+"""
+Tests for the Tavily search cache keys (agents/web_search_agent.py).
+Run from the backend directory: python -m pytest test_search_cache.py
+"""
+import os
+
+# The module creates its Tavily clients at import time
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+from agents.web_search_agent import normalize_search_query, search_ttl, SEARCH_TTL_LIVE
+
+
+def test_case_punctuation_and_whitespace_are_normalized():
+    assert normalize_search_query("Who won the Azerbaijan GP?") == normalize_search_query("who  won the azerbaijan gp")
+    assert normalize_search_query("Sergio Pérez, Monaco!") == "sergio perez monaco"
+
+
+def test_word_order_is_kept():
+    assert normalize_search_query("Hamilton faster than Leclerc") != normalize_search_query("Leclerc faster than Hamilton")
+    assert normalize_search_query("Red Bull vs McLaren") != normalize_search_query("McLaren vs Red Bull")
+
+
+def test_live_queries_get_the_short_ttl():
+    assert search_ttl(normalize_search_query("Latest F1 news")) == SEARCH_TTL_LIVE
@@ -0,0 +1,21 @@
+"""
+Tests for the race-weekend forecast mode of the weather tool (agents/weather_agent.py, agents/weather_forecast.py).
+Run from the backend directory: python -m pytest test_weather_agent.py
+"""
+from agents import weather_forecast
+from agents.circuit_index import find_circuit
+from agents.weather_agent import _get_weather_by_circuit_name
+
+
+def test_committed_calendar_maps_rounds_to_circuits():
+    monza, _ = find_circuit("Monza")
+    weekend = weather_forecast.weekend_at(monza, now=0)
+    assert weekend is not None and weekend.race_name == "Italian Grand Prix"
+    assert [name for name, _ in weekend.sessions][-1] == "Race"
+
+
+def test_missing_calendar_is_not_reported_as_no_race(monkeypatch, tmp_path):
+    monkeypatch.setattr(weather_forecast, "RACE_CALENDAR_PATH", str(tmp_path / "race_calendar.json"))
+    reply = _get_weather_by_circuit_name("Monza", "Race")
+    assert "race calendar is not loaded" in reply
+    assert "No race weekend" not in reply
@@ -0,0 +1,66 @@
+"""
+Tests for the cached OpenWeather access (agents/weather_service.py).
+Run from the backend directory: python -m pytest test_weather_service.py
+"""
+import asyncio
+import pytest
+from agents import weather_service
+from agents.circuit_index import Circuit
+from agents.tool_cache import LRUBackend, ToolCache
+
+MONZA = Circuit("monza", "Autodromo Nazionale Monza", "Monza", "Italy", 45.62, 9.28)
+SERIES = {"t": [1700000000], "temp": [18.0], "pop": [0.4], "rain": [0.2], "wind": [3.1], "humidity": [70], "desc": ["light rain"]}
+
+
+class _Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def forecast_cache(monkeypatch):
+    cache = ToolCache("OpenWeather forecast", LRUBackend(), stale_ttl=12 * 3600)
+    monkeypatch.setattr(weather_service, "forecast_cache", cache)
+    return cache
+
+
+def _fail_upstream(monkeypatch, response=None):
+    def get(*args, **kwargs):
+        if response is None:
+            raise ConnectionError("OpenWeather outage")
+        return response
+
+    class _AsyncClient:
+        async def get(self, *args, **kwargs):
+            return get()
+
+    monkeypatch.setattr(weather_service.http_session, "get", get)
+    monkeypatch.setattr(weather_service, "get_async_client", lambda: _AsyncClient())
+
+
+@pytest.mark.parametrize("response", [None, _Response(503)])
+def test_failing_fetch_serves_the_stale_series(forecast_cache, monkeypatch, response):
+    # Expired a second ago, still inside the stale window
+    forecast_cache.put(MONZA.id, SERIES, -1)
+    _fail_upstream(monkeypatch, response)
+    assert weather_service.forecast_series(MONZA) == SERIES
+    assert asyncio.run(weather_service.aforecast_series(MONZA)) == SERIES
+    assert forecast_cache.stale_hits == 2
+
+
+def test_failing_fetch_without_cached_series_is_none(forecast_cache, monkeypatch):
+    _fail_upstream(monkeypatch)
+    assert weather_service.forecast_series(MONZA) is None
+    assert asyncio.run(weather_service.aforecast_series(MONZA)) is None
+
+
+def test_successful_fetch_is_cached(forecast_cache, monkeypatch):
+    payload = {"list": [{"dt": 1700000000, "main": {"temp": 18.0, "humidity": 70}, "pop": 0.4,
+                         "rain": {"3h": 0.2}, "wind": {"speed": 3.1}, "weather": [{"description": "light rain"}]}]}
+    monkeypatch.setattr(weather_service.http_session, "get", lambda *a, **k: _Response(200, payload))
+    assert weather_service.forecast_series(MONZA) == SERIES
+    assert forecast_cache.get(MONZA.id) == SERIES
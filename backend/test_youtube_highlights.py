@@ -0,0 +1,57 @@
+"""
+Tests for the async YouTube search (agents/youtube_highlights_agent.py).
+Run from the backend directory: python -m pytest test_youtube_highlights.py
+"""
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from agents import youtube_highlights_agent as highlights
+
+
+class _Quota:
+    """Records the thread of every counter call, like QuotaBudget with the mongo backend."""
+    blocking = True
+
+    def __init__(self):
+        self.threads = []
+
+    def remaining(self):
+        self.threads.append(threading.current_thread())
+        return 10000
+
+    def spend(self, units):
+        self.threads.append(threading.current_thread())
+
+    def exhaust(self):
+        self.threads.append(threading.current_thread())
+
+
+class _Response:
+    status_code = 403
+
+    def json(self):
+        return {"error": {"errors": [{"reason": "quotaExceeded"}]}}
+
+
+def test_quota_counters_run_off_the_event_loop(monkeypatch):
+    quota = _Quota()
+
+    class _AsyncClient:
+        async def get(self, *args, **kwargs):
+            return _Response()
+
+    monkeypatch.setattr(highlights, "youtube_quota", quota)
+    monkeypatch.setattr(highlights, "get_async_client", lambda: _AsyncClient())
+
+    async def search():
+        with pytest.raises(highlights.QuotaExceeded):
+            await highlights._asearch_videos({"q": "Monza", "order": "relevance", "maxResults": 3})
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(search())
+    # remaining + spend, then exhaust on the quota error
+    assert len(quota.threads) == 3
+    assert loop_thread not in quota.threads
@@ -36,7 +36,9 @@ else:
     # --- CLEANING SECTION ---
     for item in data:
         driver = item.get("DRIVER", "")
-        # Remove trailing 3-letter code like "PIA", "NOR", etc.
+        # Keep the trailing 3-letter code like "PIA", "NOR", etc. as its own field
+        code_match = re.search(r"([A-Z]{3})$", driver)
+        item["CODE"] = code_match.group(1) if code_match else ""
         item["DRIVER"] = re.sub(r"[A-Z]{3}$", "", driver).strip()
 
         # Clean up special spaces and trim
@@ -0,0 +1,52 @@
+import os
+import requests
+import json
+
+# Season schedule with session start times (UTC) from the Ergast-compatible Jolpica API
+url = "https://api.jolpi.ca/ergast/f1/current.json"
+
+# Ergast field names -> session names used by the weather tools
+SESSION_FIELDS = {
+    "FirstPractice": "FP1",
+    "SecondPractice": "FP2",
+    "ThirdPractice": "FP3",
+    "SprintQualifying": "Sprint Qualifying",
+    "Sprint": "Sprint",
+    "Qualifying": "Qualifying",
+}
+
+response = requests.get(url, timeout=30)
+
+# Create output folder if it doesn't exist
+os.makedirs("scraped_data", exist_ok=True)
+
+if response.status_code != 200:
+    print(f"❌ Calendar request failed with status {response.status_code}")
+else:
+    races = response.json().get("MRData", {}).get("RaceTable", {}).get("Races", [])
+    data = []
+    for race in races:
+        sessions = {}
+        for field, name in SESSION_FIELDS.items():
+            session = race.get(field)
+            if session and session.get("date") and session.get("time"):
+                sessions[name] = f"{session['date']}T{session['time']}"
+        if race.get("date") and race.get("time"):
+            sessions["Race"] = f"{race['date']}T{race['time']}"
+
+        location = race.get("Circuit", {}).get("Location", {})
+        data.append({
+            "round": int(race.get("round", 0)),
+            "race_name": race.get("raceName", ""),
+            "circuit_name": race.get("Circuit", {}).get("circuitName", ""),
+            "lat": float(location.get("lat", 0)),
+            "lon": float(location.get("long", 0)),
+            "sessions": sessions,
+        })
+
+    # --- SAVE CALENDAR ---
+    output_path = "scraped_data/race_calendar.json"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"season": races[0]["season"] if races else "", "races": data}, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Calendar saved successfully to {output_path} ({len(data)} races)")
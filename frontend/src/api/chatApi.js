@@ -33,6 +33,43 @@ export async function sendChat({ sessionId, query }) {
   return res.data
 }
 
+// Streaming chat over Server-Sent Events (POST, so EventSource can't be used).
+// onEvent(event, data) is called for: token, tool_start, tool_end, done, error
+export async function streamChat({ sessionId, query, onEvent }) {
+  const res = await fetch(`${axiosClient.defaults.baseURL}/api/chat/stream`, {
+    method: 'POST',
+    credentials: 'include',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ session_id: sessionId, query }),
+  })
+  if (!res.ok || !res.body) {
+    const data = await res.json().catch(() => ({}))
+    throw new Error(data.error || 'Something went wrong. Try again.')
+  }
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    // Events are separated by a blank line
+    let sep
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, sep)
+      buffer = buffer.slice(sep + 2)
+      let event = 'message'
+      let data = ''
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      onEvent(event, data ? JSON.parse(data) : {})
+    }
+  }
+}
+
 export async function listSessions() {
   const res = await axiosClient.get('/api/sessions')
   return res.data
@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react'
 import ReactMarkdown from 'react-markdown'
 import { theme } from '../theme'
-import { listSessions, createSession, deleteSession, renameSession, sendChat, getHistory, getSessionIdFromUrl, removeSessionIdFromUrl, whoAmI, redirectToGoogle, logout } from '../api/chatApi'
+import { listSessions, createSession, deleteSession, renameSession, streamChat, getHistory, getSessionIdFromUrl, removeSessionIdFromUrl, whoAmI, redirectToGoogle, logout } from '../api/chatApi'
 import ProfileModal from './ProfileModal'
 import GoogleSignIn from './GoogleSignIn'
 
@@ -91,14 +91,38 @@ export default function ChatAssistant({ open, onClose }) {
     setMessages((prev) => [...prev, userMsg])
     setInput('')
     setIsSending(true)
+    // Placeholder agent message that is filled in as tokens stream in
+    const setAgentContent = (update) =>
+      setMessages((prev) => {
+        const next = [...prev]
+        const last = next[next.length - 1]
+        next[next.length - 1] = { ...last, content: update(last.content) }
+        return next
+      })
+    setMessages((prev) => [...prev, { role: 'agent', content: '' }])
+    let showingToolStatus = false
     try {
-      const res = await sendChat({ sessionId: currentId, query: userMsg.content })
-      setMessages((prev) => [...prev, { role: 'agent', content: res.response }])
+      await streamChat({
+        sessionId: currentId,
+        query: userMsg.content,
+        onEvent: (event, data) => {
+          if (event === 'token') {
+            const wasStatus = showingToolStatus
+            showingToolStatus = false
+            setAgentContent((content) => (wasStatus ? '' : content) + data.content)
+          } else if (event === 'tool_start') {
+            // A tool call means the streamed text so far was intermediate reasoning
+            showingToolStatus = true
+            setAgentContent(() => `_Checking ${data.tool.replace(/_/g, ' ')}..._`)
+          } else if (event === 'done') setAgentContent(() => data.response)
+          else if (event === 'error') setAgentContent(() => data.error || 'Something went wrong. Try again.')
+        },
+      })
       await refreshSessions()
     } catch (e) {
       // Display backend error message if available
-      const errorMsg = e.response?.data?.error || 'Something went wrong. Try again.'
-      setMessages((prev) => [...prev, { role: 'agent', content: errorMsg }])
+      const errorMsg = e.message || 'Something went wrong. Try again.'
+      setAgentContent(() => errorMsg)
     } finally {
       setIsSending(false)
     }
@@ -296,9 +320,10 @@ export default function ChatAssistant({ open, onClose }) {
                 </div>
               )}
               {messages.map((m, idx) => (
-                <MessageBubble key={idx} role={m.role} content={m.content} />
+                // The streaming placeholder stays hidden (typing bubble instead) until its first token
+                m.content ? <MessageBubble key={idx} role={m.role} content={m.content} /> : null
               ))}
-              {isSending && <TypingBubble />}
+              {isSending && !messages[messages.length - 1]?.content && <TypingBubble />}
             </div>
             <div className="p-3 flex gap-2 border-t" style={{ borderColor: '#1f1f1f' }}>
               <input